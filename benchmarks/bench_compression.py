@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Measures the CPU cost of compressing typical JSON API payloads against
+the bytes saved, for gzip and deflate at several compression levels.
+
+Usage:
+    python benchmarks/bench_compression.py
+"""
+
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pwf.compression import compress
+
+
+def record(i):
+    return {'id': i, 'name': 'user %d' % i, 'email': 'user%d@example.com' % i,
+            'active': i % 2 == 0, 'score': i * 1.5,
+            'tags': ['alpha', 'beta', 'gamma']}
+
+
+def payload(count):
+    return json.dumps([record(i) for i in range(count)])
+
+
+def measure(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    print('%-10s %-8s %5s %10s %8s %10s %12s' % (
+        'payload', 'coding', 'level', 'bytes', 'ratio', 'ms', 'MB/s'))
+    for count in (10, 1000, 50000):
+        data = payload(count)
+        label = '%d KB' % (len(data) // 1024)
+        repeat = max(3, 2000 // count)
+        for encoding in ('gzip', 'deflate'):
+            for level in (1, 6, 9):
+                compressed = compress(data, encoding, level)
+                elapsed = measure(lambda: compress(data, encoding, level),
+                                  repeat)
+                print('%-10s %-8s %5d %10d %7.1f%% %10.3f %12.1f' % (
+                    label, encoding, level, len(compressed),
+                    100.0 * len(compressed) / len(data), elapsed * 1000,
+                    len(data) / 1024.0 / 1024.0 / max(elapsed, 1e-9)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Compares the throughput of the streaming MultipartParser against
+cgi.FieldStorage for a form with many small fields and for a single
+large file upload.
+
+Usage:
+    python benchmarks/bench_formparser.py
+"""
+
+import os
+import sys
+import cgi
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pwf.formparser import MultipartParser
+
+BOUNDARY = b'----PwfBenchmarkBoundary'
+
+
+def many_fields(count=5000):
+    parts = []
+    for i in range(count):
+        parts.append(b'--%s\r\nContent-Disposition: form-data; '
+                     b'name="field%d"\r\n\r\nvalue %d\r\n' % (BOUNDARY, i, i))
+    parts.append(b'--%s--\r\n' % BOUNDARY)
+    return b''.join(parts)
+
+
+def large_file(size=64 * 1024 * 1024):
+    return (b'--%s\r\nContent-Disposition: form-data; name="file"; '
+            b'filename="large.bin"\r\nContent-Type: '
+            b'application/octet-stream\r\n\r\n' % BOUNDARY +
+            os.urandom(1024) * (size // 1024) + b'\r\n--%s--\r\n' % BOUNDARY)
+
+
+def parse_cgi(data):
+    environ = {'REQUEST_METHOD': 'POST', 'CONTENT_LENGTH': str(len(data)),
+               'CONTENT_TYPE': 'multipart/form-data; boundary=%s' % BOUNDARY}
+    storage = cgi.FieldStorage(BytesIO(data), environ=environ,
+                               keep_blank_values=True)
+    return len(storage.list)
+
+
+def parse_pwf(data):
+    form, files = MultipartParser(BOUNDARY).parse(BytesIO(data), len(data))
+    return len(form) + len(files)
+
+
+def measure(func, data, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func(data)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    print('%-22s %14s %14s %9s' % ('payload', 'cgi (MB/s)', 'pwf (MB/s)',
+                                   'speedup'))
+    for name, data in (('5000 small fields', many_fields()),
+                       ('single 64 MB file', large_file())):
+        assert parse_cgi(data) == parse_pwf(data)
+        mb = len(data) / 1024.0 / 1024.0
+        cgi_time = measure(parse_cgi, data)
+        pwf_time = measure(parse_pwf, data)
+        print('%-22s %14.1f %14.1f %8.1fx' % (
+            name, mb / cgi_time, mb / pwf_time, cgi_time / pwf_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Compares the JSON codecs available to request.json and render_json
+when encoding and decoding 1 KB, 100 KB and 10 MB payloads. Backends
+that aren't installed are skipped.
+
+Usage:
+    python benchmarks/bench_json.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pwf.jsoncodec import JSONCodec, import_backend, AUTO_BACKENDS
+
+
+def record(i):
+    return {'id': i, 'name': u'user %d' % i, 'email': 'user%d@example.com' % i,
+            'active': i % 2 == 0, 'score': i * 1.5,
+            'tags': ['alpha', 'beta', 'gamma']}
+
+
+def payload(size):
+    """Returns a list of records encoding to roughly size bytes"""
+    record_size = len(JSONCodec(__import__('json')).dumps(record(0)))
+    return [record(i) for i in range(max(size // record_size, 1))]
+
+
+def measure(func, data, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func(data)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    codecs = []
+    for name in AUTO_BACKENDS:
+        module = import_backend(name)
+        if module is not None:
+            codecs.append(JSONCodec(module))
+
+    print('%-12s %-8s %14s %14s' % ('backend', 'payload', 'dumps (MB/s)',
+                                    'loads (MB/s)'))
+    for label, size in (('1 KB', 1024), ('100 KB', 100 * 1024),
+                        ('10 MB', 10 * 1024 * 1024)):
+        data = payload(size)
+        for codec in codecs:
+            encoded = codec.dumps(data)
+            assert codec.loads(encoded) == data
+            mb = len(encoded) / 1024.0 / 1024.0
+            repeat = 3 if size > 1024 * 1024 else 50
+            dumps_time = measure(codec.dumps, data, repeat)
+            loads_time = measure(codec.loads, encoded, repeat)
+            print('%-12s %-8s %14.1f %14.1f' % (
+                codec.name, label, mb / max(dumps_time, 1e-9),
+                mb / max(loads_time, 1e-9)))
+
+
+if __name__ == '__main__':
+    main()
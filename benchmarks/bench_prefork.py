@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Load tests the prefork server with a CPU bound view that encodes a
+JSON document, to show how the throughput scales with the number of
+worker processes. A single process is capped at one core by the GIL.
+The clients run in their own processes so they don't compete with each
+other for the GIL either. The scaling stops at the number of cores.
+
+Usage:
+    python benchmarks/bench_prefork.py
+"""
+
+import os
+import sys
+import time
+import signal
+import httplib
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pwf.app import Pwf
+from pwf.serving import PreforkServer, WSGIRequestHandler
+from pwf.helpers import render_json
+
+#: Client processes and seconds each run lasts
+CLIENTS = 16
+DURATION = 3
+
+#: Records in the JSON document encoded by the view
+RECORDS = 200
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+app = Pwf()
+
+RECORD_LIST = [{'id': i, 'name': 'record %d' % i, 'tags': ['a', 'b', 'c'],
+                'score': i * 0.5} for i in range(RECORDS)]
+
+
+@app.route('/')
+def report(request):
+    return render_json(RECORD_LIST)
+
+
+def client(port, deadline):
+    conn = httplib.HTTPConnection('127.0.0.1', port, timeout=30)
+    count = 0
+    while time.time() < deadline:
+        conn.request('GET', '/')
+        conn.getresponse().read()
+        count += 1
+    conn.close()
+    return count
+
+
+def measure(workers):
+    server = PreforkServer(app, '127.0.0.1', 0, workers, threads=4,
+                           handler_class=QuietHandler)
+    master = os.fork()
+    if not master:
+        try:
+            server.serve_forever()
+        finally:
+            os._exit(0)
+    server.socket.close()
+    # Let the workers start before the clients connect
+    time.sleep(0.5)
+
+    pool = multiprocessing.Pool(CLIENTS)
+    start = time.time()
+    deadline = start + DURATION
+    results = [pool.apply_async(client, (server.server_port, deadline))
+               for _ in range(CLIENTS)]
+    total = sum(result.get() for result in results)
+    elapsed = time.time() - start
+    pool.close()
+    pool.join()
+
+    os.kill(master, signal.SIGTERM)
+    os.waitpid(master, 0)
+    return total / elapsed
+
+
+def main():
+    app.freeze()
+    print('%d clients, %d records per response, %d s per run, %d cores' % (
+        CLIENTS, RECORDS, DURATION, multiprocessing.cpu_count()))
+    print('%8s %12s %10s' % ('workers', 'req/s', 'speedup'))
+    base = None
+    for workers in (1, 2, 4, 8):
+        rate = measure(workers)
+        base = base or rate
+        print('%8d %12.1f %9.2fx' % (workers, rate, rate / base))
+
+
+if __name__ == '__main__':
+    main()
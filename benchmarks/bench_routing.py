@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Compares the prefix tree router against the previous linear scan
+over every compiled route pattern.
+
+Usage:
+    python benchmarks/bench_routing.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pwf.app import Pwf
+
+
+def linear_match(routes, path):
+    """The previous implementation of Pwf.get_route_match"""
+    for route_pattern, methods, group, view_function in routes:
+        m = route_pattern.match(path)
+        if m:
+            return m.groupdict(), methods, group, view_function
+
+
+def build_app(count):
+    app = Pwf()
+    for i in range(count):
+        app.route('/api/v1/resource%d/<id>' % i)(lambda r, id: id)
+    return app
+
+
+def main(number=20000):
+    print('%-8s %14s %14s %9s' % ('routes', 'scan (us)', 'tree (us)',
+                                  'speedup'))
+    for count in (10, 100, 1000):
+        app = build_app(count)
+        # The last registered route is the worst case for the scan
+        path = '/api/v1/resource%d/42' % (count - 1)
+        assert linear_match(app.routes, path)[0] == \
+            app.get_route_match(path)[0]
+
+        scan = timeit.timeit(lambda: linear_match(app.routes, path),
+                             number=number)
+        tree = timeit.timeit(lambda: app.get_route_match(path),
+                             number=number)
+        print('%-8d %14.2f %14.2f %8.1fx' % (
+            count, scan / number * 1e6, tree / number * 1e6, scan / tree))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Load tests the threaded server with a view standing in for an I/O bound
+handler, like one waiting on a database, to show how the throughput
+scales with the number of worker threads. Every client keeps its
+connection alive between requests.
+
+Usage:
+    python benchmarks/bench_server.py
+"""
+
+import os
+import sys
+import time
+import httplib
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pwf.app import Pwf
+from pwf.serving import make_server, WSGIRequestHandler
+
+#: Seconds the stand-in view waits, like an I/O bound handler
+VIEW_DELAY = 0.02
+
+#: Concurrent clients and seconds each run lasts
+CLIENTS = 64
+DURATION = 3
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+app = Pwf()
+
+
+@app.route('/')
+def slow(request):
+    time.sleep(VIEW_DELAY)
+    return '{"status": "ok"}'
+
+
+def client(port, deadline, counts):
+    conn = httplib.HTTPConnection('127.0.0.1', port, timeout=30)
+    count = 0
+    while time.time() < deadline:
+        conn.request('GET', '/')
+        conn.getresponse().read()
+        count += 1
+    conn.close()
+    counts.append(count)
+
+
+def measure(threads):
+    server = make_server('127.0.0.1', 0, app, threads=threads,
+                         queue_size=CLIENTS, handler_class=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    counts = []
+    start = time.time()
+    deadline = start + DURATION
+    clients = [threading.Thread(target=client,
+                                args=(server.server_port, deadline, counts))
+               for _ in range(CLIENTS)]
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+    elapsed = time.time() - start
+
+    server.shutdown()
+    server.server_close()
+    return sum(counts) / elapsed
+
+
+def main():
+    app.freeze()
+    print('%d clients, %d ms view, %d s per run' % (
+        CLIENTS, VIEW_DELAY * 1000, DURATION))
+    print('%8s %12s %12s' % ('threads', 'req/s', 'ideal req/s'))
+    for threads in (1, 4, 16, 64):
+        print('%8d %12.1f %12.1f' % (threads, measure(threads),
+                                     threads / VIEW_DELAY))
+
+
+if __name__ == '__main__':
+    main()
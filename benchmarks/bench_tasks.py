@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Compares the response times of a write view doing its follow-up work,
+like an audit write or a webhook, before responding with the same view
+handing it to request.add_background_task. The requests go through the
+threaded server on a keep-alive connection.
+
+Usage:
+    python benchmarks/bench_tasks.py
+"""
+
+import os
+import sys
+import time
+import httplib
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pwf.app import Pwf
+from pwf.serving import make_server, WSGIRequestHandler
+
+#: Seconds the follow-up work takes
+FOLLOW_UP_DELAY = 0.02
+
+#: Requests sent to each view
+REQUESTS = 200
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+app = Pwf()
+app.config['TASK_THREADS'] = 8
+
+
+def follow_up(order):
+    time.sleep(FOLLOW_UP_DELAY)
+
+
+@app.route('/inline', methods=['POST'])
+def inline(request):
+    follow_up(request.data)
+    return '{"status": "created"}'
+
+
+@app.route('/background', methods=['POST'])
+def background(request):
+    request.add_background_task(follow_up, request.data)
+    return '{"status": "created"}'
+
+
+def measure(port, path):
+    conn = httplib.HTTPConnection('127.0.0.1', port, timeout=30)
+    times = []
+    for _ in range(REQUESTS):
+        start = time.time()
+        conn.request('POST', path, '{"item": 1}')
+        conn.getresponse().read()
+        times.append(time.time() - start)
+        # Give the tasks time to finish so the queue never overflows
+        time.sleep(FOLLOW_UP_DELAY / 4)
+    conn.close()
+    times.sort()
+    return times[len(times) // 2], times[int(len(times) * 0.99)]
+
+
+def main():
+    app.freeze()
+    server = make_server('127.0.0.1', 0, app, threads=4,
+                         handler_class=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    print('%d requests, %d ms of follow-up work' % (
+        REQUESTS, FOLLOW_UP_DELAY * 1000))
+    print('%12s %10s %10s' % ('view', 'p50 (ms)', 'p99 (ms)'))
+    for path in ('/inline', '/background'):
+        p50, p99 = measure(server.server_port, path)
+        print('%12s %10.2f %10.2f' % (path[1:], p50 * 1000, p99 * 1000))
+
+    server.shutdown()
+    server.server_close()
+    app.close()
+    print('tasks: %r' % app.task_pool.stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,15 +6,32 @@
 """
 
 import re
+import time
+import threading
 import traceback
+from contextlib import contextmanager
 from wrappers import Config
 from request import Request
-from response import Response
-from functools import wraps
-from stack import _app_stack
+from routing import Router, Endpoint, compile_url
+from response import Response, StaticResponse, STATUS_LINES
+from stack import _app_stack, RequestContext
 from exceptions import HTTPException, MethodNotAllowed, NotFound, InternalError
+from exceptions import AppFrozenError, RequestEntityTooLarge
 from utils import log
-import wsgiref.simple_server
+from compression import compress_response, DEFAULT_COMPRESS_LEVEL
+from compression import DEFAULT_COMPRESS_MIN_SIZE
+from conditional import make_conditional
+from cache import ResponseCache, SingleFlight, CacheEntry, CacheOptions
+from cache import CoalesceOptions, cache_key, coalesce_key
+from cache import is_cacheable, is_shareable, client_is_fresh
+from cache import DEFAULT_CACHE_MAX_ENTRIES, DEFAULT_CACHE_MAX_BYTES
+from cache import DEFAULT_COALESCE_TIMEOUT
+from serving import make_server, PreforkServer
+from serving import DEFAULT_BACKLOG, DEFAULT_KEEP_ALIVE_TIMEOUT
+from green import make_gevent_server, run_in_threadpool, is_patched
+from tasks import TaskPool, with_tasks
+from tasks import DEFAULT_TASK_THREADS, DEFAULT_TASK_QUEUE_SIZE
+from tasks import DEFAULT_TASK_OVERFLOW
 
 
 class Pwf(object):
@@ -38,35 +55,111 @@ class Pwf(object):
     
     def __init__(self):
         self.routes = []
+        self.router = Router()
         self.config = Config()
         self.first_funcs = {}
         self.last_funcs = {}
         self.errorhandlers = {}
-        _app_stack.push(self)
+        self.frozen = False
+        self.response_cache = None
+        self.task_pool = None
+        self.flights = SingleFlight()
+        self.__not_found = None
+        self.__freeze_lock = threading.Lock()
     
-    def run(self, host='127.0.0.1', port=5000):
-        """Serves the PWF app using the wsgiref simple server. Use this
-        only for quick testing in development.
+    def run(self, host='127.0.0.1', port=5000, threads=None,
+            backlog=DEFAULT_BACKLOG, queue_size=None,
+            keep_alive_timeout=DEFAULT_KEEP_ALIVE_TIMEOUT, workers=None,
+            reuse_port=False, max_requests=None, max_rss=None,
+            server=None, concurrency=None):
+        """Serves the PWF app on host and port.
+
+        By default the wsgiref simple server is used, which handles one
+        request at a time. Use it only for quick testing in development.
+
+        With threads set, requests are handled by a pool of that many
+        worker threads, see serving.ThreadPoolWSGIServer. Accepted
+        connections wait in a queue of queue_size connections (4 per
+        thread by default), backlog is the listen backlog of the socket
+        and keep-alive connections are closed after keep_alive_timeout
+        idle seconds.
+
+        With workers set, that many processes are forked to serve the
+        app, each with its own pool of threads if threads is set, see
+        serving.PreforkServer. With reuse_port each worker listens on
+        its own SO_REUSEPORT socket. Workers are replaced after handling
+        max_requests requests or growing past max_rss bytes of memory.
+        SIGTERM drains the workers and stops the server.
+
+        With server='gevent' every request runs in a greenlet, up to
+        concurrency at once, and threads sets the size of the thread
+        pool used by views marked with @app.offload. Call
+        gevent.monkey.patch_all() at the top of your program so sockets
+        used by the views yield to other requests.
+
+        Example:
+
+            app.run(host='0.0.0.0', port=8000, threads=16)
+            app.run(host='0.0.0.0', port=8000, workers=8,
+                    max_requests=10000)
+            app.run(host='0.0.0.0', port=8000, server='gevent')
         """
-        httpd = wsgiref.simple_server.make_server('', port, self)
+        if server not in (None, 'gevent'):
+            raise ValueError('Unknown server %r' % server)
+        if server == 'gevent' and workers:
+            raise ValueError("workers can't be used with server='gevent'")
+
+        self.freeze()
+        if server == 'gevent':
+            httpd = make_gevent_server(host, port, self, concurrency,
+                                       threads, backlog)
+            if not is_patched():
+                log("Warning: gevent.monkey.patch_all() wasn't called, "
+                    "views doing I/O will block other requests")
+            log("PWF now running on http://%s:%s/ with gevent" % (
+                host, port))
+            try:
+                httpd.serve_forever()
+            finally:
+                httpd.stop()
+                self.close()
+            return
+
+        if workers:
+            httpd = PreforkServer(self, host, port, workers, threads,
+                                  reuse_port, max_requests, max_rss,
+                                  backlog, queue_size, keep_alive_timeout)
+            log("PWF now running on http://%s:%s/ with %d workers" % (
+                host, port, workers))
+            httpd.serve_forever()
+            return
+
+        httpd = make_server(host, port, self, threads, queue_size, backlog,
+                            keep_alive_timeout)
         log("PWF now running on http://%s:%s/" % (host, port,))
-        httpd.serve_forever()
+        try:
+            httpd.serve_forever()
+        finally:
+            httpd.server_close()
+            self.close()
 
     def build_route_pattern(self, url):
-        """Regex to find path variables in path"""
-        route_regex = re.sub(r'(<\w+>)', r'(?P\1.+)', url)
-        return re.compile("^{}$".format(route_regex))
+        """Regex to find path variables in path. Each variable uses
+        the regex of its converter, for example '<int:id>' becomes
+        '(?P<id>\\d+)'.
+        """
+        return re.compile(compile_url(url, self.router.converters))
 
     def get_route_match(self, path):
-        """Match a path to an entry in self.routes and return variables,
-        supported methods and view function
+        """Match a path to a route in self.router and return variables
+        and the endpoint holding the view functions for each method.
         """
-        for route_pattern, methods, group, view_function in self.routes:
-            m = route_pattern.match(path)
-            if m:
-                return m.groupdict(), methods, group, view_function
-            
-        return None
+        route_match = self.router.match(path)
+        if route_match is None:
+            return None
+
+        endpoint, kwargs = route_match
+        return kwargs, endpoint
 
     def route(self, url, methods=['GET'], group=None):
         """This function is used as a decorator for each view function
@@ -78,40 +171,238 @@ class Pwf(object):
                 return 'This is the profile page'
 
         It adds the path along with the view function itself, the request
-        method and any route variables to self.routes for the path_dispatcher
-        to user.
+        method and any route variables to self.routes and self.router for
+        the path_dispatcher to use.
         """
         def decorate(f):
-            @wraps(f)
-            def wrapper(*args, **kwargs):
-                return f(*args, **kwargs)
-        
+            self.__check_frozen()
             route_pattern = self.build_route_pattern(url) 
             self.routes.append((route_pattern, methods, group, f))
-            return wrapper
+
+            endpoint = self.router.add(url, Endpoint(url))
+            endpoint.add(methods, group, f)
+            return f
 
         return decorate
 
+    def cache(self, ttl=None, key=None, query=None):
+        """Decorator caching the rendered responses of a view in memory.
+        It can be placed above or below @app.route.
+
+        GET responses are stored for ttl seconds, or until they are
+        evicted, and sent again to GET and HEAD requests without running
+        the view. Responses that are streamed, set cookies or have a
+        Cache-Control header of no-store, no-cache or private are never
+        stored.
+
+        The cache key is the path and the query string, or only the query
+        parameters named in query, plus the request headers listed in the
+        Vary header of the response. A function taking the request and
+        returning the key can be given as key instead. The Authorization
+        and Cookie headers are always part of the key.
+
+        The first functions still run for every request and can reject
+        it before the cache is looked at. The view and the last
+        functions only run on a miss.
+
+        The size of the cache is set with app.config['CACHE_MAX_ENTRIES']
+        and app.config['CACHE_MAX_BYTES'] and its counters are available
+        in app.response_cache.stats.
+
+        Example:
+
+            @app.route('/reports')
+            @app.cache(ttl=60, query=['year'])
+            def reports(request):
+                return render_json(build_reports(request.query['year']))
+        """
+        def wrapper(f):
+            self.__check_frozen()
+            f.cache_options = CacheOptions(ttl, key, query)
+            return f
+        return wrapper
+
+    def coalesce(self, key=None, query=None, timeout=DEFAULT_COALESCE_TIMEOUT):
+        """Decorator making concurrent GET requests for the same key
+        share one run of a view. It can be placed above or below
+        @app.route and combined with @app.cache, where it keeps the
+        requests arriving when an entry expires from all running the
+        view.
+
+        The first request runs the view and the response is rendered
+        once and sent to every request that was waiting for it. If the
+        view raised an exception it's raised for every waiting request.
+        A request waiting more than timeout seconds gets a 503 Service
+        Unavailable response. Streamed responses or responses setting
+        cookies can't be shared, so the waiting requests run the view
+        themselves.
+
+        The key is built like the key of @app.cache, including the
+        Authorization and Cookie headers, plus the Accept-Encoding,
+        If-None-Match and If-Modified-Since headers, so requests from
+        different users never share a response. The first functions run
+        for every request before it joins the requests in flight.
+
+        Example:
+
+            @app.route('/dashboard')
+            @app.coalesce(timeout=10)
+            def dashboard(request):
+                return render_json(slow_query())
+        """
+        def wrapper(f):
+            self.__check_frozen()
+            f.coalesce_options = CoalesceOptions(key, query, timeout)
+            return f
+        return wrapper
+
+    def offload(self, f):
+        """Decorator running a view in a thread pool when the app is
+        served with server='gevent', for views that block without
+        yielding to other greenlets, like a database driver written in
+        C. The request waits for the view without holding up the other
+        requests. With other servers the view is called as usual.
+
+        Example:
+
+            @app.route('/report')
+            @app.offload
+            def report(request):
+                return render_json(legacy_driver.query(REPORT_SQL))
+        """
+        self.__check_frozen()
+        f.offload = True
+        return f
+
+    def freeze(self):
+        """Compiles every route into a single request handler per
+        request method. This gets called automatically on the first
+        request and once frozen no more routes, first/last functions
+        or error handlers can be registered.
+
+        Each handler has the general and group "first" functions, the
+        view, the group "last" functions and the exception handling
+        bound to it, so a request only needs the route match and one
+        dict lookup to find the code to run.
+
+        If there are no general "first" or "last" functions, unmatched
+        paths, unsupported methods and automatic OPTIONS requests are
+        answered with responses prebuilt here, unless an error handler
+        was defined for the status code.
+        """
+        if self.frozen:
+            return
+
+        # Concurrent first requests compile the routes only once
+        with self.__freeze_lock:
+            if not self.frozen:
+                self.__freeze()
+
+    def __freeze(self):
+        """Compiles the routes, see freeze. Called with the freeze lock
+        held.
+        """
+        self.response_cache = ResponseCache(
+            self.config.get('CACHE_MAX_ENTRIES', DEFAULT_CACHE_MAX_ENTRIES),
+            self.config.get('CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES))
+        self.task_pool = TaskPool(
+            self.config.get('TASK_THREADS', DEFAULT_TASK_THREADS),
+            self.config.get('TASK_QUEUE_SIZE', DEFAULT_TASK_QUEUE_SIZE),
+            self.config.get('TASK_OVERFLOW', DEFAULT_TASK_OVERFLOW))
+
+        static = not self.first_funcs.get(None) and \
+            not self.last_funcs.get(None)
+
+        for endpoint in self.router.iter_routes():
+            handlers = {}
+            for method, (group, view_function) in endpoint.views.items():
+                handlers[method] = self.__compile_handler(view_function,
+                                                          group)
+
+            if 'OPTIONS' not in handlers:
+                if static:
+                    handlers['OPTIONS'] = self.__static_handler(
+                        StaticResponse(STATUS_LINES[200],
+                                       (('Allow', endpoint.allow),
+                                        ('Content-Type', 'text/html')), ''))
+                else:
+                    handlers['OPTIONS'] = self.__compile_handler(
+                        self.__options_view(endpoint))
+
+            endpoint.handlers = handlers
+
+            if static and MethodNotAllowed.code not in self.errorhandlers:
+                endpoint.fallback = self.__static_handler(
+                    StaticResponse.error(MethodNotAllowed.code,
+                                         headers=endpoint.allow_headers))
+            else:
+                endpoint.fallback = self.__compile_handler(
+                    self.__method_not_allowed_view(endpoint))
+
+        if static and NotFound.code not in self.errorhandlers:
+            self.__not_found = self.__static_handler(
+                StaticResponse.error(NotFound.code))
+        else:
+            self.__not_found = self.__compile_handler(self.__not_found_view)
+
+        self.frozen = True
+
     def path_dispatch(self, request, make_response):
-        """Dispatches the request, does pre and post processing and
-        dispatches any exceptions to the exception handler.
+        """Dispatches the request to the compiled handler of the matched
+        route, which does pre and post processing and dispatches any
+        exceptions to the exception handler.
         """
-        try:
-            rv = self.preprocess_request(request)
-            if rv is None:
-                rv = self.process_request(request)
-        except Exception as e:
-            rv = self.handle_exception(e, make_response)
+        if not self.frozen:
+            self.freeze()
+
+        route_match = self.router.match(request.environ['PATH_INFO'])
+        if route_match is None:
+            return self.__not_found(request, {}, make_response)
 
-        return self.postprocess_request(rv, make_response)
+        endpoint, kwargs = route_match
+        handler = endpoint.handlers.get(request.method, endpoint.fallback)
+        return handler(request, kwargs, make_response)
 
     def dispatch_request(self, environ, make_response):
         """Instantiate a new Request object based on environ,
         pass it to the path dispatcher to get the response instance.
+        The request context is pushed while the request is dispatched,
+        the response is returned without being rendered.
         """
-        request = Request(environ)
-        response = self.path_dispatch(request, make_response)
-        return response
+        with self.request_context(environ) as ctx:
+            return self.path_dispatch(ctx.request, make_response)
+
+    @contextmanager
+    def app_context(self):
+        """Makes the app the current app for the code in the with block,
+        so its config is used outside of a request, for example in a
+        script or a test.
+
+        Example:
+
+            with app.app_context():
+                data = render_json(report)
+        """
+        _app_stack.push(self)
+        try:
+            yield self
+        finally:
+            _app_stack.pop()
+
+    def request_context(self, environ):
+        """Creates the RequestContext for environ. Pushing it makes the
+        request available through current_request and gives it a fresh
+        g. __call__ does this around every request, use it to run code
+        that needs a request outside of one.
+
+        Example:
+
+            with app.request_context(environ):
+                assert current_request.method == 'GET'
+        """
+        with self.app_context():
+            request = Request(environ)
+        return RequestContext(self, request)
 
     def make_response(self, data=None):
         """Called from the view function to create and return
@@ -138,6 +429,7 @@ class Pwf(object):
                 return resp
         """
         def wrapper(f):
+            self.__check_frozen()
             self.first_funcs.setdefault(group, []).append(f)
             return f
         return wrapper
@@ -155,6 +447,7 @@ class Pwf(object):
             return response
         """
         def wrapper(f):
+            self.__check_frozen()
             self.last_funcs.setdefault(group, []).append(f)
             return f
         return wrapper
@@ -171,66 +464,24 @@ class Pwf(object):
                 return "I'm sorry Dave, I'm afraid i can't do that"
         """
         def wrapper(f):
+            self.__check_frozen()
             self.errorhandlers[code] = f
         return wrapper
 
-    def preprocess_request(self, request):
-        """The first step of the request to response cycle.
-        Here we execute any general @app.first functions and
-        if a return value is given return it to the server.
-        """
-        #: Execute any general "first" functions
-        rv = self.__execute_first(request)
-        if rv is not None:
-            return rv
-
-    def process_request(self, request):
-        """Gets the requested path from the headers and
-        matches it to a route, function, group and method stored in
-        self.routes. The view funtion itself then gets executed to generate
-        the response-data.
-
-        If the requested path is not found in self.routes or the
-        request method used is not supported by the view we return
-        an error Response object.
-
-        We also execute any "first" and "last" functions.
-        """
-        path = request.headers['PATH_INFO']
-        method = request.headers['REQUEST_METHOD']
-
-        #: Match to a route
-        route_match = self.get_route_match(path)
-
-        if route_match:
-            kwargs, methods, group, view_function = route_match
-            
-            #: Execute any first functions for route group
-            first_group_rv = self.__execute_first_groups(request, group)
-            if first_group_rv is not None:
-                return first_group_rv
-            
-            if method not in methods:
-                raise MethodNotAllowed()
-            else:
-                rv = view_function(request, **kwargs)
-
-            #: Execute any last functions for a route group. If we don't want
-            #: functions without a group to be executed on top of the ones with
-            #: a group, we should build and return the response here.
-            last_group_rv = self.__execute_last_groups(rv, group)      
-            if last_group_rv is not None:
-                return last_group_rv
-            
-        else:
-            raise NotFound()
-            
-        return rv
-
-    def postprocess_request(self, rv, make_response):
+    def postprocess_request(self, rv, make_response, request=None):
         """The last step of the request to response cycle.
         Here we execute any general @app.last functions and
         return a valid response object.
+
+        If the request is given, a 200 response to a conditional GET
+        becomes a 304 Not Modified when its ETag or Last-Modified header
+        shows the client's copy is fresh, see conditional.make_conditional.
+        With app.config['AUTO_ETAG'] set, string responses get an ETag
+        generated from the data.
+
+        If app.config['COMPRESS'] is set and the request is given, the
+        response is compressed with gzip or deflate when the client
+        accepts it, see compression.compress_response.
         """
         response = self.__build_response(rv, make_response)
         
@@ -240,7 +491,21 @@ class Pwf(object):
             last_rv = self.handle_exception(e, make_response)
 
         if last_rv is not None:
-            return last_rv
+            response = last_rv
+
+        if request is None or not isinstance(response, Response) or \
+                isinstance(response, StaticResponse):
+            return response
+
+        make_conditional(response, request.environ,
+                         self.config.get('AUTO_ETAG'))
+
+        if self.config.get('COMPRESS'):
+            compress_response(
+                response, request.environ,
+                self.config.get('COMPRESS_LEVEL', DEFAULT_COMPRESS_LEVEL),
+                self.config.get('COMPRESS_MIN_SIZE',
+                                DEFAULT_COMPRESS_MIN_SIZE))
 
         return response
     
@@ -254,7 +519,7 @@ class Pwf(object):
         if self.config.get('DEBUG', None):
             traceback.print_exc() # pragma: no cover
 
-        if isinstance(e, (NotFound, MethodNotAllowed)):
+        if isinstance(e, HTTPException):
             rv = self.__error_return(make_response, e.respcode)
         elif isinstance(e, Exception):
             rv = self.__error_return(make_response, 500)
@@ -277,28 +542,6 @@ class Pwf(object):
         
         return response
 
-    def __execute_first_groups(self, request, group):
-        """Execute only the first functions attached to a group."""
-        if group is not None:
-            rv = self.__execute_first(request, group)
-            return rv
-
-    def __execute_last_groups(self, response, group):
-        """Execute only the last functions attached to a group-"""
-        if group is not None:
-            rv = self.__execute_last(response, group)
-            return rv
-
-    def __execute_first(self, request, group=None):
-        """Runs through and executes any functions
-        in the self.first_funcs dictionary.
-        """
-        funcs = self.first_funcs.get(group, ())
-        for func in funcs:
-            rv = func(request)
-            if rv is not None: 
-                return rv
-
     def __execute_last(self, response, group=None):
         """Runs throug and executes any functions
         in the self.last_funcs dictionary.
@@ -312,10 +555,12 @@ class Pwf(object):
             if rv is not None:
                 return rv
 
-    def __error_return(self, make_response, code=404):
+    def __error_return(self, make_response, code=404, headers=None):
         """Checks if an error handler was defined by the
         user and in that case returns that as the response.
-        If no handler was defined we return an empty response.
+        If no handler was defined we return an empty response, which
+        is the prebuilt StaticResponse for the code unless a "last"
+        function might modify it. Any headers are added to the response.
         """
         errorhandler = self.errorhandlers.get(code, None)
 
@@ -326,22 +571,271 @@ class Pwf(object):
         
         if rv is not None:
             response = self.__build_response(rv, make_response, code=code)
+        elif not self.last_funcs.get(None):
+            return StaticResponse.error(code, make_response, headers)
         else:
             response = Response(make_response, code)
+
+        if headers:
+            response.headers.update(headers)
         return response
         
+    def __check_frozen(self):
+        """Raises AppFrozenError if the app has been frozen"""
+        if self.frozen:
+            raise AppFrozenError('The app is frozen and no more routes, '
+                                 'first/last functions or error handlers '
+                                 'can be registered.')
+
+    def __compile_handler(self, view_function, group=None):
+        """Binds the general and group "first" functions, the view
+        function, the group "last" functions and the exception handling
+        into one request handler. Every lookup that doesn't change after
+        startup is done once, here.
+        """
+        first_funcs = tuple(self.first_funcs.get(None, ()))
+        last_funcs = ()
+        if group is not None:
+            first_funcs += tuple(self.first_funcs.get(group, ()))
+            last_funcs = tuple(self.last_funcs.get(group, ()))
+
+        handle_exception = self.handle_exception
+        postprocess_request = self.postprocess_request
+        max_content_length = self.config.get('MAX_CONTENT_LENGTH')
+        offload = getattr(view_function, 'offload', False)
+
+        def prepare(request):
+            # Runs the first functions and returns the first value one of
+            # them returned, letting exceptions through
+            if max_content_length is not None and \
+                    request.content_length > max_content_length:
+                raise RequestEntityTooLarge()
+
+            for func in first_funcs:
+                rv = func(request)
+                if rv is not None:
+                    return rv
+
+        def process(request, kwargs):
+            # Runs the view and the last functions and returns what they
+            # returned, letting exceptions through
+            if offload:
+                rv = run_in_threadpool(view_function, request, **kwargs)
+            else:
+                rv = view_function(request, **kwargs)
+
+            if last_funcs:
+                response = rv
+                if not isinstance(response, Response):
+                    response = Response(data=rv)
+
+                for func in last_funcs:
+                    last_rv = func(response)
+                    if last_rv is not None:
+                        return last_rv
+            return rv
+
+        def handler(request, kwargs, make_response):
+            try:
+                rv = prepare(request)
+                if rv is None:
+                    rv = process(request, kwargs)
+            except Exception as e:
+                rv = handle_exception(e, make_response)
+
+            return postprocess_request(rv, make_response, request)
+
+        cache_options = getattr(view_function, 'cache_options', None)
+        coalesce_options = getattr(view_function, 'coalesce_options', None)
+        if cache_options is not None or coalesce_options is not None:
+            return self.__shared_handler(prepare, process, handler,
+                                         cache_options, coalesce_options)
+
+        return handler
+
+    def __shared_handler(self, prepare, process, handler, cache_options,
+                         coalesce_options):
+        """Wraps a compiled request handler for views decorated with
+        @app.cache or @app.coalesce. Only GET and HEAD requests are
+        affected. prepare runs the first functions and process runs the
+        view and the last functions, both without handling exceptions.
+        handler is the complete handler.
+
+        The first functions run for every request before the cache or
+        the requests in flight are looked at, so a first function
+        rejecting a request still rejects it on a cache hit.
+
+        With cache_options, requests are answered from
+        self.response_cache when possible. On a miss the response is
+        rendered once and stored as the status line, header list and
+        body bytes, which are sent as they are on every hit.
+
+        With coalesce_options, concurrent GET requests with the same key
+        share one run of the view through self.flights. The response is
+        rendered once and sent to every waiting request. An exception
+        raised by the view goes to every waiting request too, and each
+        one turns it into its error response, so a failing view still
+        runs once. A request waiting longer than the timeout gets a 503
+        Service Unavailable.
+        """
+        cache = self.response_cache if cache_options is not None else None
+        flights = self.flights if coalesce_options is not None else None
+        ttl = cache_options.ttl if cache_options is not None else None
+        handle_exception = self.handle_exception
+        postprocess_request = self.postprocess_request
+
+        def replay(entry, environ, make_response):
+            if client_is_fresh(entry, environ):
+                status, headers, body = entry.not_modified()
+            else:
+                status, headers, body = (entry.status, entry.headers,
+                                         entry.body)
+            return StaticResponse(status, headers, body, make_response)
+
+        def shared_handler(request, kwargs, make_response):
+            if request.method not in ('GET', 'HEAD'):
+                return handler(request, kwargs, make_response)
+
+            try:
+                rv = prepare(request)
+            except Exception as e:
+                rv = handle_exception(e, make_response)
+            if rv is not None:
+                return postprocess_request(rv, make_response, request)
+
+            environ = request.environ
+            if cache is not None:
+                key = cache_key(request, cache_options)
+                entry = cache.get(key, environ)
+                if entry is not None:
+                    return replay(entry, environ, make_response)
+
+            def run(share):
+                response = postprocess_request(process(request, kwargs),
+                                               make_response, request)
+                if not isinstance(response, Response) or \
+                        isinstance(response, StaticResponse):
+                    return response
+
+                cacheable = cache is not None and \
+                    is_cacheable(response, environ)
+                if not cacheable and not (share and is_shareable(response)):
+                    return response
+
+                rendered = []
+                response.make_response = lambda *args: rendered.append(args)
+                body = response.render(environ)
+                status, headers = rendered[0]
+
+                expires = time.time() + ttl if ttl is not None else None
+                entry = CacheEntry(status, headers, body, expires)
+                if cacheable:
+                    cache.set(key, environ, entry)
+                return entry
+
+            try:
+                if flights is None or request.method != 'GET' or \
+                        environ.get('HTTP_RANGE'):
+                    result = run(False)
+                else:
+                    # Raises what the view raised, or ServiceUnavailable
+                    # if the wait timed out
+                    result, leader = flights.do(
+                        coalesce_key(request, coalesce_options),
+                        lambda: run(True), coalesce_options.timeout)
+
+                    if not leader and not isinstance(result, CacheEntry):
+                        # The response of the request running the view
+                        # can't be shared, like a streamed response
+                        result = postprocess_request(
+                            process(request, kwargs), make_response,
+                            request)
+            except Exception as e:
+                return postprocess_request(
+                    handle_exception(e, make_response), make_response,
+                    request)
+
+            if isinstance(result, CacheEntry):
+                return StaticResponse(result.status, result.headers,
+                                      result.body, make_response)
+            return result
+
+        return shared_handler
+
+    def __static_handler(self, response):
+        """Returns a request handler answering every request with the
+        prebuilt StaticResponse response.
+        """
+        status, headers, body = (response.status, response.header_list,
+                                 response.body)
+
+        def handler(request, kwargs, make_response):
+            return StaticResponse(status, headers, body, make_response)
+
+        return handler
+
+    def __not_found_view(self, request):
+        """View used by the compiled handler for unmatched paths"""
+        return self.__error_return(None, NotFound.code)
+
+    def __options_view(self, endpoint):
+        """Returns a view answering OPTIONS requests for endpoint"""
+        def options_view(request):
+            return Response(data=('', dict(endpoint.allow_headers)))
+        return options_view
+
+    def __method_not_allowed_view(self, endpoint):
+        """Returns a view answering unsupported methods for endpoint"""
+        def method_not_allowed_view(request):
+            return self.__method_not_allowed(endpoint)
+        return method_not_allowed_view
+
+    def __method_not_allowed(self, endpoint):
+        """Returns the 405 response for endpoint with its Allow header
+        without going through the exception handler.
+        """
+        return self.__error_return(None, MethodNotAllowed.code,
+                                   endpoint.allow_headers)
+
     def __call__(self, environ, make_response):
         """Gets executed every time an instance of the class
         gets called. 
         
-        Calls dispatch_request with the standard WSGI objects
-        environ and make_request to get back a response.
+        Creates the request context for the standard WSGI objects
+        environ and make_response and passes the request to
+        path_dispatch to get back a response. The first call freezes
+        the app.
 
-        It then calls render() on the response to render it 
+        It then calls render() on the response to render it
         back to the server.
+
+        The request context is pushed while the request is dispatched
+        and rendered and popped afterwards, even if it fails. A streamed
+        body is iterated by the server after that, so a generator
+        needing the request should get what it needs up front.
+
+        If the view added background tasks, the body is wrapped so they
+        are handed to self.task_pool when the server closes it.
+        """
+        ctx = self.request_context(environ)
+        ctx.push()
+        try:
+            resp = self.path_dispatch(ctx.request, make_response)
+            body = resp.render(environ)
+        finally:
+            ctx.pop()
+
+        tasks = ctx.request.background_tasks
+        if tasks:
+            return with_tasks(body, self.task_pool, tasks, environ)
+        return body
+
+    def close(self):
+        """Waits for the queued background tasks to finish. Called when
+        app.run stops serving and before a prefork worker exits.
         """
-        resp = self.dispatch_request(environ, make_response)
-        return resp.render()
+        if self.task_pool is not None:
+            self.task_pool.close()
 
     def __repr__(self):
         return '%s()' % self.__class__.__name__
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Implements the in-process response cache used by views decorated
+with @app.cache. Rendered responses are kept in memory with a time to
+live and evicted in least recently used order.
+
+Also implements the request coalescing used by views decorated with
+@app.coalesce, where identical concurrent requests share one run of
+the view.
+"""
+
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+from conditional import is_fresh, NOT_MODIFIED_HEADERS
+from response import STATUS_LINES
+from exceptions import ServiceUnavailable
+
+
+#: The most responses kept unless CACHE_MAX_ENTRIES is set
+DEFAULT_CACHE_MAX_ENTRIES = 1024
+
+#: The most body bytes kept unless CACHE_MAX_BYTES is set
+DEFAULT_CACHE_MAX_BYTES = 1024 * 1024 * 64
+
+#: Seconds a coalesced request waits for the request running the view
+DEFAULT_COALESCE_TIMEOUT = 30
+
+
+class CacheOptions(object):
+    """The options given to @app.cache, attached to the view function"""
+
+    __slots__ = ('ttl', 'key', 'query')
+
+    def __init__(self, ttl=None, key=None, query=None):
+        self.ttl = ttl
+        self.key = key
+        self.query = query
+
+    def __repr__(self):
+        return '%s(ttl=%r)' % (self.__class__.__name__, self.ttl)
+
+
+class CoalesceOptions(object):
+    """The options given to @app.coalesce, attached to the view
+    function.
+    """
+
+    __slots__ = ('key', 'query', 'timeout')
+
+    def __init__(self, key=None, query=None,
+                 timeout=DEFAULT_COALESCE_TIMEOUT):
+        self.key = key
+        self.query = query
+        self.timeout = timeout
+
+    def __repr__(self):
+        return '%s(timeout=%r)' % (self.__class__.__name__, self.timeout)
+
+
+class CacheEntry(object):
+    """A rendered response: the status line, the WSGI header list and
+    the encoded body, along with the time it expires.
+    """
+
+    __slots__ = ('status', 'headers', 'body', 'expires', 'etag',
+                 'last_modified')
+
+    def __init__(self, status, headers, body, expires=None):
+        self.status = status
+        self.headers = tuple(headers)
+        self.body = body
+        self.expires = expires
+
+        names = dict((name.lower(), value) for name, value in self.headers)
+        self.etag = names.get('etag')
+        self.last_modified = names.get('last-modified')
+
+    @property
+    def size(self):
+        return len(self.body)
+
+    def is_expired(self, now):
+        return self.expires is not None and now >= self.expires
+
+    def not_modified(self):
+        """Returns the status, headers and body of a 304 Not Modified
+        response for the entry.
+        """
+        headers = tuple((name, value) for name, value in self.headers
+                        if name.lower() in NOT_MODIFIED_HEADERS)
+        return STATUS_LINES[304], headers, ''
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.status)
+
+
+def request_key(request, query=None):
+    """The default cache key for a request: the path and the query
+    string, or only the query parameters named in query if given.
+    """
+    environ = request.environ
+    if query is None:
+        return environ.get('PATH_INFO'), environ.get('QUERY_STRING', '')
+
+    params = request.query
+    return environ.get('PATH_INFO'), tuple(
+        (name, params.get(name)) for name in query)
+
+
+#: Request headers carrying the credentials of the user. They are part
+#: of every cache and coalesce key, so requests of different users never
+#: share a response.
+CREDENTIAL_HEADERS = ('HTTP_AUTHORIZATION', 'HTTP_COOKIE')
+
+
+def cache_key(request, options):
+    """Builds the key of a request with the key function or query
+    parameters in options, plus the credentials of the request.
+    """
+    if options.key is not None:
+        key = options.key(request)
+    else:
+        key = request_key(request, options.query)
+
+    environ = request.environ
+    return key, tuple(environ.get(name) for name in CREDENTIAL_HEADERS)
+
+
+#: Request headers that change the response of any view, and so are
+#: part of the key of a coalesced request.
+COALESCE_HEADERS = ('HTTP_ACCEPT_ENCODING', 'HTTP_IF_NONE_MATCH',
+                    'HTTP_IF_MODIFIED_SINCE')
+
+
+def coalesce_key(request, options):
+    """Builds the key of a coalesced request"""
+    environ = request.environ
+    return cache_key(request, options), tuple(
+        environ.get(name) for name in COALESCE_HEADERS)
+
+
+def environ_header(environ, name):
+    """Returns the value of the request header name from environ"""
+    key = name.upper().replace('-', '_')
+    if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+        key = 'HTTP_' + key
+    return environ.get(key)
+
+
+def vary_headers(headers):
+    """Returns the sorted lowercase names listed in the Vary headers
+    of a WSGI header list.
+    """
+    names = set()
+    for name, value in headers:
+        if name.lower() == 'vary':
+            names.update(v.strip().lower() for v in value.split(',')
+                         if v.strip())
+    return tuple(sorted(names))
+
+
+class ResponseCache(object):
+    """Keeps rendered responses in memory, bounded both by the number
+    of entries and by the total size of the bodies. When either limit
+    is reached the least recently used entries are evicted.
+
+    The request headers listed in the Vary header of a response are
+    remembered for its key, so later lookups for the same key include
+    the values of those headers and each variant is cached apart.
+
+    Hits, misses and evictions are counted in self.stats.
+
+    Example:
+
+        cache = ResponseCache(max_entries=100)
+        cache.set(key, environ, CacheEntry(status, headers, body))
+        entry = cache.get(key, environ)
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_MAX_ENTRIES,
+                 max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.vary = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, environ):
+        """Returns the entry for key and the request environ, or None
+        if it isn't cached or has expired.
+        """
+        with self.lock:
+            full_key = self.__full_key(key, environ, self.vary.get(key))
+            entry = self.entries.pop(full_key, None)
+            if entry is not None and entry.is_expired(time.time()):
+                self.size -= entry.size
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            # Move the entry to the end, the most recently used
+            self.entries[full_key] = entry
+            self.hits += 1
+            return entry
+
+    def set(self, key, environ, entry):
+        """Stores entry for key and the request environ, evicting the
+        least recently used entries if the cache is full. Bodies larger
+        than max_bytes are never stored.
+        """
+        vary = vary_headers(entry.headers)
+        if entry.size > self.max_bytes or '*' in vary:
+            return
+
+        with self.lock:
+            if vary != self.vary.get(key, ()):
+                self.vary[key] = vary
+            full_key = self.__full_key(key, environ, vary)
+
+            old = self.entries.pop(full_key, None)
+            if old is not None:
+                self.size -= old.size
+
+            self.entries[full_key] = entry
+            self.size += entry.size
+
+            while len(self.entries) > self.max_entries or \
+                    self.size > self.max_bytes:
+                evicted_key, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.size
+                self.evictions += 1
+
+    def clear(self):
+        """Removes every entry"""
+        with self.lock:
+            self.entries.clear()
+            self.vary.clear()
+            self.size = 0
+
+    @property
+    def stats(self):
+        """The cache counters as a dictionary"""
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'entries': len(self.entries),
+                'bytes': self.size}
+
+    def __full_key(self, key, environ, vary):
+        if not vary:
+            return key
+        return key, tuple(environ_header(environ, name) for name in vary)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.stats)
+
+
+class Flight(object):
+    """A view run shared by coalesced requests"""
+
+    __slots__ = ('event', 'result', 'exc_info')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.exc_info = None
+
+
+class SingleFlight(object):
+    """Runs a function once for every group of concurrent calls with
+    the same key. The first caller runs it while the others wait for
+    its result, or get the exception it raised.
+
+    Waiting uses threading.Event, so it works with threads and with
+    green threads once the threading module is monkey patched.
+
+    Example:
+
+        flights = SingleFlight()
+        result, leader = flights.do(key, load_report, timeout=30)
+    """
+
+    def __init__(self):
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, func, timeout=None):
+        """Runs func, or waits for the run already in flight for key.
+        Returns a tuple of the result and True if this call ran func.
+
+        Raises ServiceUnavailable if the result isn't ready within
+        timeout seconds.
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+
+        if leader:
+            try:
+                flight.result = func()
+            except Exception:
+                flight.exc_info = sys.exc_info()
+                raise
+            finally:
+                with self.lock:
+                    del self.flights[key]
+                flight.event.set()
+            return flight.result, True
+
+        if not flight.event.wait(timeout):
+            raise ServiceUnavailable()
+        if flight.exc_info is not None:
+            raise flight.exc_info[0], flight.exc_info[1], flight.exc_info[2]
+        return flight.result, False
+
+    def __len__(self):
+        return len(self.flights)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, len(self.flights))
+
+
+def is_shareable(response):
+    """Checks if a response can be rendered once and sent to several
+    requests: it isn't streamed and sets no cookies.
+    """
+    return not response.is_streamed and 'Set-Cookie' not in response.headers
+
+
+def is_cacheable(response, environ):
+    """Checks if a rendered response can be stored. Only complete 200
+    responses to GET requests without cookies or a Cache-Control header
+    forbidding shared caching are stored.
+    """
+    if response.code != 200 or not is_shareable(response) or \
+            environ.get('REQUEST_METHOD') != 'GET' or \
+            environ.get('HTTP_RANGE'):
+        return False
+
+    headers = response.headers
+    cache_control = headers.get('Cache-Control', '').lower()
+    return 'no-store' not in cache_control and \
+        'private' not in cache_control and 'no-cache' not in cache_control
+
+
+def client_is_fresh(entry, environ):
+    """Checks if the client's copy of a cached entry is fresh"""
+    if entry.etag is None and entry.last_modified is None:
+        return False
+    return is_fresh(environ, entry.etag, entry.last_modified)
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Implements the gzip and deflate compression of responses, negotiated
+through the Accept-Encoding request header, and the decompression of
+request bodies sent with a Content-Encoding header. Compression is
+turned on with app.config['COMPRESS'].
+"""
+
+import zlib
+
+from wrappers import StreamingBody
+from exceptions import BadRequest, RequestEntityTooLarge
+
+
+#: Compression level used unless COMPRESS_LEVEL is set, 1 is the
+#: fastest and 9 the smallest
+DEFAULT_COMPRESS_LEVEL = 6
+
+#: Bodies smaller than this many bytes are sent uncompressed unless
+#: COMPRESS_MIN_SIZE is set
+DEFAULT_COMPRESS_MIN_SIZE = 500
+
+#: Request bodies that decompress to more than this many times their
+#: compressed size are refused unless MAX_DECOMPRESSION_RATIO is set
+DEFAULT_MAX_DECOMPRESSION_RATIO = 100
+
+#: Mimetypes that are compressed, besides any text/* type and any
+#: type ending in +json or +xml
+COMPRESSIBLE_TYPES = frozenset([
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+])
+
+#: The zlib window bits producing each content coding
+_wbits = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+
+
+def is_compressible(content_type):
+    """Checks if a response with content_type is worth compressing"""
+    mimetype = content_type.split(';', 1)[0].strip().lower()
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES \
+        or mimetype.endswith('+json') or mimetype.endswith('+xml')
+
+
+def negotiate_encoding(accept_encoding):
+    """Picks the content coding to use from an Accept-Encoding header.
+    Returns 'gzip', 'deflate' or None if the client accepts neither.
+    gzip is preferred when both have the same quality.
+    """
+    if not accept_encoding:
+        return None
+
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in ('gzip', 'deflate'):
+        q = qualities.get(coding, qualities.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def request_encoding(content_encoding):
+    """Returns 'gzip' or 'deflate' if a request body with the
+    Content-Encoding content_encoding can be decompressed, else None.
+    """
+    if not content_encoding:
+        return None
+    encoding = content_encoding.strip().lower()
+    if encoding == 'x-gzip':
+        encoding = 'gzip'
+    return encoding if encoding in _wbits else None
+
+
+def decompress_chunks(chunks, encoding, max_size=None,
+                      max_ratio=DEFAULT_MAX_DECOMPRESSION_RATIO,
+                      buffer_size=16384):
+    """Decompresses an iterable of compressed chunks and yields the
+    decompressed data in chunks of up to buffer_size bytes, so a small
+    body that decompresses to gigabytes is never held in memory.
+
+    Raises RequestEntityTooLarge as soon as the data decompresses to
+    more than max_size bytes or to more than max_ratio times the
+    compressed data read so far, and BadRequest if the data is corrupt.
+    """
+    decompressor = zlib.decompressobj(_wbits[encoding])
+    size_in = size_out = 0
+
+    for chunk in chunks:
+        size_in += len(chunk)
+        data = chunk
+        while data:
+            try:
+                out = decompressor.decompress(data, buffer_size)
+            except zlib.error:
+                raise BadRequest(description='Invalid %s data' % encoding)
+            data = decompressor.unconsumed_tail
+
+            size_out += len(out)
+            if max_size is not None and size_out > max_size:
+                raise RequestEntityTooLarge()
+            if max_ratio is not None and size_out > size_in * max_ratio:
+                raise RequestEntityTooLarge()
+            if out:
+                yield out
+
+    out = decompressor.flush()
+    if out:
+        size_out += len(out)
+        if max_size is not None and size_out > max_size:
+            raise RequestEntityTooLarge()
+        yield out
+
+
+def compress(data, encoding, level=DEFAULT_COMPRESS_LEVEL):
+    """Compresses the string data with the encoding content coding"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _wbits[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+class CompressedBody(object):
+    """Compresses streamed response data chunk by chunk as the server
+    asks for it, so the body is never held in memory as a whole.
+
+    The compressed data is flushed after every chunk taken from a
+    generator or iterator so each chunk reaches the client as soon as
+    it's produced. File data is only flushed at the end, which gives a
+    better compression ratio.
+    """
+
+    def __init__(self, body, encoding, level=DEFAULT_COMPRESS_LEVEL,
+                 buffer_size=16384):
+        self.body = StreamingBody(body, buffer_size)
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED,
+                                           _wbits[encoding])
+        self.sync = not hasattr(body, 'read')
+        self.finished = False
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        compressor = self.compressor
+        while not self.finished:
+            try:
+                chunk = next(self.body)
+            except StopIteration:
+                self.finished = True
+                return compressor.flush()
+
+            data = compressor.compress(chunk)
+            if self.sync:
+                data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                return data
+
+        raise StopIteration()
+
+    __next__ = next
+
+    def close(self):
+        """Close the wrapped data"""
+        self.body.close()
+
+
+def compress_response(response, environ, level=DEFAULT_COMPRESS_LEVEL,
+                      min_size=DEFAULT_COMPRESS_MIN_SIZE):
+    """Compresses the data of response if the client accepts gzip or
+    deflate and the Content-Type is compressible.
+
+    String data shorter than min_size bytes is left alone, as is
+    streamed data with a shorter Content-Length. Streamed data is
+    wrapped in a CompressedBody. Responses that are already encoded,
+    aren't 200 responses or answer a Range request are never
+    compressed. Vary: Accept-Encoding is added to every compressible
+    response so caches keep the versions apart, and a strong ETag is
+    made weak since the compressed bytes differ from the original.
+    """
+    headers = response.headers
+    if response.code != 200 or 'Content-Encoding' in headers or \
+            not is_compressible(headers.get('Content-Type', 'text/html')):
+        return
+
+    vary = headers.get('Vary')
+    if vary is None:
+        headers['Vary'] = 'Accept-Encoding'
+    elif 'accept-encoding' not in vary.lower() and vary != '*':
+        headers['Vary'] = '%s, Accept-Encoding' % vary
+
+    if environ.get('HTTP_RANGE'):
+        return
+
+    encoding = negotiate_encoding(environ.get('HTTP_ACCEPT_ENCODING'))
+    if encoding is None:
+        return
+
+    data = response.data
+    if response.is_streamed:
+        length = headers.get('Content-Length')
+        if length is not None and int(length) < min_size:
+            return
+        response.data = CompressedBody(data, encoding, level,
+                                       response.buffer_size)
+        headers.remove('Content-Length')
+    else:
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        elif not isinstance(data, str):
+            data = bytes(data)
+        if len(data) < min_size:
+            return
+        response.data = compress(data, encoding, level)
+        headers['Content-Length'] = bytes(len(response.data))
+
+    headers['Content-Encoding'] = encoding
+
+    etag = headers.get('ETag')
+    if etag is not None and not etag.startswith('W/'):
+        headers['ETag'] = 'W/' + etag
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Implements ETags and the evaluation of the If-None-Match and
+If-Modified-Since headers used to answer conditional GET requests
+with 304 Not Modified.
+"""
+
+import hashlib
+
+from utils import http_date, parse_http_date, to_timestamp
+
+
+def generate_etag(data, weak=False):
+    """Generates an ETag from the md5 hash of the string data. A weak
+    ETag only promises the content is equivalent, not identical.
+    """
+    etag = '"%s"' % hashlib.md5(data).hexdigest()
+    return 'W/' + etag if weak else etag
+
+
+def quote_etag(etag, weak=False):
+    """Turns a value like a row version into an ETag. Values that are
+    already quoted ETags are returned as is.
+    """
+    etag = bytes(etag)
+    if etag.startswith('"') or etag.startswith('W/"'):
+        return etag
+    etag = '"%s"' % etag
+    return 'W/' + etag if weak else etag
+
+
+def parse_etags(value):
+    """Parses an If-None-Match or If-Match header into a list of ETags
+    with any weak prefix removed. Returns ['*'] for the wildcard.
+    """
+    etags = []
+    for etag in value.split(','):
+        etag = etag.strip()
+        if etag.startswith('W/'):
+            etag = etag[2:]
+        if etag:
+            etags.append(etag)
+    return etags
+
+
+def etag_matches(if_none_match, etag):
+    """Compares an If-None-Match header to etag using the weak
+    comparison, where W/"a" and "a" are the same.
+    """
+    etags = parse_etags(if_none_match)
+    if '*' in etags:
+        return True
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    return etag in etags
+
+
+def is_fresh(environ, etag=None, last_modified=None):
+    """Checks if the copy the client has cached is still fresh.
+
+    If-None-Match is compared to etag and takes precedence over
+    If-Modified-Since, which is compared to last_modified. last_modified
+    may be a timestamp, an HTTP date or a datetime in UTC.
+    """
+    if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        return etag is not None and etag_matches(if_none_match,
+                                                 quote_etag(etag))
+
+    if_modified_since = parse_http_date(
+        environ.get('HTTP_IF_MODIFIED_SINCE'))
+    last_modified = to_timestamp(last_modified)
+    if if_modified_since is None or last_modified is None:
+        return False
+    return int(last_modified) <= if_modified_since
+
+
+def not_modified_headers(etag=None, last_modified=None):
+    """Returns the ETag and Last-Modified headers for the values"""
+    headers = {}
+    if etag is not None:
+        headers['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(to_timestamp(last_modified))
+    return headers
+
+
+#: Headers kept on a 304 response, every other header describes the
+#: body that isn't sent
+NOT_MODIFIED_HEADERS = frozenset([
+    'cache-control', 'content-location', 'date', 'etag', 'expires',
+    'last-modified', 'vary', 'set-cookie',
+])
+
+
+def make_conditional(response, environ, auto_etag=False):
+    """Turns a 200 response to a GET or HEAD request into a bodyless
+    304 Not Modified if the client's copy is fresh, judged by the ETag
+    and Last-Modified headers of the response.
+
+    With auto_etag set, responses with string data and no ETag header
+    get a strong ETag generated from the data. An ETag header set by the
+    view, like a row version, is quoted if needed.
+    """
+    if response.code != 200 or \
+            environ.get('REQUEST_METHOD') not in ('GET', 'HEAD'):
+        return
+
+    headers = response.headers
+    if auto_etag and 'ETag' not in headers and \
+            isinstance(response.data, basestring):
+        data = response.data
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        headers['ETag'] = generate_etag(data)
+    elif 'ETag' in headers:
+        headers['ETag'] = quote_etag(headers['ETag'])
+
+    if not is_fresh(environ, headers.get('ETag'),
+                    headers.get('Last-Modified')):
+        return
+
+    close = getattr(response.data, 'close', None)
+    if close is not None:
+        close()
+
+    for name in set(headers.keys()):
+        if name.lower() not in NOT_MODIFIED_HEADERS:
+            headers.remove(name)
+
+    response.code = 304
+    response.data = ''
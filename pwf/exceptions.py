@@ -15,13 +15,20 @@ class HTTPException(Exception):
     description = None
 
     def __init__(self, code=None, description=None):
-        Exception.__init__(self)
+        Exception.__init__(self, *filter(None, [description]))
+        if description is not None:
+            self.description = description
 
     @property
     def respcode(self):
         return self.code
 
 
+class BadRequest(HTTPException):
+    code = 400
+    description = ''
+
+
 class NotFound(HTTPException):
     code = 404
     description = ''
@@ -41,3 +48,19 @@ class RequestEntityTooLarge(HTTPException):
     code = 413
     description = ''
 
+
+class ServiceUnavailable(HTTPException):
+    code = 503
+    description = ''
+
+
+class AppFrozenError(RuntimeError):
+    """Raised when routes, hooks or error handlers are registered
+    after the app has been frozen.
+    """
+
+
+class ContextError(RuntimeError):
+    """Raised when current_app, current_request or g are used outside
+    of a request, or outside of the app context for current_app.
+    """
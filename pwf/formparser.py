@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Implements an incremental multipart/form-data parser used by the
+Request object to parse forms and file uploads.
+"""
+
+import cgi
+from tempfile import SpooledTemporaryFile
+
+from wrappers import FileWrapper
+
+
+class MultipartParser(object):
+    """Parses a multipart/form-data stream one chunk at a time.
+
+    The stream is read in chunks of buffer_size and searched for the
+    boundary between parts, so a part is never held in memory as a
+    whole. Form fields are returned as strings while file parts are
+    written straight to their own spooled temporary file that rolls
+    over to disk once it grows past spool_threshold bytes.
+
+    Example:
+
+        parser = MultipartParser('foo')
+        form, files = parser.parse(stream, content_length)
+    """
+
+    #: The largest block of part headers accepted
+    max_header_size = 16384
+
+    def __init__(self, boundary, buffer_size=16384,
+                 spool_threshold=1024 * 500):
+        self.boundary = boundary
+        self.buffer_size = buffer_size
+        self.spool_threshold = spool_threshold
+
+        # Every delimiter, including the first one, is preceded by CRLF.
+        # The parser prepends CRLF to the stream so the first delimiter
+        # doesn't need special handling.
+        self.delimiter = b'\r\n--' + boundary
+
+    def parse(self, stream, content_length):
+        """Parses the stream and returns a tuple of a form dictionary
+        and a files dictionary of FileWrapper objects, both keyed by
+        the field name.
+        """
+        form = {}
+        files = {}
+
+        for headers, params, part in self.parse_parts(stream,
+                                                      content_length):
+            name = params.get('name')
+
+            if isinstance(part, list):
+                form[name] = b''.join(part)
+            else:
+                part.seek(0)
+                mimetype = cgi.parse_header(
+                    headers.get('content-type', ''))[0]
+                files[name] = FileWrapper(part, params['filename'], name,
+                                          mimetype=mimetype, headers=headers)
+
+        return form, files
+
+    def parse_parts(self, stream, content_length):
+        """Generator yielding a tuple of the headers, the
+        Content-Disposition parameters and the data of each part.
+        The data is a list of string chunks for form fields and a
+        spooled temporary file for file parts.
+        """
+        delimiter = self.delimiter
+        delimiter_length = len(delimiter)
+        # Data that might be the start of a delimiter is kept back
+        # until the next chunk has been read
+        keep = delimiter_length + 4
+
+        buf = b'\r\n'
+        pos = 0
+        part = headers = params = None
+        state = 'preamble'
+
+        for chunk in self.__read_chunks(stream, content_length):
+            # Only the unparsed tail of the buffer is carried over, so
+            # the buffer never grows much beyond one chunk.
+            buf = buf[pos:] + chunk
+            pos = 0
+
+            while True:
+                if state == 'preamble':
+                    index = buf.find(delimiter, pos)
+                    if index == -1:
+                        pos = max(pos, len(buf) - keep)
+                        break
+                    pos = index + delimiter_length
+                    state = 'delimiter'
+
+                if state == 'delimiter':
+                    # The delimiter is followed by CRLF for the next part
+                    # or by "--" at the end of the stream
+                    if len(buf) - pos < 2:
+                        break
+                    if buf.startswith(b'--', pos):
+                        return
+                    state = 'headers'
+
+                if state == 'headers':
+                    index = buf.find(b'\r\n\r\n', pos)
+                    if index == -1:
+                        if len(buf) - pos > self.max_header_size:
+                            return
+                        break
+                    headers = self.__parse_headers(buf[pos:index])
+                    disposition, params = cgi.parse_header(
+                        headers.get('content-disposition', ''))
+                    part = self.__new_part(params)
+                    pos = index + 4
+                    state = 'body'
+
+                if state == 'body':
+                    index = buf.find(delimiter, pos)
+                    if index == -1:
+                        # Write everything that can't be part of a
+                        # delimiter and wait for more data
+                        end = len(buf) - keep
+                        if end > pos:
+                            self.__write(part, buf[pos:end])
+                            pos = end
+                        break
+
+                    self.__write(part, buf[pos:index])
+                    yield headers, params, part
+                    pos = index + delimiter_length
+                    state = 'delimiter'
+
+    def __read_chunks(self, stream, content_length):
+        """Reads up to content_length bytes from stream in chunks"""
+        remaining = content_length
+        while remaining > 0:
+            chunk = stream.read(min(self.buffer_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    def __parse_headers(self, data):
+        """Parses the headers of a part into a dictionary with
+        lowercase names.
+        """
+        headers = {}
+        for line in data.split(b'\r\n'):
+            name, sep, value = line.partition(b':')
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        return headers
+
+    def __new_part(self, params):
+        """Returns a list to collect a form field in or a spooled
+        file if the part is a file upload.
+        """
+        if params.get('filename'):
+            return SpooledTemporaryFile(max_size=self.spool_threshold)
+        return []
+
+    def __write(self, part, data):
+        if not data:
+            return
+        if isinstance(part, list):
+            part.append(data)
+        else:
+            part.write(data)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.boundary)
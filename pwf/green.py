@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Implements the gevent server used by app.run(server='gevent'). Every
+request runs in its own greenlet, so a view waiting on a socket only
+holds a greenlet instead of a thread and one process can keep thousands
+of slow requests open. gevent is optional and only imported when used.
+
+Views that block without yielding to gevent, like a database driver
+written in C, can be marked with @app.offload to run in gevent's pool
+of native threads instead.
+"""
+
+import sys
+
+from serving import DEFAULT_BACKLOG
+from stack import bind_context
+
+
+def import_gevent():
+    """Imports and returns the gevent module, or raises ImportError
+    with a hint on how to install it.
+    """
+    try:
+        import gevent
+        import gevent.pool
+        import gevent.pywsgi
+    except ImportError:
+        raise ImportError("server='gevent' needs gevent, install it with "
+                          "'pip install gevent'")
+    return gevent
+
+
+def is_green():
+    """Checks if the caller runs in a greenlet scheduled by the gevent
+    hub, like a request handled by the gevent server.
+    """
+    gevent = sys.modules.get('gevent')
+    if gevent is None:
+        return False
+    return gevent.getcurrent().parent is not None
+
+
+def is_patched():
+    """Checks if the socket module was monkey patched by gevent"""
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('socket')
+
+
+def run_in_threadpool(func, *args, **kwargs):
+    """Calls func in gevent's thread pool and waits for the result
+    without blocking other greenlets. The app and request context of
+    the caller are pushed in the thread running func. Outside of a
+    greenlet func is simply called.
+    """
+    if not is_green():
+        return func(*args, **kwargs)
+    threadpool = sys.modules['gevent'].get_hub().threadpool
+    return threadpool.apply(bind_context(func), args, kwargs)
+
+
+def make_gevent_server(host, port, app, concurrency=None, threads=None,
+                       backlog=DEFAULT_BACKLOG, log='default'):
+    """Creates a gevent WSGI server listening on host and port for app.
+
+    At most concurrency requests are handled at once, there is no
+    limit by default. threads sets the size of the thread pool used by
+    views marked with @app.offload. log is passed on to the server, None
+    turns the access log off.
+    """
+    gevent = import_gevent()
+    if threads:
+        gevent.get_hub().threadpool.maxsize = threads
+
+    spawn = gevent.pool.Pool(concurrency) if concurrency else 'default'
+    return gevent.pywsgi.WSGIServer((host, port), app, spawn=spawn,
+                                    backlog=backlog, log=log)
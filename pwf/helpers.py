@@ -9,10 +9,18 @@ PWF directly but that might come in handy. They are not related
 to the PWF core or specific to WSGI.
 """
 
-import json
+import os
 import time
+import mimetypes
 from functools import wraps
 
+from response import Response
+from wrappers import FileWrapper
+from utils import http_date
+from request import _app_config
+from jsoncodec import get_codec
+from conditional import not_modified_headers
+
 
 def render_json(data, headers=None):
     """Generates a valid JSON response
@@ -23,11 +31,79 @@ def render_json(data, headers=None):
 
     Note: If the header param already contains a content-type
     it will be removed and replaced by the 'application/json' header.
+
+    The data is encoded to a str with the codec set in
+    app.config['JSON_CODEC'], which the response sends as is.
+    """
+    headers = _json_headers(headers, 'application/json')
+    codec = get_codec(_app_config().get('JSON_CODEC'))
+    return codec.dumps(data), headers
+
+
+def stream_json(records, headers=None, ndjson=False, chunk_size=16384):
+    """Generates a streamed JSON response from any iterable of records,
+    like a list or a generator reading rows from a database. Records
+    are encoded one at a time, so only about chunk_size bytes are held
+    in memory no matter how many records there are.
+
+    @param records: An iterable of objects that will be converted to JSON.
+    @param headers: A dict of additional reponse headers.
+    @param ndjson: Send newline-delimited JSON, one record per line,
+        instead of a JSON array.
+    @param chunk_size: Encoded records are collected until there are at
+        least this many bytes before a chunk is sent.
+
+    The content-type is set to 'application/json', or
+    'application/x-ndjson' for newline-delimited JSON, the same way
+    render_json sets it.
+
+    Example:
+
+        @app.route('/users')
+        def users(request):
+            return stream_json(db.iter_users(), ndjson=True)
+    """
+    content_type = 'application/x-ndjson' if ndjson else 'application/json'
+    headers = _json_headers(headers, content_type)
+    codec = get_codec(_app_config().get('JSON_CODEC'))
+
+    if ndjson:
+        start, separator, end = '', '\n', '\n'
+    else:
+        start, separator, end = '[', ',', ']'
+
+    def generate():
+        chunk = [start]
+        size = len(start)
+        first = True
+        for record in records:
+            data = codec.dumps(record)
+            if not first:
+                chunk.append(separator)
+                size += len(separator)
+            first = False
+            chunk.append(data)
+            size += len(data)
+            if size >= chunk_size:
+                yield ''.join(chunk)
+                chunk = []
+                size = 0
+
+        if not first or not ndjson:
+            chunk.append(end)
+        if chunk:
+            yield ''.join(chunk)
+
+    return generate(), headers
+
+
+def _json_headers(headers, content_type):
+    """Returns a copy of headers with string values and the
+    content-type replaced by content_type.
     """
     if isinstance(headers, dict):
-        content_types = [key for key in headers.keys() if key.lower() == 'content-type']
-        for key in content_types:
-            headers.pop(key)
+        headers = dict((key, value) for key, value in headers.items()
+                       if key.lower() != 'content-type')
     else:
         headers = {}
 
@@ -36,8 +112,79 @@ def render_json(data, headers=None):
         if not isinstance(value, str):
             headers[header] = bytes(value)
 
-    headers['content-type'] = 'application/json'
-    return json.dumps(data), headers
+    headers['content-type'] = content_type
+    return headers
+
+
+def send_file(filename_or_fp, mimetype=None, as_attachment=False,
+              attachment_filename=None, headers=None):
+    """Returns a Response that sends a file to the client without
+    reading it into memory. If the server provides wsgi.file_wrapper
+    the file is handed to it, otherwise it's sent in chunks.
+
+    @param filename_or_fp: A path to the file or an open file object.
+    @param mimetype: The Content-Type of the response. Guessed from the
+        filename if not given.
+    @param as_attachment: Set Content-Disposition to attachment so the
+        browser downloads the file instead of showing it.
+    @param attachment_filename: The filename used for the attachment.
+    @param headers: A dict of additional reponse headers.
+
+    Content-Length and Last-Modified are set from the file when
+    possible. Range requests are answered by seeking in the file.
+
+    Example:
+
+        @app.route('/download/<path:name>')
+        def download(request, name):
+            return send_file(os.path.join(FILE_DIR, name))
+    """
+    if isinstance(filename_or_fp, basestring):
+        filename = filename_or_fp
+        fp = open(filename, 'rb')
+    else:
+        fp = filename_or_fp
+        filename = getattr(fp, 'name', None)
+
+    headers = dict(headers or {})
+    headers['Accept-Ranges'] = 'bytes'
+
+    if mimetype is None and filename:
+        mimetype = mimetypes.guess_type(filename)[0]
+    headers['Content-Type'] = mimetype or 'application/octet-stream'
+
+    if as_attachment:
+        name = attachment_filename or os.path.basename(filename or '')
+        headers['Content-Disposition'] = 'attachment; filename="%s"' % name
+
+    try:
+        stat = os.fstat(fp.fileno())
+    except (AttributeError, IOError, OSError, ValueError):
+        # File-like objects without a file descriptor, like BytesIO
+        position = fp.tell()
+        fp.seek(0, os.SEEK_END)
+        headers['Content-Length'] = bytes(fp.tell() - position)
+        fp.seek(position)
+    else:
+        headers['Content-Length'] = bytes(stat.st_size - fp.tell())
+        headers['Last-Modified'] = http_date(stat.st_mtime)
+
+    data = FileWrapper(fp, filename=filename, mimetype=mimetype)
+    return Response(data=(data, headers))
+
+
+def not_modified(etag=None, last_modified=None, headers=None):
+    """Returns a bodyless 304 Not Modified response with the ETag and
+    Last-Modified headers set, for views answering a conditional GET
+    checked with request.is_fresh.
+
+    @param etag: The ETag, like a row version. Quoted if needed.
+    @param last_modified: A timestamp, HTTP date or UTC datetime.
+    @param headers: A dict of additional reponse headers.
+    """
+    headers = dict(headers or {})
+    headers.update(not_modified_headers(etag, last_modified))
+    return Response(code=304, data=('', headers))
 
 
 def timed(f):
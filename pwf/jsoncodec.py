@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Implements the JSON codecs used by request.json and render_json. The
+codec is picked with app.config['JSON_CODEC'] and any backend that
+isn't installed falls back to the json module of the standard library.
+"""
+
+import json
+
+
+#: Backends tried, in order, when JSON_CODEC is set to 'auto'
+AUTO_BACKENDS = ('ujson', 'simplejson', 'json')
+
+#: Codecs already created, keyed by the JSON_CODEC value
+_codecs = {}
+
+
+class JSONCodec(object):
+    """Encodes and decodes JSON with one backend module. Any module
+    with the loads and dumps functions of the json module can be used.
+
+    dumps always returns a UTF-8 encoded str so the response can send
+    it as is, and load decodes straight from a file-like object.
+    """
+
+    def __init__(self, module):
+        self.module = module
+        self.name = module.__name__
+
+    def loads(self, data):
+        """Decodes a JSON string. Raises ValueError if it isn't valid."""
+        return self.module.loads(data)
+
+    def load(self, fp):
+        """Decodes the JSON document read from fp"""
+        return self.module.loads(fp.read())
+
+    def dumps(self, obj):
+        """Encodes obj and returns the JSON document as a str"""
+        data = self.module.dumps(obj)
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        return data
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.name)
+
+
+def import_backend(name):
+    """Imports the backend module name or returns None if it isn't
+    installed.
+    """
+    try:
+        return __import__(name)
+    except ImportError:
+        return None
+
+
+def get_codec(name=None):
+    """Returns the codec for name, which is the name of a backend
+    module like 'ujson' or 'simplejson', or 'auto' for the fastest
+    backend installed. The standard library json module is used when
+    name is None or the backend isn't installed.
+    """
+    codec = _codecs.get(name)
+    if codec is not None:
+        return codec
+
+    if name == 'auto':
+        backends = AUTO_BACKENDS
+    elif name:
+        backends = (name, 'json')
+    else:
+        backends = ('json',)
+
+    for backend in backends:
+        module = json if backend == 'json' else import_backend(backend)
+        if module is not None:
+            break
+
+    codec = _codecs[name] = JSONCodec(module)
+    return codec
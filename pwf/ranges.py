@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Implements parsing of the HTTP Range and If-Range headers and
+the bodies used for 206 Partial Content responses.
+"""
+
+
+#: Range headers with more ranges than this are ignored
+MAX_RANGES = 100
+
+
+def parse_range(header, length):
+    """Parses a Range header like 'bytes=0-499, -500' for a body of
+    length bytes.
+
+    Returns a list of (start, stop) tuples, where stop is exclusive,
+    for every satisfiable range, sorted and with overlapping or
+    adjacent ranges merged. The list is empty if none of the ranges can
+    be satisfied and None is returned if the header isn't a valid byte
+    range, in which case it should be ignored.
+
+    A header with more than MAX_RANGES ranges, or with ranges adding up
+    to more than the whole body, like many copies of "0-", is ignored
+    too, so a small header can't make the response many times larger
+    than the body.
+    """
+    units, sep, specs = header.partition('=')
+    if not sep or units.strip().lower() != 'bytes':
+        return None
+
+    specs = specs.split(',')
+    if len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for spec in specs:
+        spec = spec.strip()
+        if not spec:
+            continue
+
+        start, sep, end = spec.partition('-')
+        start, end = start.strip(), end.strip()
+        if not sep or (start and not start.isdigit()) or \
+                (end and not end.isdigit()):
+            return None
+
+        if not start:
+            # A suffix range like "-500" for the last 500 bytes
+            if not end:
+                return None
+            start, stop = max(length - int(end), 0), length
+        else:
+            start = int(start)
+            if end and int(end) < start:
+                return None
+            stop = min(int(end) + 1, length) if end else length
+
+        if start < stop:
+            ranges.append((start, stop))
+
+    if sum(stop - start for start, stop in ranges) > length:
+        return None
+    return merge_ranges(ranges)
+
+
+def merge_ranges(ranges):
+    """Sorts a list of (start, stop) ranges and merges the ones that
+    overlap or are adjacent.
+    """
+    merged = []
+    for start, stop in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            if stop > merged[-1][1]:
+                merged[-1] = (merged[-1][0], stop)
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+def if_range_matches(if_range, etag=None, last_modified=None):
+    """Checks the If-Range header against the current ETag or
+    Last-Modified date. Only a strong ETag or an exact date match
+    allows a partial response.
+    """
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return etag is not None and not etag.startswith('W/') and \
+            if_range == etag
+    return last_modified is not None and if_range == last_modified
+
+
+def content_range(start, stop, length):
+    """Returns the Content-Range value for a range"""
+    return 'bytes %d-%d/%d' % (start, stop - 1, length)
+
+
+def iter_file_range(fp, start, stop, buffer_size=16384):
+    """Seeks fp to start and yields chunks until stop is reached"""
+    fp.seek(start)
+    remaining = stop - start
+    while remaining > 0:
+        chunk = fp.read(min(buffer_size, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+class RangeBody(object):
+    """Body of a 206 Partial Content response.
+
+    Holds one or more ranges of a file or string. Ranges of a file are
+    relative to offset, the position of the file when the response was
+    created. A single range is
+    sent as is, several ranges are sent as a multipart/byteranges body
+    with a part for each range. File data is read by seeking to each
+    range, only when the server asks for the next chunk, and it's
+    closed when the server closes the response.
+    """
+
+    def __init__(self, data, ranges, length, content_type=None,
+                 boundary=None, buffer_size=16384, offset=0):
+        self.data = data
+        self.ranges = ranges
+        self.length = length
+        self.buffer_size = buffer_size
+        self.offset = offset
+        self.boundary = boundary
+        self.iterator = None
+
+        if self.is_multipart:
+            self.part_headers = [
+                '--%s\r\nContent-Type: %s\r\nContent-Range: %s\r\n\r\n'
+                % (boundary, content_type, content_range(start, stop, length))
+                for start, stop in ranges]
+            self.closing = '--%s--\r\n' % boundary
+
+    @property
+    def is_multipart(self):
+        return len(self.ranges) > 1
+
+    @property
+    def content_type(self):
+        """The Content-Type of a multipart body"""
+        return 'multipart/byteranges; boundary=%s' % self.boundary
+
+    @property
+    def content_range(self):
+        """The Content-Range of a single range body"""
+        start, stop = self.ranges[0]
+        return content_range(start, stop, self.length)
+
+    @property
+    def content_length(self):
+        """The exact length of the body, computed without reading it"""
+        length = sum(stop - start for start, stop in self.ranges)
+        if self.is_multipart:
+            length += sum(len(h) + 2 for h in self.part_headers)
+            length += len(self.closing)
+        return length
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if self.iterator is None:
+            self.iterator = self.__generate()
+        return next(self.iterator)
+
+    __next__ = next
+
+    def __generate(self):
+        if not self.is_multipart:
+            start, stop = self.ranges[0]
+            for chunk in self.__read(start, stop):
+                yield chunk
+            return
+
+        for headers, (start, stop) in zip(self.part_headers, self.ranges):
+            yield headers
+            for chunk in self.__read(start, stop):
+                yield chunk
+            yield '\r\n'
+        yield self.closing
+
+    def __read(self, start, stop):
+        if hasattr(self.data, 'read'):
+            return iter_file_range(self.data, self.offset + start,
+                                   self.offset + stop, self.buffer_size)
+        return (self.data[start:stop],)
+
+    def close(self):
+        """Close the data if it has a close method"""
+        close = getattr(self.data, 'close', None)
+        if close is not None:
+            close()
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.ranges)
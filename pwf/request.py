@@ -7,15 +7,39 @@
 
 import cgi
 import urlparse
-import json
 import Cookie
+from collections import Counter
 from io import BytesIO
-from tempfile import TemporaryFile
+from tempfile import TemporaryFile, SpooledTemporaryFile
 
-from wrappers import FileWrapper
+from formparser import MultipartParser
+from jsoncodec import get_codec
+from compression import request_encoding, decompress_chunks
+from compression import DEFAULT_MAX_DECOMPRESSION_RATIO
+from conditional import is_fresh
 from utils import cached_property
-from stack import _app_stack
-from exceptions import RequestEntityTooLarge
+from stack import _app_stack, bind_context
+from exceptions import BadRequest, RequestEntityTooLarge
+
+
+#: Request bodies larger than this are spooled to disk unless
+#: SPOOL_THRESHOLD is set in the app config
+DEFAULT_SPOOL_THRESHOLD = 1024 * 500
+
+#: Lines of a NDJSON body longer than this are refused by
+#: iter_json_lines unless MAX_JSON_LINE_SIZE is set in the app config
+DEFAULT_MAX_JSON_LINE_SIZE = 1024 * 1024
+
+
+def _app_config():
+    """Returns the config of the current app or an empty dict if
+    there is no app.
+    """
+    return getattr(_app_stack.top, 'config', None) or {}
+
+
+#: Marks a blank line in a NDJSON body
+_empty_line = object()
 
 
 class Request(object):
@@ -26,24 +50,109 @@ class Request(object):
     to be consumed. 
     """
 
+    #: Size of the chunks used when reading the request body
+    buffer_size = 16384
+
+    #: The (func, args, kwargs) tasks added with add_background_task
+    background_tasks = None
+
     def __init__(self, environ):
         """Set object variables that will be accessible
         in the view function.
 
-        self.stream holds the cached wsgi.input as a file-like object.
+        Only the environ and the request method are set here. Headers,
+        cookies, content type, query string and the cached wsgi.input
+        stream are parsed the first time they are accessed.
+
+        If DEBUG is set in the app config, self.parsed counts how many
+        times each parser ran for this request.
         """
-        self.stream = self.__cache_stream(environ)
         self.environ = environ
-        self.headers = self.__parse_headers(environ)
-        self.content_length = self.__parse_content_length(environ)
-        self.mimetype, self.options = self.__parse_content_type(environ)
         self.method = self.__parse_method(environ)
-        self.cookies = self.__parse_cookies(environ)
-        self.query = self.__parse_query(environ)
-        #self.json = None
-        
-        # Defines methods used by __parse_data depending on mime-type
-        self.parse_methods = {
+        self.parsed = Counter() if _app_config().get('DEBUG') else None
+
+    def __ran(self, parser):
+        """Counts a parser run if DEBUG is set"""
+        if self.parsed is not None:
+            self.parsed[parser] += 1
+
+    @cached_property
+    def stream(self):
+        """The wsgi.input stream cached as a file-like object"""
+        self.__ran('stream')
+        return self.__cache_stream(self.environ)
+
+    @cached_property
+    def headers(self):
+        """The request headers as a dictionary"""
+        self.__ran('headers')
+        return self.__parse_headers(self.environ)
+
+    @cached_property
+    def content_length(self):
+        """The request Content-Length as an int"""
+        return self.__parse_content_length(self.environ)
+
+    @cached_property
+    def body_length(self):
+        """The length of the request body. Same as content_length
+        unless the body was sent compressed, then it's the length of the
+        decompressed body and the body is read to find it.
+        """
+        if self.content_encoding is None:
+            return self.content_length
+
+        stream = self.stream
+        position = stream.tell()
+        stream.seek(0, 2)
+        length = stream.tell()
+        stream.seek(position)
+        return length
+
+    @property
+    def content_encoding(self):
+        """'gzip' or 'deflate' if the body was sent compressed with
+        a Content-Encoding that's decompressed when it's read, else None.
+        """
+        return request_encoding(self.environ.get('HTTP_CONTENT_ENCODING'))
+
+    @cached_property
+    def mimetype(self):
+        """The mimetype parsed from the request Content-Type"""
+        return self.__content_type()[0]
+
+    @cached_property
+    def options(self):
+        """Any options parsed from the request Content-Type"""
+        return self.__content_type()[1]
+
+    def __content_type(self):
+        """Parses the Content-Type once and caches both the mimetype
+        and the options.
+        """
+        self.__ran('content_type')
+        mimetype, options = self.__parse_content_type(self.environ)
+        req_d = self.__dict__
+        req_d.setdefault('mimetype', mimetype)
+        req_d.setdefault('options', options)
+        return req_d['mimetype'], req_d['options']
+
+    @cached_property
+    def cookies(self):
+        """Cookies sent with the request as a dictionary"""
+        self.__ran('cookies')
+        return self.__parse_cookies(self.environ)
+
+    @cached_property
+    def query(self):
+        """The query string parsed into a dictionary"""
+        self.__ran('query')
+        return self.__parse_query(self.environ)
+
+    @cached_property
+    def parse_methods(self):
+        """Defines methods used by __parse_data depending on mime-type"""
+        return {
             'multipart/form-data': self.__parse_form,
             'application/x-www-form-urlencoded': self.__parse_form
             }
@@ -99,12 +208,15 @@ class Request(object):
         return headers
 
     def __parse_content_length(self, environ):
+        """Return the CONTENT_LENGTH as an int. A missing, non-numeric
+        or negative length is treated as 0, an empty body.
+        """
         try:
             cl = int(environ.get('CONTENT_LENGTH', 0))
         except ValueError:
             cl = 0
 
-        return cl
+        return max(cl, 0)
     
 
     def __parse_method(self, environ):
@@ -131,7 +243,7 @@ class Request(object):
         data as a string.
         """
 
-        length = self.content_length
+        length = self.body_length
 
         if parse_form is not True:
             return self.get_stream.read(length)
@@ -150,32 +262,34 @@ class Request(object):
         """Parse form data. If a file is included we wrap it using
         the FileWrapper and add it to self.files. If it's regular
         form data we add the key and value to the data dict.
+
+        Only multipart/form-data is parsed, using the streaming
+        MultipartParser. The boundary is read from the raw environ
+        since it's case sensitive.
         """
+        self.__ran('form')
         form = {}
         files = {}
         req_d = self.__dict__
         req_d['form'], req_d['files'] = form, files
 
-        env_data = cgi.FieldStorage(self.get_stream, environ=environ,
-                keep_blank_values=True)
-        
-        if not env_data:
+        # NOTE: Perhaps add support application/x-www-form-urlencoded
+        # in the future.
+        if self.mimetype != 'multipart/form-data':
             return form
 
-        for k in env_data.list:
-            # NOTE: Perhaps add support application/x-www-form-urlencoded
-            # in the future.
-            if isinstance(k, cgi.MiniFieldStorage):
-                return form
-
-            if k.filename:
-                headers = dict(k.headers)
-                filewrapper = FileWrapper(k.file, k.filename, 
-                        k.name, mimetype=k.type, headers=headers)
+        mimetype, options = cgi.parse_header(environ.get('CONTENT_TYPE', ''))
+        boundary = options.get('boundary')
+        if not boundary:
+            return form
 
-                files[k.name] = filewrapper
-            else:
-                form[k.name] = k.value
+        spool_threshold = _app_config().get('SPOOL_THRESHOLD',
+                                            DEFAULT_SPOOL_THRESHOLD)
+        parser = MultipartParser(boundary, self.buffer_size, spool_threshold)
+        parsed_form, parsed_files = parser.parse(self.get_stream,
+                                                 self.body_length)
+        form.update(parsed_form)
+        files.update(parsed_files)
 
         return form
 
@@ -206,50 +320,246 @@ class Request(object):
 
     @cached_property
     def json(self):
-        """If the mimetype is application/json, parse self.data and
-        return a python dictionary"""
+        """If the mimetype is application/json, parse the request body
+        and return a python dictionary.
 
-        if not self.data:
-            return None
-    
+        The body is decoded straight from the cached stream with the
+        codec set in app.config['JSON_CODEC'], without going through
+        self.data, unless self.data was already read.
+        """
         if not 'application/json' in self.mimetype:
             return None
-       
+
+        codec = get_codec(_app_config().get('JSON_CODEC'))
+        data = self.__dict__.get('data')
+
+        if data is None and not self.body_length:
+            return None
+        if data is not None and not data:
+            return None
+
+        self.__ran('json')
         try:
-            data = json.loads(self.data)
+            if data is None:
+                return codec.load(self.get_stream)
+            return codec.loads(data)
         except ValueError:
             return None
 
-        return data
-    
-  
+    def add_background_task(self, func, *args, **kwargs):
+        """Calls func with args and kwargs on the app's pool of task
+        threads once the response was sent, so the work doesn't delay
+        the response. func runs with the app and request context of the
+        request, see pwf.tasks for how the pool is configured.
+
+        Example:
+
+            @app.route('/orders', methods=['POST'])
+            def create_order(request):
+                order = db.create_order(request.json)
+                request.add_background_task(notify_webhooks, order)
+                return render_json(order)
+        """
+        if self.background_tasks is None:
+            self.background_tasks = []
+        self.background_tasks.append((bind_context(func), args, kwargs))
+
+    def is_fresh(self, etag=None, last_modified=None):
+        """Checks if the client's cached copy is still fresh, comparing
+        If-None-Match to etag and If-Modified-Since to last_modified.
+        Lets a view answer with a 304 Not Modified before building the
+        response body.
+
+        Example:
+
+            @app.route('/item/<int:id>')
+            def item(request, id):
+                version = db.item_version(id)
+                if request.is_fresh(etag=version):
+                    return not_modified(etag=version)
+                return render_json(db.item(id), {'ETag': version})
+        """
+        return is_fresh(self.environ, etag, last_modified)
+
+    def iter_chunks(self, size=None):
+        """Yields the request body in chunks of up to size bytes,
+        buffer_size by default, without holding the whole body in
+        memory.
+
+        If the body was already cached it's read from the cached
+        stream, otherwise it's read straight from wsgi.input and can't
+        be read again through self.data, self.form or self.json.
+        Compressed bodies are decompressed as they are read.
+        """
+        size = size or self.buffer_size
+
+        if 'stream' in self.__dict__:
+            stream = self.get_stream
+            chunks = iter(lambda: stream.read(size), b'')
+        else:
+            config = _app_config()
+            self.__check_content_length(self.content_length, config)
+            chunks = self.__iter_input(self.environ, self.content_length,
+                                       config, size)
+
+        for chunk in chunks:
+            yield chunk
+
+    def iter_json_lines(self, max_line_size=None):
+        """Yields one parsed record for every line of a newline-delimited
+        JSON (NDJSON) body. The body is read in chunks through
+        iter_chunks, so only the current chunk and line are held in
+        memory. Empty lines are skipped.
+
+        Raises BadRequest with the line number if a line isn't valid
+        JSON or if it's longer than max_line_size bytes, which defaults
+        to MAX_JSON_LINE_SIZE from the app config or 1 MB. Set
+        MAX_JSON_LINE_SIZE to None to allow lines of any length.
+
+        Example:
+
+            for record in request.iter_json_lines():
+                db.insert(record)
+        """
+        config = _app_config()
+        codec = get_codec(config.get('JSON_CODEC'))
+        if max_line_size is None:
+            max_line_size = config.get('MAX_JSON_LINE_SIZE',
+                                       DEFAULT_MAX_JSON_LINE_SIZE)
+        self.__ran('json_lines')
+
+        # Pieces of a line spanning several chunks, joined once the end
+        # of the line is found so each byte is only copied once
+        pieces = []
+        size = 0
+        lineno = 0
+        for chunk in self.iter_chunks():
+            start = 0
+            end = chunk.find(b'\n')
+            while end != -1:
+                lineno += 1
+                line = chunk[start:end]
+                if pieces:
+                    size += len(line)
+                    if max_line_size is not None and size > max_line_size:
+                        raise BadRequest(description='Line %d is too long'
+                                         % lineno)
+                    pieces.append(line)
+                    line = b''.join(pieces)
+                    pieces = []
+                    size = 0
+                elif max_line_size is not None and \
+                        len(line) > max_line_size:
+                    raise BadRequest(description='Line %d is too long'
+                                     % lineno)
+
+                record = self.__decode_line(codec, line, lineno)
+                if record is not _empty_line:
+                    yield record
+                start = end + 1
+                end = chunk.find(b'\n', start)
+
+            if start < len(chunk):
+                size += len(chunk) - start
+                if max_line_size is not None and size > max_line_size:
+                    raise BadRequest(description='Line %d is too long'
+                                     % (lineno + 1))
+                pieces.append(chunk[start:])
+
+        record = self.__decode_line(codec, b''.join(pieces), lineno + 1)
+        if record is not _empty_line:
+            yield record
+
+    def __decode_line(self, codec, line, lineno):
+        """Decodes one line of a NDJSON body"""
+        if not line.strip():
+            return _empty_line
+        try:
+            return codec.loads(line)
+        except ValueError:
+            raise BadRequest(description='Malformed JSON on line %d'
+                             % lineno)
+
     def __cache_stream(self, environ):
         """Caches the query stream so it can be accessed
         multiple times. If the stream was is cached we read
         envrion['wsgi.input'] and store it.
         
-        For large files the stream is stored in a temporary file.
-        For smaller files (< 500KB) we store the data in memory as a
-        BytesIO object.
-        """
-        try:
-            content_length = int(environ.get('CONTENT_LENGTH', 0))
-        except ValueError:
-            content_length = 0
+        Bodies up to app.config['SPOOL_THRESHOLD'] bytes (500 KB by
+        default) are read into memory as a BytesIO object. Larger
+        bodies are copied to a temporary file in chunks of buffer_size
+        so only one chunk is held in memory at a time.
 
-        stream = environ['wsgi.input'].read(content_length)
-        
-        # If the stream is large we use a temporary file. If not we
-        # just load it into memory
-        if content_length > 1024 * 500:
-            _stream_cache = TemporaryFile('wb+')
-            _stream_cache.write(stream)
-            _stream_cache.seek(0)
+        Bodies sent with a gzip or deflate Content-Encoding are
+        decompressed chunk by chunk into a spooled temporary file, see
+        __iter_input.
+
+        If app.config['MAX_CONTENT_LENGTH'] is set and the body is
+        larger, RequestEntityTooLarge is raised before anything is read.
+        """
+        content_length = self.__parse_content_length(environ)
+
+        config = _app_config()
+        self.__check_content_length(content_length, config)
+
+        # If the stream is small we just load it into memory. If not
+        # we spool it to a temporary file.
+        spool_threshold = config.get('SPOOL_THRESHOLD',
+                                     DEFAULT_SPOOL_THRESHOLD)
+        if self.content_encoding is not None:
+            _stream_cache = SpooledTemporaryFile(max_size=spool_threshold)
+        elif content_length <= spool_threshold:
+            return BytesIO(environ['wsgi.input'].read(content_length))
         else:
-            _stream_cache = BytesIO(stream)
+            _stream_cache = TemporaryFile('wb+')
+
+        for chunk in self.__iter_input(environ, content_length, config,
+                                       self.buffer_size):
+            _stream_cache.write(chunk)
 
+        _stream_cache.seek(0)
         return _stream_cache
 
+    def __iter_input(self, environ, content_length, config, size):
+        """Reads up to content_length bytes from wsgi.input in chunks
+        of size bytes.
+
+        Compressed bodies are decompressed as they are read. If the
+        body decompresses to more than app.config['MAX_DECOMPRESSED_SIZE']
+        bytes, which defaults to MAX_CONTENT_LENGTH, or to more than
+        app.config['MAX_DECOMPRESSION_RATIO'] times its compressed size
+        RequestEntityTooLarge is raised.
+        """
+        chunks = self.__read_input(environ['wsgi.input'], content_length,
+                                   size)
+        encoding = self.content_encoding
+        if encoding is None:
+            return chunks
+
+        max_size = config.get('MAX_DECOMPRESSED_SIZE',
+                              config.get('MAX_CONTENT_LENGTH'))
+        max_ratio = config.get('MAX_DECOMPRESSION_RATIO',
+                               DEFAULT_MAX_DECOMPRESSION_RATIO)
+        return decompress_chunks(chunks, encoding, max_size, max_ratio, size)
+
+    def __read_input(self, wsgi_input, content_length, size):
+        """Reads up to content_length bytes from wsgi_input in chunks"""
+        remaining = content_length
+        while remaining > 0:
+            chunk = wsgi_input.read(min(size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    def __check_content_length(self, content_length, config):
+        """Raises RequestEntityTooLarge if content_length is larger than
+        app.config['MAX_CONTENT_LENGTH'].
+        """
+        max_content_length = config.get('MAX_CONTENT_LENGTH')
+        if max_content_length is not None and \
+                content_length > max_content_length:
+            raise RequestEntityTooLarge()
 
     def __repr__(self):
         return '%s(%r)' % (self.__class__.__name__, self.__dict__)
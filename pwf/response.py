@@ -6,8 +6,16 @@
 """
 
 import httplib
-import helpers
+import uuid
 import cookies
+from wrappers import FileWrapper, StreamingBody, Headers
+from ranges import RangeBody, parse_range, if_range_matches
+
+
+#: Status lines like '200 OK' or '404 Not Found' for every status code
+#: known to httplib, built once at import time.
+STATUS_LINES = dict((code, '%d %s' % (code, reason))
+                    for code, reason in httplib.responses.items())
 
 class Response(object):
     """Used to set and return data back to the server. The Response object
@@ -20,27 +28,35 @@ class Response(object):
     some data.
 
     Create the response object from the view using app.make_response(data)
+
+    The data can also be a generator, an iterator or a file-like object,
+    in which case it is sent to the server one chunk at a time.
     """
 
+    #: Size of the chunks read from file-like response data
+    buffer_size = 16384
+
     def __init__(self, make_response=None, code=200, data=''):
         """For the view data we're currently supporting either a tuple with
         both the returned data and a dictionary of headers or just the 
-        returned data.
+        returned data. The headers are kept in a Headers object.
         """
         if isinstance(data, tuple):
             self.data = data[0]
             headers = data[1]
         else:
             self.data = data
-            headers = {}
+            headers = None
 
-        self.headers = headers
+        self.headers = Headers(headers)
         self.code = code
         self.make_response = make_response
 
     def set_cookie(self, key, value='', path='/', expires=None, max_age=None,
                 domain=None, secure=False, httponly=False):
         """Creates a cookie dictionary and adds it to the headers.
+        Each cookie gets its own Set-Cookie header so several cookies
+        can be set on the same response.
         This function is ment to be used in the view function:
         
             resp = make_response(data)
@@ -49,40 +65,217 @@ class Response(object):
         cookie = cookies.create_cookie(key, value, path, expires, max_age,
                 domain, secure, httponly)
 
-        #TODO: Handle multiple cookies
-        self.headers.update(cookie)
+        for name, value in cookie.items():
+            self.headers.add(name, value)
+
+    @property
+    def is_streamed(self):
+        """True if the data is a generator, iterator or file-like object
+        that is sent chunk by chunk rather than as one string.
+        """
+        data = self.data
+        return hasattr(data, 'read') or hasattr(data, 'next')
 
-    def render(self):
+    def render(self, environ=None):
         """Renders the final response back to the server with status code,
         headers and data. It aslo transform headers and codes into
         a WSGI compatible format.
         
-        If status code is 5xx or 4xx no view data is returned.
+        If status code is 5xx or 4xx no view data is returned. If the
+        WSGI environ is given and the request method is HEAD the headers
+        are sent but the data is never encoded or returned.
+
+        Streamed data is returned as a StreamingBody iterable that the
+        server consumes chunk by chunk and closes when it's done. File
+        data is handed to environ['wsgi.file_wrapper'] if the server
+        provides one, which lets it send the file with sendfile(2).
+
+        GET requests with a Range header for a file or string response
+        get a 206 Partial Content or 416 response, see __apply_range.
         """
+        if environ is not None and self.code == 200 and \
+                environ.get('HTTP_RANGE') and \
+                environ.get('REQUEST_METHOD') == 'GET':
+            self.__apply_range(environ)
 
         # If the content type is not specified, we set
         # it to text/html as the default
-        if 'content-type' not in map(lambda x:x.lower(), self.headers):
-            self.headers['Content-Type'] = 'text/html'
+        if 'Content-Type' not in self.headers and \
+                self.code not in (204, 304):
+            self.headers.add('Content-Type', 'text/html')
 
-        # Set headers as list of tuples
-        self.headers = [(k, v) for k, v in self.headers.items()]
+        # The WSGI list of tuples is kept by the Headers object
+        headers = self.headers.to_wsgi_list()
 
-        # httplib.responses maps the HTTP 1.1 status codes to W3C names.
+        # STATUS_LINES maps the HTTP 1.1 status codes to W3C names.
         # Output example: '200 OK' or '404 Not Found'
-        resp_code = '{} {}'.format(self.code, httplib.responses[self.code])
+        resp_code = STATUS_LINES[self.code]
+
+        if environ is not None and environ.get('REQUEST_METHOD') == 'HEAD':
+            if self.is_streamed:
+                StreamingBody(self.data).close()
+            self.make_response(resp_code, headers)
+            return ''
 
-        if str(self.code)[0] in ['4', '5'] and not self.data:
-            self.make_response(resp_code, self.headers)
+        if self.is_streamed:
+            self.make_response(resp_code, headers)
+            return self.__stream(environ)
+
+        if self.code >= 400 and not self.data:
+            self.make_response(resp_code, headers)
             return resp_code.encode('utf-8')
 
-        try:
-            data = bytes(self.data).encode('utf-8')
-        except UnicodeDecodeError:
-            data = bytes(self.data)
+        # Strings are sent as they are, without being copied
+        data = self.data
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        elif not isinstance(data, str):
+            data = bytes(data)
         
-        self.make_response(resp_code, self.headers)
+        self.make_response(resp_code, headers)
         return data
 
+    def __apply_range(self, environ):
+        """Turns the response into a 206 Partial Content response
+        holding the requested ranges of the data. File data is read by
+        seeking to each range so the file is never read as a whole.
+
+        Invalid Range headers and If-Range headers that don't match
+        the ETag or Last-Modified header are ignored and the full
+        response is sent. If none of the ranges can be satisfied the
+        response becomes a 416 Requested Range Not Satisfiable.
+        """
+        data = self.data
+        if isinstance(data, FileWrapper):
+            data = data.file
+
+        if hasattr(data, 'read'):
+            if not hasattr(data, 'seek') or not hasattr(data, 'tell'):
+                return
+            offset = data.tell()
+            length = self.headers.get('Content-Length')
+            if length is None:
+                data.seek(0, 2)
+                length = data.tell() - offset
+                data.seek(offset)
+            length = int(length)
+        elif isinstance(data, basestring):
+            if isinstance(data, unicode):
+                data = data.encode('utf-8')
+            offset, length = 0, len(data)
+        else:
+            return
+
+        ranges = parse_range(environ['HTTP_RANGE'], length)
+        if ranges is None:
+            return
+
+        if_range = environ.get('HTTP_IF_RANGE')
+        if if_range is not None and not if_range_matches(
+                if_range, self.headers.get('ETag'),
+                self.headers.get('Last-Modified')):
+            return
+
+        if not ranges:
+            if hasattr(data, 'close'):
+                data.close()
+            self.code = 416
+            self.data = ''
+            self.headers.remove('Content-Length')
+            self.headers['Content-Range'] = 'bytes */%d' % length
+            return
+
+        content_type = self.headers.get('Content-Type') or 'text/html'
+        body = RangeBody(data, ranges, length, content_type,
+                         uuid.uuid4().hex, self.buffer_size, offset)
+
+        self.code = 206
+        self.data = body
+        self.headers['Content-Length'] = bytes(body.content_length)
+        if body.is_multipart:
+            self.headers['Content-Type'] = body.content_type
+        else:
+            self.headers['Content-Range'] = body.content_range
+
+    def __stream(self, environ):
+        """Returns the iterable used to stream self.data to the server"""
+        data = self.data
+        file_wrapper = None
+        if environ is not None:
+            file_wrapper = environ.get('wsgi.file_wrapper')
+
+        if file_wrapper is not None and hasattr(data, 'read'):
+            # Hand the server the real file so it can use its fileno
+            if isinstance(data, FileWrapper):
+                data = data.file
+            return file_wrapper(data, self.buffer_size)
+
+        return StreamingBody(data, self.buffer_size)
+
     def __repr__(self):
         return '%s(%r)' % (self.__class__.__name__, self.__dict__)
+
+
+class StaticResponse(Response):
+    """A response with the status line, headers and body rendered ahead
+    of time, used for the default error responses and for cached
+    responses. Rendering it only passes the prebuilt values on to the
+    server.
+
+    The prebuilt values are shared between requests and can't be
+    changed, so a StaticResponse is only used when no "last" function
+    could modify the response.
+    """
+
+    def __init__(self, status, headers, body, make_response=None):
+        self.status = status
+        self.header_list = headers
+        self.body = body
+        self.make_response = make_response
+
+    @classmethod
+    def error(cls, code, make_response=None, headers=None):
+        """Returns the default response for an error code, optionally
+        with extra headers like Allow.
+        """
+        status, header_list, body = ERROR_RESPONSES[code]
+        if headers:
+            header_list = header_list + tuple(headers.items())
+        return cls(status, header_list, body, make_response)
+
+    @property
+    def code(self):
+        return int(self.status[:3])
+
+    @property
+    def data(self):
+        return self.body
+
+    @property
+    def headers(self):
+        """A copy of the prebuilt headers"""
+        headers = Headers()
+        for name, value in self.header_list:
+            headers.add(name, value)
+        return headers
+
+    def render(self, environ=None):
+        """Sends the prebuilt status line and headers and returns the
+        prebuilt body. The server gets its own copy of the header list
+        since it may add headers to it.
+        """
+        self.make_response(self.status, list(self.header_list))
+
+        if environ is not None and environ.get('REQUEST_METHOD') == 'HEAD':
+            return ''
+        return self.body
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.status)
+
+
+#: The default status line, headers and body for every 4xx and 5xx
+#: status code, used when no error handler is defined.
+ERROR_RESPONSES = dict(
+    (code, (status, (('Content-Type', 'text/html'),), status))
+    for code, status in STATUS_LINES.items() if code >= 400)
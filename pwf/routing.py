@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Implements the prefix tree (radix) router used by Pwf to match a
+request path to a registered route.
+"""
+
+import re
+import uuid
+
+
+#: Matches a variable in a url, like "<username>" or "<int:id>"
+_variable_re = re.compile(r'<(?:(\w+):)?(\w+)>')
+
+#: Regex meta characters escaped in the static parts of a url
+_special_re = re.compile(r'([.^$*+?{}\[\]\\|()])')
+
+
+class BaseConverter(object):
+    """Converters define what a path variable is allowed to match
+    through regex and turn the matched string into the value handed
+    to the view function through to_python.
+
+    A converter with multi_segment set to True may span several path
+    segments, slashes included.
+    """
+
+    regex = '[^/]+'
+    multi_segment = False
+
+    def to_python(self, value):
+        return value
+
+    def __repr__(self):
+        return '%s()' % self.__class__.__name__
+
+
+class StringConverter(BaseConverter):
+    """The default converter. Matches any text up to the next slash."""
+
+
+class IntegerConverter(BaseConverter):
+    """Matches positive integers, like "<int:id>"."""
+
+    regex = r'\d+'
+
+    def to_python(self, value):
+        return int(value)
+
+
+class UUIDConverter(BaseConverter):
+    """Matches UUID strings, like "<uuid:key>"."""
+
+    regex = (r'[A-Fa-f0-9]{8}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{4}-'
+             r'[A-Fa-f0-9]{4}-[A-Fa-f0-9]{12}')
+
+    def to_python(self, value):
+        return uuid.UUID(value)
+
+
+class SlugConverter(BaseConverter):
+    """Matches letters, numbers, hyphens and underscores,
+    like "<slug:title>".
+    """
+
+    regex = r'[-\w]+'
+
+
+class PathConverter(BaseConverter):
+    """Matches the rest of the path including slashes,
+    like "<path:filename>".
+    """
+
+    regex = r'[^/].*?'
+    multi_segment = True
+
+
+#: Converters available in route urls, keyed by the name used in the url
+DEFAULT_CONVERTERS = {
+    'default': StringConverter(),
+    'string': StringConverter(),
+    'int': IntegerConverter(),
+    'uuid': UUIDConverter(),
+    'slug': SlugConverter(),
+    'path': PathConverter(),
+}
+
+
+def parse_url(url, converters=DEFAULT_CONVERTERS):
+    """Splits a url into static text and variables. Yields a tuple
+    of (converter, name) for every variable and (None, text) for any
+    static text in between.
+    """
+    pos = 0
+    for m in _variable_re.finditer(url):
+        if m.start() > pos:
+            yield None, url[pos:m.start()]
+
+        converter_name, name = m.group(1) or 'default', m.group(2)
+        try:
+            converter = converters[converter_name]
+        except KeyError:
+            raise LookupError('Unknown converter %r in url %r'
+                              % (converter_name, url))
+
+        yield converter, name
+        pos = m.end()
+
+    if pos < len(url):
+        yield None, url[pos:]
+
+
+def compile_url(url, converters=DEFAULT_CONVERTERS):
+    """Compiles a url into a regex string using the converter regex
+    for every variable, like "^/user/(?P<id>\d+)$"
+    """
+    parts = []
+    for converter, value in parse_url(url, converters):
+        if converter is None:
+            parts.append(_special_re.sub(r'\\\1', value))
+        else:
+            parts.append('(?P<%s>%s)' % (value, converter.regex))
+
+    return '^%s$' % ''.join(parts)
+
+
+def split_path(path):
+    """Splits a path into its segments. The leading slash is dropped
+    so '/user/walter' becomes ['user', 'walter'] and '/' becomes [''].
+    """
+    if path.startswith('/'):
+        path = path[1:]
+    return path.split('/')
+
+
+class Endpoint(object):
+    """Holds every view registered for a single url, indexed by the
+    request method so finding the view for a method is a single dict
+    lookup.
+
+    HEAD is answered by the GET view unless a HEAD view was registered
+    and OPTIONS is always allowed. The value of the Allow header is
+    computed once every time a view is added.
+    """
+
+    __slots__ = ('url', 'registered', 'views', 'allow', 'allow_headers',
+                 'handlers', 'fallback')
+
+    def __init__(self, url):
+        self.url = url
+        self.registered = {}
+        self.views = {}
+        self.allow = ''
+        self.allow_headers = {}
+
+        #: Filled in by Pwf.freeze() with one compiled request handler
+        #: per method and a fallback for unsupported methods.
+        self.handlers = {}
+        self.fallback = None
+
+    def add(self, methods, group, view):
+        """Registers view and its group for each method in methods.
+        A method that already has a view keeps the first one.
+        """
+        for method in methods:
+            self.registered.setdefault(method, (group, view))
+
+        views = dict(self.registered)
+        if 'GET' in views:
+            views.setdefault('HEAD', views['GET'])
+        self.views = views
+
+        allowed = set(views)
+        allowed.add('OPTIONS')
+        self.allow = ', '.join(sorted(allowed))
+        self.allow_headers = {'Allow': self.allow}
+
+    def get(self, method):
+        """Returns a tuple of (group, view) for method or None
+        if the method isn't supported.
+        """
+        return self.views.get(method)
+
+    @property
+    def methods(self):
+        """The request methods supported by the endpoint"""
+        return self.allow.split(', ')
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.url)
+
+
+class Node(object):
+    """A single node in the route tree.
+
+    Static segments are stored in a dictionary for constant time lookup
+    while variable segments are kept as a list of wildcard children
+    that are tried in the order they were registered.
+    """
+
+    __slots__ = ('static', 'dynamic', 'route')
+
+    def __init__(self):
+        self.static = {}
+        self.dynamic = []
+        self.route = None
+
+
+class Router(object):
+    """Prefix tree built from the urls registered through @app.route.
+
+    Every url is split into segments and each segment becomes a node in
+    the tree. Matching a path walks the tree one segment at a time and
+    prefers static segments over variables, falling back to the
+    variable children if the static branch doesn't lead to a route.
+
+    Variables are matched with the regex of their converter and the
+    converted values are returned, ready to be passed to the view.
+
+    Example:
+
+        router = Router()
+        router.add('/user/<int:id>', 'user-route')
+        router.match('/user/12')
+        # -> ('user-route', {'id': 12})
+    """
+
+    def __init__(self, converters=None):
+        self.root = Node()
+        self.converters = dict(converters or DEFAULT_CONVERTERS)
+
+    def add(self, url, route):
+        """Adds a url to the tree and attaches route to its last node.
+        If the url is already registered the first route is kept, the
+        same way the first matching route was used before.
+
+        Returns the route attached to the url.
+        """
+        node = self.root
+        for segment in self.__split_url(url):
+            node = self.__child(node, segment)
+
+        if node.route is None:
+            node.route = route
+
+        return node.route
+
+    def iter_routes(self):
+        """Yields every route in the tree"""
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.route is not None:
+                yield node.route
+            stack.extend(node.static.values())
+            stack.extend(entry[-1] for entry in node.dynamic)
+
+    def match(self, path):
+        """Matches a path to a route. Returns a tuple of the route and
+        a dictionary of any converted path variables or None if
+        nothing matched.
+        """
+        kwargs = {}
+        route = self.__match(self.root, split_path(path), 0, kwargs)
+        if route is None:
+            return None
+
+        return route, kwargs
+
+    def __split_url(self, url):
+        """Splits a url into segments. Slashes inside a variable never
+        split it, and a variable spanning several segments (a path) is
+        kept together with any text that follows it in the url.
+        """
+        segments = split_path(url)
+        for i, segment in enumerate(segments):
+            for converter, name in parse_url(segment, self.converters):
+                if converter is not None and converter.multi_segment:
+                    return segments[:i] + ['/'.join(segments[i:])]
+        return segments
+
+    def __child(self, node, segment):
+        """Returns the child node for segment, creating it if needed."""
+        if '<' not in segment:
+            child = node.static.get(segment)
+            if child is None:
+                child = node.static[segment] = Node()
+            return child
+
+        for entry in node.dynamic:
+            if entry[0] == segment:
+                return entry[-1]
+
+        parts = list(parse_url(segment, self.converters))
+        variables = dict((name, converter) for converter, name in parts
+                         if converter is not None)
+        multi_segment = any(c.multi_segment for c in variables.values())
+
+        if len(parts) == 1 and not multi_segment and \
+                type(parts[0][0]) is StringConverter:
+            # A plain "<name>" segment matches anything and needs no regex
+            pattern = None
+        else:
+            pattern = re.compile(compile_url(segment, self.converters))
+
+        child = Node()
+        node.dynamic.append((segment, variables, pattern, multi_segment,
+                             child))
+        return child
+
+    def __match(self, node, segments, index, kwargs):
+        """Walks the tree recursively and returns the first route
+        found. Variables are added to kwargs as they are matched and
+        removed again if the branch turns out to be a dead end.
+        """
+        if index == len(segments):
+            return node.route
+
+        segment = segments[index]
+
+        child = node.static.get(segment)
+        if child is not None:
+            route = self.__match(child, segments, index + 1, kwargs)
+            if route is not None:
+                return route
+
+        # Variables never match an empty segment
+        if not segment:
+            return None
+
+        for key, variables, pattern, multi_segment, child in node.dynamic:
+            if multi_segment:
+                # Path variables take the rest of the path
+                values = self.__convert(
+                    pattern, '/'.join(segments[index:]), variables)
+                next_index = len(segments)
+            elif pattern is None:
+                values = dict.fromkeys(variables, segment)
+                next_index = index + 1
+            else:
+                values = self.__convert(pattern, segment, variables)
+                next_index = index + 1
+
+            if values is None:
+                continue
+
+            kwargs.update(values)
+            route = self.__match(child, segments, next_index, kwargs)
+            if route is not None:
+                return route
+
+            for k in values:
+                del kwargs[k]
+
+        return None
+
+    def __convert(self, pattern, value, variables):
+        """Matches value against pattern and converts the matched
+        variables. Returns None if it doesn't match or a converter
+        refuses the value.
+        """
+        m = pattern.match(value)
+        if m is None:
+            return None
+
+        try:
+            return dict((name, variables[name].to_python(v))
+                        for name, v in m.groupdict().items())
+        except ValueError:
+            return None
+
+    def __repr__(self):
+        return '%s()' % self.__class__.__name__
@@ -0,0 +1,551 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Implements the servers used by app.run. The threaded server hands
+accepted connections to a fixed pool of worker threads through a
+bounded queue and keeps HTTP/1.1 connections alive between requests.
+
+The prefork server runs several worker processes, each with its own
+server, so CPU bound views can use more than one core.
+"""
+
+import os
+import sys
+import time
+import errno
+import signal
+import socket
+import itertools
+import threading
+import traceback
+import BaseHTTPServer
+from Queue import Queue
+from wsgiref import simple_server
+
+
+#: Worker threads used when app.run is given threads=True
+DEFAULT_THREADS = 8
+
+#: Size of the listen backlog of the server socket
+DEFAULT_BACKLOG = 128
+
+#: Seconds an idle keep-alive connection is kept open
+DEFAULT_KEEP_ALIVE_TIMEOUT = 5
+
+#: Seconds the prefork master waits for draining workers before
+#: killing them
+DEFAULT_GRACEFUL_TIMEOUT = 30
+
+#: Seconds a prefork worker waits in accept before checking if it
+#: should stop
+WORKER_POLL_INTERVAL = 1.0
+
+#: Workers that crash within this many seconds of being started are
+#: restarted only after waiting as long, so a broken app doesn't make
+#: the master fork in a tight loop
+MIN_WORKER_LIFETIME = 1.0
+
+#: Unread request bodies up to this many bytes are discarded so the
+#: connection can be kept alive, larger ones close the connection
+MAX_DRAIN_SIZE = 1024 * 64
+
+
+class LimitedInput(object):
+    """The wsgi.input stream of a request on a keep-alive connection.
+    Reads never go past the Content-Length of the request, so they
+    can't block waiting for data or read into the next request.
+    """
+
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.remaining = max(length, 0)
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        if not size:
+            return ''
+        data = self.stream.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def readline(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        if not size:
+            return ''
+        data = self.stream.readline(size)
+        self.remaining -= len(data)
+        return data
+
+    def readlines(self, hint=-1):
+        return list(self)
+
+    def __iter__(self):
+        return iter(self.readline, '')
+
+    def drain(self, limit=MAX_DRAIN_SIZE):
+        """Reads and discards what's left of the body. Returns False if
+        more than limit bytes are left or the client closed the
+        connection before sending them.
+        """
+        if self.remaining > limit:
+            return False
+        while self.remaining:
+            if not self.read(16384):
+                return False
+        return True
+
+
+class ServerHandler(simple_server.ServerHandler):
+    """Runs the app for one request and sends the response with
+    HTTP/1.1. Responses without a Content-Length, which end when the
+    connection closes, close the connection.
+    """
+
+    http_version = '1.1'
+
+    def finish_response(self):
+        # A string returned by the app is sent as one block, which also
+        # lets wsgiref set the Content-Length
+        if isinstance(self.result, str):
+            self.result = [self.result]
+        simple_server.ServerHandler.finish_response(self)
+
+    def cleanup_headers(self):
+        simple_server.ServerHandler.cleanup_headers(self)
+        handler = self.request_handler
+        if 'Content-Length' not in self.headers:
+            handler.close_connection = 1
+
+        if handler.close_connection:
+            self.headers['Connection'] = 'close'
+        elif handler.request_version == 'HTTP/1.0':
+            self.headers['Connection'] = 'keep-alive'
+
+    def handle_error(self):
+        self.request_handler.close_connection = 1
+        simple_server.ServerHandler.handle_error(self)
+
+
+class WSGIRequestHandler(simple_server.WSGIRequestHandler):
+    """Handles every request sent on a connection until the client
+    closes it, asks for it to be closed or it has been idle for the
+    keep_alive_timeout of the server.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    # BaseHTTPRequestHandler loops over handle_one_request until
+    # close_connection is set, wsgiref handles a single request
+    handle = BaseHTTPServer.BaseHTTPRequestHandler.handle
+
+    def setup(self):
+        self.timeout = getattr(self.server, 'keep_alive_timeout', None)
+        simple_server.WSGIRequestHandler.setup(self)
+        # The status line, headers and body are written separately, so
+        # don't let Nagle's algorithm hold back the last small write
+        try:
+            self.connection.setsockopt(socket.IPPROTO_TCP,
+                                       socket.TCP_NODELAY, 1)
+        except (socket.error, AttributeError):
+            pass
+
+    def handle_one_request(self):
+        try:
+            self.raw_requestline = self.rfile.readline(65537)
+            if len(self.raw_requestline) > 65536:
+                self.requestline = ''
+                self.request_version = ''
+                self.command = ''
+                self.close_connection = 1
+                self.send_error(414)
+                return
+            if not self.raw_requestline:
+                self.close_connection = 1
+                return
+            if not self.parse_request():
+                return
+            self.run_app()
+        except (socket.timeout, socket.error):
+            self.close_connection = 1
+
+    def run_app(self):
+        """Runs the app for the parsed request and discards any part of
+        the request body the app didn't read. A request with an invalid
+        Content-Length gets a 400 Bad Request and the connection is
+        closed, as the end of its body can't be found.
+        """
+        try:
+            length = int(self.headers.getheader('content-length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = 1
+            self.send_error(400, 'Invalid Content-Length')
+            return
+        if self.headers.getheader('transfer-encoding'):
+            # Chunked request bodies aren't supported, the rest of the
+            # body is discarded with the connection
+            self.close_connection = 1
+
+        body = LimitedInput(self.rfile, length)
+        handler = ServerHandler(body, self.wfile, self.get_stderr(),
+                                self.get_environ(), multithread=True)
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+
+        if not self.close_connection and not body.drain():
+            self.close_connection = 1
+
+
+class ThreadPoolWSGIServer(simple_server.WSGIServer):
+    """WSGI server handing every accepted connection to one of a fixed
+    number of worker threads.
+
+    Accepted connections wait in a queue of queue_size connections.
+    When it's full the server stops accepting until a worker is free, so
+    new connections wait in the socket backlog instead of piling up in
+    memory.
+
+    Example:
+
+        server = ThreadPoolWSGIServer(('', 5000), WSGIRequestHandler,
+                                      threads=16)
+        server.set_app(app)
+        server.serve_forever()
+    """
+
+    def __init__(self, server_address, handler_class=WSGIRequestHandler,
+                 threads=DEFAULT_THREADS, queue_size=None,
+                 backlog=DEFAULT_BACKLOG,
+                 keep_alive_timeout=DEFAULT_KEEP_ALIVE_TIMEOUT,
+                 bind_and_activate=True):
+        # Read by server_activate, called from the base __init__
+        self.request_queue_size = backlog
+        simple_server.WSGIServer.__init__(self, server_address, handler_class,
+                                          bind_and_activate)
+
+        self.keep_alive_timeout = keep_alive_timeout
+        self.queue = Queue(queue_size or threads * 4)
+        self.workers = []
+        for i in range(threads):
+            worker = threading.Thread(target=self.__work,
+                                      name='pwf-worker-%d' % i)
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+    def process_request(self, request, client_address):
+        """Queues the connection for the worker threads"""
+        self.queue.put((request, client_address))
+
+    def server_close(self):
+        """Closes the socket and stops the workers once the queued
+        connections are handled.
+        """
+        simple_server.WSGIServer.server_close(self)
+        for worker in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+
+    def __work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+
+def make_server(host, port, app, threads=None, queue_size=None,
+                backlog=DEFAULT_BACKLOG,
+                keep_alive_timeout=DEFAULT_KEEP_ALIVE_TIMEOUT,
+                handler_class=None):
+    """Creates a server listening on host and port for app.
+
+    With threads set to a number of threads, or True for
+    DEFAULT_THREADS, a ThreadPoolWSGIServer is created. Otherwise the
+    wsgiref development server is used, which handles one request at
+    a time.
+    """
+    if not threads:
+        return simple_server.make_server(
+            host, port, app,
+            handler_class=handler_class or simple_server.WSGIRequestHandler)
+
+    if threads is True:
+        threads = DEFAULT_THREADS
+
+    server = ThreadPoolWSGIServer((host, port),
+                                  handler_class or WSGIRequestHandler,
+                                  threads, queue_size, backlog,
+                                  keep_alive_timeout)
+    server.set_app(app)
+    return server
+
+
+def listen_socket(host, port, backlog=DEFAULT_BACKLOG, reuse_port=False,
+                  listen=True):
+    """Creates a TCP socket listening on host and port. With reuse_port
+    the SO_REUSEPORT option is set, so several sockets can listen on the
+    same port and the kernel balances connections between them. With
+    listen set to False the socket is only bound.
+    """
+    reuse_port_option = getattr(socket, 'SO_REUSEPORT', None)
+    if reuse_port and reuse_port_option is None:
+        raise ValueError('SO_REUSEPORT is not supported on this platform')
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, reuse_port_option, 1)
+    sock.bind((host, port))
+    if listen:
+        sock.listen(backlog)
+    return sock
+
+
+def make_socket_server(sock, app, threads=None, queue_size=None,
+                       keep_alive_timeout=DEFAULT_KEEP_ALIVE_TIMEOUT,
+                       handler_class=None):
+    """Creates a server for app accepting connections on the listening
+    socket sock, which may be shared with other processes. Like
+    make_server it uses a ThreadPoolWSGIServer when threads is set.
+    """
+    if threads:
+        if threads is True:
+            threads = DEFAULT_THREADS
+        server = ThreadPoolWSGIServer(sock.getsockname(),
+                                      handler_class or WSGIRequestHandler,
+                                      threads, queue_size,
+                                      keep_alive_timeout=keep_alive_timeout,
+                                      bind_and_activate=False)
+    else:
+        server = simple_server.WSGIServer(
+            sock.getsockname(),
+            handler_class or simple_server.WSGIRequestHandler,
+            bind_and_activate=False)
+
+    server.socket.close()
+    server.socket = sock
+    host, port = sock.getsockname()[:2]
+    server.server_address = (host, port)
+    server.server_name = socket.getfqdn(host)
+    server.server_port = port
+    server.setup_environ()
+    server.set_app(app)
+    return server
+
+
+def current_rss():
+    """Returns the resident set size of the process in bytes. Falls
+    back to the peak size where /proc isn't available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, IndexError):
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on OS X and in kilobytes elsewhere
+        return rss if sys.platform == 'darwin' else rss * 1024
+
+
+class PreforkServer(object):
+    """A master process forking worker processes that each run a
+    server for the app, so requests are handled on several cores.
+
+    By default the master binds the socket before forking and every
+    worker accepts connections on it. With reuse_port each worker binds
+    its own socket with SO_REUSEPORT instead, which lets the kernel
+    spread connections evenly over the workers (Linux 3.9 and later).
+    Each worker handles one connection at a time, or uses a pool of
+    threads when threads is set.
+
+    The master restarts workers that exit. A worker exits by itself
+    after handling max_requests requests or once its resident memory
+    grows past max_rss bytes, so leaks are contained by recycling it.
+
+    Signals sent to the master:
+
+        SIGTERM, SIGINT  stop accepting, let the workers finish the
+                         requests in flight and exit. Workers still
+                         running after graceful_timeout seconds, or
+                         when the signal is sent again, are killed.
+        SIGHUP           drain and replace every worker, for example
+                         to recover memory.
+
+    Example:
+
+        server = PreforkServer(app, '0.0.0.0', 8000, workers=8)
+        server.serve_forever()
+    """
+
+    def __init__(self, app, host, port, workers, threads=None,
+                 reuse_port=False, max_requests=None, max_rss=None,
+                 backlog=DEFAULT_BACKLOG, queue_size=None,
+                 keep_alive_timeout=DEFAULT_KEEP_ALIVE_TIMEOUT,
+                 graceful_timeout=DEFAULT_GRACEFUL_TIMEOUT,
+                 handler_class=None):
+        self.app = app
+        self.host = host
+        self.workers = workers
+        self.threads = threads
+        self.reuse_port = reuse_port
+        self.max_requests = max_requests
+        self.max_rss = max_rss
+        self.backlog = backlog
+        self.queue_size = queue_size
+        self.keep_alive_timeout = keep_alive_timeout
+        self.graceful_timeout = graceful_timeout
+        self.handler_class = handler_class
+
+        # With reuse_port the master's socket is only bound, which
+        # reserves the port and finds it when port is 0, while the
+        # kernel only hands connections to the workers' sockets
+        self.socket = listen_socket(host, port, backlog, reuse_port,
+                                    listen=not reuse_port)
+        self.server_port = self.socket.getsockname()[1]
+
+        self.children = {}
+        self.stopping = False
+        self.running = True
+        self.handled = 0
+
+    def serve_forever(self):
+        """Starts the workers and restarts them as they exit, until the
+        master is told to stop. Only returns once every worker exited.
+        """
+        signal.signal(signal.SIGTERM, self.__stop)
+        signal.signal(signal.SIGINT, self.__stop)
+        signal.signal(signal.SIGHUP, self.__reload)
+        signal.signal(signal.SIGALRM, self.__kill)
+
+        try:
+            for i in range(self.workers):
+                self.spawn()
+
+            while self.children:
+                try:
+                    pid, status = os.wait()
+                except OSError as e:
+                    if e.errno == errno.EINTR:
+                        continue
+                    if e.errno == errno.ECHILD:
+                        break
+                    raise
+
+                started = self.children.pop(pid, None)
+                if started is None:
+                    continue
+                if status and time.time() - started < MIN_WORKER_LIFETIME:
+                    time.sleep(MIN_WORKER_LIFETIME)
+                if not self.stopping:
+                    self.spawn()
+        finally:
+            signal.alarm(0)
+            self.socket.close()
+
+    def spawn(self):
+        """Forks a worker process. Returns its pid in the master."""
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.time()
+            return pid
+
+        code = 0
+        try:
+            self.run_worker()
+        except Exception:
+            traceback.print_exc()
+            code = 1
+        finally:
+            # Never return into the master's code, or run its cleanup
+            os._exit(code)
+
+    def run_worker(self):
+        """The main loop of a worker process. Handles requests until it
+        is told to stop or reaches max_requests or max_rss, then
+        finishes the connections it accepted and returns.
+        """
+        self.children = {}
+        signal.signal(signal.SIGTERM, self.__drain)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGALRM, signal.SIG_DFL)
+        # Ctrl+C reaches the whole process group, the master decides
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        if self.reuse_port:
+            self.socket.close()
+            self.socket = listen_socket(self.host, self.server_port,
+                                        self.backlog, True)
+        # Another worker may take a connection between select and
+        # accept, which must then fail instead of blocking
+        self.socket.setblocking(0)
+
+        counter = itertools.count(1)
+        app = self.app
+
+        def counting_app(environ, start_response):
+            self.handled = next(counter)
+            return app(environ, start_response)
+
+        server = make_socket_server(self.socket, counting_app, self.threads,
+                                    self.queue_size, self.keep_alive_timeout,
+                                    self.handler_class)
+        server.timeout = WORKER_POLL_INTERVAL
+        try:
+            while self.running and not self.should_recycle():
+                server.handle_request()
+        finally:
+            server.server_close()
+            # Let the app finish work queued by the requests, like
+            # background tasks, before the process exits
+            close = getattr(app, 'close', None)
+            if close is not None:
+                close()
+
+    def should_recycle(self):
+        """Checks if the worker reached max_requests or max_rss"""
+        if self.max_requests is not None and \
+                self.handled >= self.max_requests:
+            return True
+        return self.max_rss is not None and current_rss() > self.max_rss
+
+    def __drain(self, signum, frame):
+        self.running = False
+
+    def __stop(self, signum, frame):
+        if self.stopping:
+            self.__kill(signum, frame)
+            return
+        self.stopping = True
+        self.__signal_children(signal.SIGTERM)
+        if self.graceful_timeout:
+            signal.alarm(int(self.graceful_timeout))
+
+    def __reload(self, signum, frame):
+        if not self.stopping:
+            self.__signal_children(signal.SIGTERM)
+
+    def __kill(self, signum, frame):
+        self.__signal_children(signal.SIGKILL)
+
+    def __signal_children(self, signum):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except OSError:
+                pass
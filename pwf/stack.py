@@ -3,33 +3,224 @@
 @author: Victor Kohler
 @since: date 07/01/2017
 @version: 0.1
+
+Implements the app and request contexts. The app handling a request
+and the request itself are pushed on context-local stacks for as long
+as the request runs, so helpers can reach them through the
+current_app, current_request and g proxies instead of having the
+request passed around.
+
+The stacks are local to each thread, or to each greenlet when greenlet
+is installed, so concurrent requests never see each other's state.
 """
 
+from functools import wraps
+
+from exceptions import ContextError
+
+try:
+    from greenlet import getcurrent as get_ident
+except ImportError:
+    from thread import get_ident
+
 
 class AppStack(object):
-    
+    """A stack with separate items for every thread or greenlet. Looking
+    up the top is a dict lookup and a list index. The items of a thread
+    are dropped when its stack is emptied, so finished threads leave
+    nothing behind.
+    """
+
     def __init__(self):
-        self.items = []
+        self.__stacks = {}
 
     def push(self, item):
-        self.items.append(item)
+        self.__stacks.setdefault(get_ident(), []).append(item)
 
     def pop(self):
-        return self.items.pop()
+        ident = get_ident()
+        items = self.__stacks.get(ident, [])
+        item = items.pop()
+        if not items:
+            self.__stacks.pop(ident, None)
+        return item
+
+    @property
+    def items(self):
+        return self.__stacks.get(get_ident(), [])
 
-    @property 
+    @property
     def top(self):
-        try:
-            return self.items[-1]
-        except (AttributeError, IndexError):
-            return None
+        items = self.__stacks.get(get_ident())
+        if items:
+            return items[-1]
+        return None
 
-    @property    
+    @property
     def is_empty(self):
-        return (self.items == [])
+        return not self.__stacks.get(get_ident())
 
     def reset(self):
-        self.items = []
-    
+        self.__stacks.pop(get_ident(), None)
+
+
+class Globals(object):
+    """Storage for anything a request needs to keep around, like the
+    current user or a database connection. A new one is created for
+    every request and reached through the g proxy.
+    """
+
+    def get(self, name, default=None):
+        return self.__dict__.get(name, default)
+
+    def pop(self, name, *default):
+        return self.__dict__.pop(name, *default)
+
+    def setdefault(self, name, default=None):
+        return self.__dict__.setdefault(name, default)
+
+    def __contains__(self, name):
+        return name in self.__dict__
+
+    def __iter__(self):
+        return iter(self.__dict__)
+
+    def __repr__(self):
+        return '<%s %r>' % (self.__class__.__name__, self.__dict__)
+
+
+class RequestContext(object):
+    """The state of one request: the app handling it, the Request
+    object and the g storage. Pushing it also pushes the app.
+
+    Example:
+
+        with RequestContext(app, Request(environ)):
+            assert current_request.environ is environ
+    """
+
+    def __init__(self, app, request):
+        self.app = app
+        self.request = request
+        self.g = Globals()
+
+    def push(self):
+        _app_stack.push(self.app)
+        _request_stack.push(self)
+
+    def pop(self):
+        _request_stack.pop()
+        _app_stack.pop()
+
+    def __enter__(self):
+        self.push()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.pop()
+
+    def __repr__(self):
+        return '<%s %r>' % (self.__class__.__name__, self.request)
+
+
+class LocalProxy(object):
+    """Forwards every operation to the object returned by lookup, which
+    is called each time, so the proxy always stands for the object of
+    the current request.
+    """
+
+    __slots__ = ('_LocalProxy__lookup',)
+
+    def __init__(self, lookup):
+        object.__setattr__(self, '_LocalProxy__lookup', lookup)
+
+    def _get_current_object(self):
+        """Returns the object the proxy currently stands for"""
+        return self.__lookup()
+
+    def __getattr__(self, name):
+        return getattr(self.__lookup(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.__lookup(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self.__lookup(), name)
+
+    def __getitem__(self, key):
+        return self.__lookup()[key]
+
+    def __contains__(self, item):
+        return item in self.__lookup()
+
+    def __iter__(self):
+        return iter(self.__lookup())
+
+    def __nonzero__(self):
+        try:
+            return bool(self.__lookup())
+        except ContextError:
+            return False
+
+    def __eq__(self, other):
+        return self.__lookup() == other
+
+    def __ne__(self, other):
+        return self.__lookup() != other
+
+    def __repr__(self):
+        try:
+            return repr(self.__lookup())
+        except ContextError:
+            return '<%s unbound>' % self.__class__.__name__
+
+
+def _lookup_app():
+    app = _app_stack.top
+    if app is None:
+        raise ContextError('Working outside of the app context')
+    return app
+
+
+def _lookup_context():
+    ctx = _request_stack.top
+    if ctx is None:
+        raise ContextError('Working outside of a request')
+    return ctx
+
+
+def bind_context(func):
+    """Returns a function calling func with the app and request context
+    of the caller pushed, for running code that needs them in another
+    thread or greenlet.
+    """
+    app = _app_stack.top
+    ctx = _request_stack.top
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if ctx is not None:
+            ctx.push()
+        elif app is not None:
+            _app_stack.push(app)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if ctx is not None:
+                ctx.pop()
+            elif app is not None:
+                _app_stack.pop()
+    return wrapper
+
 
 _app_stack = AppStack()
+_request_stack = AppStack()
+
+#: The app handling the current request
+current_app = LocalProxy(_lookup_app)
+
+#: The Request object of the current request
+current_request = LocalProxy(lambda: _lookup_context().request)
+
+#: The Globals of the current request
+g = LocalProxy(lambda: _lookup_context().g)
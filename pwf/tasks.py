@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+
+Implements the background tasks added with
+request.add_background_task. The tasks of a request are queued once the
+server has sent the response and closes the body, and run on a bounded
+pool of threads so follow-up work like audit writes or webhooks doesn't
+add to the response time.
+"""
+
+import os
+import threading
+import traceback
+from Queue import Queue, Full
+
+from utils import log
+
+
+#: Threads running background tasks unless TASK_THREADS is set
+DEFAULT_TASK_THREADS = 4
+
+#: Tasks waiting for a thread unless TASK_QUEUE_SIZE is set
+DEFAULT_TASK_QUEUE_SIZE = 1000
+
+#: What to do with a task when the queue is full, unless TASK_OVERFLOW
+#: is set. 'run' runs it in the thread that handled the request, after
+#: the response was sent, 'block' waits for room in the queue and
+#: 'drop' discards it with a warning.
+DEFAULT_TASK_OVERFLOW = 'run'
+
+OVERFLOW_POLICIES = ('run', 'block', 'drop')
+
+
+class TaskPool(object):
+    """Runs tasks on a fixed number of daemon threads fed by a queue of
+    queue_size tasks. overflow is the policy used when the queue is
+    full, see DEFAULT_TASK_OVERFLOW.
+
+    The threads are started by the first task submitted, and again in a
+    forked process, so a pool created before forking works in every
+    worker. Exceptions raised by a task are logged with their traceback
+    and counted.
+
+    Example:
+
+        pool = TaskPool(threads=2, queue_size=100, overflow='drop')
+        pool.submit(send_webhook, url, payload)
+        pool.close()
+    """
+
+    def __init__(self, threads=DEFAULT_TASK_THREADS,
+                 queue_size=DEFAULT_TASK_QUEUE_SIZE,
+                 overflow=DEFAULT_TASK_OVERFLOW):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('Unknown overflow policy %r' % overflow)
+        self.threads = threads
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.queue = None
+        self.workers = []
+        self.pid = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """Queues func to be called with args and kwargs. Returns False
+        if the queue was full and the task was run or dropped instead.
+        """
+        self.__start()
+        task = (func, args, kwargs)
+        with self.lock:
+            self.submitted += 1
+
+        if self.overflow == 'block':
+            self.queue.put(task)
+            return True
+        try:
+            self.queue.put_nowait(task)
+            return True
+        except Full:
+            pass
+
+        if self.overflow == 'run':
+            self.run(task)
+        else:
+            with self.lock:
+                self.dropped += 1
+            log('Background task %s dropped, the queue is full' % (
+                getattr(func, '__name__', func),))
+        return False
+
+    def run(self, task):
+        """Runs a task, logging any exception it raises"""
+        func, args, kwargs = task
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            with self.lock:
+                self.failed += 1
+            log('Background task %s failed:\n%s' % (
+                getattr(func, '__name__', func), traceback.format_exc()))
+        else:
+            with self.lock:
+                self.completed += 1
+
+    def close(self, wait=True):
+        """Stops the threads once the queued tasks are done. With wait
+        set, returns only after they have finished.
+        """
+        if self.pid != os.getpid():
+            return
+        for worker in self.workers:
+            self.queue.put(None)
+        if wait:
+            for worker in self.workers:
+                worker.join()
+        self.workers = []
+        self.pid = None
+
+    @property
+    def stats(self):
+        """The task counters as a dictionary"""
+        queued = self.queue.qsize() if self.queue is not None else 0
+        return {'submitted': self.submitted, 'completed': self.completed,
+                'failed': self.failed, 'dropped': self.dropped,
+                'queued': queued}
+
+    def __start(self):
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.queue = Queue(self.queue_size)
+            self.workers = []
+            for i in range(self.threads):
+                worker = threading.Thread(target=self.__work,
+                                          name='pwf-task-%d' % i)
+                worker.daemon = True
+                worker.start()
+                self.workers.append(worker)
+            self.pid = os.getpid()
+
+    def __work(self):
+        queue = self.queue
+        while True:
+            task = queue.get()
+            if task is None:
+                return
+            self.run(task)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.stats)
+
+
+def submit_tasks(pool, tasks):
+    """Submits a list of (func, args, kwargs) tasks to pool"""
+    for func, args, kwargs in tasks:
+        pool.submit(func, *args, **kwargs)
+
+
+class TaskBody(object):
+    """Wraps a streamed body returned to the server so the tasks of the
+    request are submitted to pool when the server closes it, after the
+    whole response was sent.
+    """
+
+    def __init__(self, body, pool, tasks):
+        self.body = body
+        self.pool = pool
+        self.tasks = tasks
+
+    def __iter__(self):
+        return iter(self.body)
+
+    def close(self):
+        try:
+            close = getattr(self.body, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            submit_tasks(self.pool, self.tasks)
+
+
+class TaskList(list):
+    """A string body in a list, which lets the server set its
+    Content-Length, submitting the tasks of the request to pool when
+    the server closes it.
+    """
+
+    def __init__(self, body, pool, tasks):
+        list.__init__(self, [body])
+        self.pool = pool
+        self.tasks = tasks
+
+    def close(self):
+        submit_tasks(self.pool, self.tasks)
+
+
+def is_file_wrapper(body, environ):
+    """Checks if body was made by the wsgi.file_wrapper of environ"""
+    file_wrapper = environ.get('wsgi.file_wrapper')
+    if file_wrapper is None:
+        return False
+    try:
+        return isinstance(body, file_wrapper)
+    except TypeError:
+        # The server gave a factory function instead of a class
+        return False
+
+
+def close_with_tasks(body, pool, tasks):
+    """Replaces the close method of body with one submitting the tasks
+    of the request to pool after closing it, and returns body. Falls
+    back to a TaskBody if close can't be replaced.
+    """
+    close = getattr(body, 'close', None)
+
+    def close_and_submit():
+        try:
+            if close is not None:
+                close()
+        finally:
+            submit_tasks(pool, tasks)
+
+    try:
+        body.close = close_and_submit
+    except AttributeError:
+        return TaskBody(body, pool, tasks)
+    return body
+
+
+def with_tasks(body, pool, tasks, environ=None):
+    """Wraps the body returned by the app to run tasks once it's sent.
+    A body made by the wsgi.file_wrapper of environ is returned as it
+    is, so the server still recognizes it and can send the file with
+    sendfile, and its close method submits the tasks instead.
+    """
+    if isinstance(body, str):
+        return TaskList(body, pool, tasks)
+    if environ is not None and is_file_wrapper(body, environ):
+        return close_with_tasks(body, pool, tasks)
+    return TaskBody(body, pool, tasks)
@@ -8,6 +8,9 @@ Implements a set of utilities used throughout Pwf but some
 might be useful to use in other circumstances as well.
 """
 import logging
+import calendar
+from datetime import datetime
+from email.utils import formatdate, parsedate_tz, mktime_tz
 
 
 class cached_property(property):
@@ -51,6 +54,42 @@ class cached_property(property):
 
 
 
+def http_date(timestamp=None):
+    """Formats a timestamp as an HTTP date, like
+    'Wed, 21 Dec 2016 21:28:34 GMT'. Uses the current time
+    if no timestamp is given.
+    """
+    return formatdate(timestamp, usegmt=True)
+
+
+def parse_http_date(value):
+    """Parses an HTTP date like 'Wed, 21 Dec 2016 21:28:34 GMT' into a
+    timestamp. Returns None if the date can't be parsed.
+    """
+    if not value:
+        return None
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    try:
+        return mktime_tz(parsed)
+    except (OverflowError, ValueError):
+        return None
+
+
+def to_timestamp(value):
+    """Turns a timestamp, an HTTP date string or a naive UTC datetime
+    into a timestamp. Returns None for None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    if isinstance(value, basestring):
+        return parse_http_date(value)
+    return value
+
+
 def log(info):
     """TODO: Implement a real loggin solution"""
     print info
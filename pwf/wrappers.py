@@ -77,6 +77,164 @@ class FileWrapper(object):
         return self.file.readline()
 
 
+class StreamingBody(object):
+    """Wraps a generator, iterator or file-like object returned as
+    response data so it can be handed to the WSGI server and sent
+    chunk by chunk.
+
+    Unicode chunks are encoded to UTF-8 as they are sent. File-like
+    objects are read buffer_size bytes at a time. The WSGI server
+    calls close() once the response is sent, which closes the wrapped
+    object if it supports it.
+    """
+
+    def __init__(self, body, buffer_size=16384):
+        self.body = body
+
+        if hasattr(body, 'read'):
+            self.iterator = iter(lambda: body.read(buffer_size), b'')
+        else:
+            self.iterator = iter(body)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        chunk = next(self.iterator)
+        if isinstance(chunk, unicode):
+            chunk = chunk.encode('utf-8')
+        return chunk
+
+    __next__ = next
+
+    def close(self):
+        """Close the wrapped object if it has a close method"""
+        close = getattr(self.body, 'close', None)
+        if close is not None:
+            close()
+
+
+class Headers(object):
+    """Case insensitive container for response headers that can hold
+    several values for the same header, like multiple Set-Cookie headers.
+
+    The headers are kept as the list of (name, value) tuples handed to
+    the WSGI server, along with an index of the values by lowercase
+    name so lookups don't need to scan the list.
+
+    Example:
+
+        headers = Headers({'Content-Type': 'text/html'})
+        headers.add('Set-Cookie', 'a=1')
+        headers.add('Set-Cookie', 'b=2')
+        headers['content-type']
+        # -> 'text/html'
+        headers.getlist('Set-Cookie')
+        # -> ['a=1', 'b=2']
+    """
+
+    def __init__(self, defaults=None):
+        self._list = []
+        self._index = {}
+        if defaults:
+            self.update(defaults)
+
+    def add(self, name, value):
+        """Adds a header without replacing existing ones"""
+        if not isinstance(value, str):
+            value = bytes(value)
+        self._list.append((name, value))
+        self._index.setdefault(name.lower(), []).append(value)
+
+    def get(self, name, default=None):
+        """Returns the first value of a header or default"""
+        values = self._index.get(name.lower())
+        if values is None:
+            return default
+        return values[0]
+
+    def getlist(self, name):
+        """Returns every value of a header as a list"""
+        return list(self._index.get(name.lower(), ()))
+
+    def pop(self, name, default=None):
+        """Removes a header and returns its first value or default"""
+        value = self.get(name, default)
+        self.remove(name)
+        return value
+
+    def remove(self, name):
+        """Removes every value of a header, if it exists"""
+        lower = name.lower()
+        if self._index.pop(lower, None) is not None:
+            self._list = [h for h in self._list if h[0].lower() != lower]
+
+    def setdefault(self, name, value):
+        if name not in self:
+            self.add(name, value)
+        return self[name]
+
+    def update(self, headers):
+        """Sets each header in a dict or Headers object, replacing
+        existing values.
+        """
+        for name, value in headers.items():
+            self[name] = value
+
+    def keys(self):
+        return [name for name, value in self._list]
+
+    def values(self):
+        return [value for name, value in self._list]
+
+    def items(self):
+        return list(self._list)
+
+    def to_wsgi_list(self):
+        """Returns the list of (name, value) tuples for the WSGI server
+        without copying it.
+        """
+        return self._list
+
+    def __getitem__(self, name):
+        values = self._index.get(name.lower())
+        if values is None:
+            raise KeyError(name)
+        return values[0]
+
+    def __setitem__(self, name, value):
+        self.remove(name)
+        self.add(name, value)
+
+    def __delitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        self.remove(name)
+
+    def __contains__(self, name):
+        return name.lower() in self._index
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self._list)
+
+    def __eq__(self, other):
+        if isinstance(other, Headers):
+            return self._list == other._list
+        if isinstance(other, dict):
+            return dict(self._list) == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        rv = self.__eq__(other)
+        return rv if rv is NotImplemented else not rv
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self._list)
+
+
 class Config(dict):
     """Subclass of dictionary adding the capability of loading
     the configuration from a json file. The config objects
@@ -35,7 +35,7 @@ class CreateEnviron(object):
 
             self.stream = None
 
-    def get(self, key, default):
+    def get(self, key, default=None):
         if key in self.environ:
             return self.environ[key]
         else:
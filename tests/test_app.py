@@ -6,14 +6,18 @@
 """
 
 
+import time
 import pytest
 import json
+import threading
 from wsgiref.simple_server import make_server
-from mock import Mock
+from mock import Mock, patch
 
 from pwf.app import Pwf
 from pwf.request import Request
 from pwf.response import Response
+from pwf.cache import ResponseCache
+from pwf.exceptions import AppFrozenError
 from mocks.environ import CreateEnviron
 from mocks.make_response import make_response
 
@@ -44,6 +48,16 @@ def test_basic_routing(app, environ):
         assert callable(view_function)
 
 
+def test_typed_routing(app, environ):
+    @app.route('/user/<int:id>')
+    def view_func(r, id):
+        assert isinstance(id, int)
+        return 'User %d' % id
+
+    assert fake_request('/user/12', app, environ) == 'User 12'
+    assert fake_request('/user/walter', app, environ) == '404 Not Found'
+
+
 def test_view_function(app, environ):
     @app.route('/')
     def view_func(r):
@@ -81,6 +95,60 @@ def test_unsupported_method(app, environ):
     assert render_data == '405 Method Not Allowed'
 
 
+def test_method_routing(app):
+    @app.route('/item', methods=['GET'])
+    def get_item(r):
+        return 'GET item'
+
+    @app.route('/item', methods=['POST'])
+    def post_item(r):
+        return 'POST item'
+
+    assert fake_request('/item', app, CreateEnviron()) == 'GET item'
+    assert fake_request('/item', app, CreateEnviron(method='POST')) == \
+        'POST item'
+
+
+def test_allow_header(app):
+    @app.route('/post', methods=['POST'])
+    def view_func(r):
+        return 'Posted'
+
+    make_response = Mock()
+    render_data = app(CreateEnviron(path='/post').environ, make_response)
+    status, headers = make_response.call_args[0]
+    assert render_data == '405 Method Not Allowed'
+    assert status == '405 Method Not Allowed'
+    assert ('Allow', 'OPTIONS, POST') in headers
+
+
+def test_automatic_options(app):
+    @app.route('/', methods=['GET', 'POST'])
+    def view_func(r):
+        return 'Hello'
+
+    make_response = Mock()
+    environ = CreateEnviron(method='OPTIONS')
+    render_data = app(environ.environ, make_response)
+    status, headers = make_response.call_args[0]
+    assert render_data == ''
+    assert status == '200 OK'
+    assert ('Allow', 'GET, HEAD, OPTIONS, POST') in headers
+
+
+def test_automatic_head(app):
+    @app.route('/')
+    def view_func(r):
+        assert r.method == 'HEAD'
+        return 'Hello'
+
+    make_response = Mock()
+    render_data = app(CreateEnviron(method='HEAD').environ, make_response)
+    status, headers = make_response.call_args[0]
+    assert render_data == ''
+    assert status == '200 OK'
+
+
 def test_response_return(app, environ):
     @app.route('/')
     def view_func(r):
@@ -91,6 +159,15 @@ def test_response_return(app, environ):
     assert render_data == 'Hello'
 
 
+def test_streamed_return(app, environ):
+    @app.route('/export')
+    def export(r):
+        return ('row %d\n' % i for i in range(3))
+
+    render_data = fake_request('/export', app, environ)
+    assert ''.join(render_data) == 'row 0\nrow 1\nrow 2\n'
+
+
 def test_make_response(app, environ):
     data = 'Hello World'
     resp = app.make_response(data)
@@ -233,6 +310,12 @@ def test_internal_error(app, environ):
     render_data = fake_request('/', app, environ)
     assert render_data == '500 Internal Server Error'
 
+
+def test_internal_error_handler(app, environ):
+    @app.route('/')
+    def index(r):
+        return some_variable
+
     @app.error(500)
     def handle_error():
         return 'An error'
@@ -273,6 +356,59 @@ def test_error(app, environ):
     assert render_data_2 == 'Forbidden'
 
 
+def test_freeze(app, environ):
+    @app.route('/')
+    def index(r):
+        return 'Hello'
+
+    assert not app.frozen
+    assert fake_request('/', app, environ) == 'Hello'
+    assert app.frozen
+
+    with pytest.raises(AppFrozenError):
+        app.route('/late')(index)
+
+    with pytest.raises(AppFrozenError):
+        app.first()(index)
+
+    with pytest.raises(AppFrozenError):
+        app.last(group='one')(index)
+
+    with pytest.raises(AppFrozenError):
+        app.error(404)(index)
+
+
+def test_concurrent_freeze(app):
+    @app.route('/')
+    def index(r):
+        return 'Hello'
+
+    created = []
+
+    def slow_cache(*args):
+        created.append(args)
+        time.sleep(0.05)
+        return ResponseCache(*args)
+
+    with patch('pwf.app.ResponseCache', slow_cache):
+        threads = [threading.Thread(target=app.freeze) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert app.frozen
+    assert len(created) == 1
+
+
+def test_first_unmatched_path(app, environ):
+    @app.first()
+    def first_func(r):
+        return 'FIRST'
+
+    assert fake_request('/missing', app, environ) == 'FIRST'
+
+
 def test_config(app):
     app.config.update(dict(DEBUG=True))
     assert app.config['DEBUG']
@@ -291,10 +427,13 @@ def test_simple_serving(app, monkeypatch, capsys):
 
 
 class MockSimpleServer(object):
-    def __init__(self, string, port, server):
-        pass
+    def __init__(self, host, port, server, **kwargs):
+        assert host == '127.0.0.1'
 
     def serve_forever(self):
+        return
+
+    def server_close(self):
         return 
 
 
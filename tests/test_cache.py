@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+"""
+
+import time
+import pytest
+import threading
+from mock import Mock
+
+from pwf.app import Pwf
+from pwf.response import Response
+from pwf.request import Request
+from pwf.cache import ResponseCache, CacheEntry, SingleFlight, is_cacheable
+from pwf.cache import CoalesceOptions, coalesce_key
+from pwf.exceptions import ServiceUnavailable
+from mocks.environ import CreateEnviron
+
+
+@pytest.fixture
+def app():
+    app = Pwf()
+    with app.app_context():
+        yield app
+
+
+def entry(body, headers=(), expires=None):
+    return CacheEntry('200 OK', [('Content-Type', 'text/html')] +
+                      list(headers), body, expires)
+
+
+def test_cache_lru():
+    cache = ResponseCache(max_entries=2)
+    cache.set('a', {}, entry('A'))
+    cache.set('b', {}, entry('B'))
+    assert cache.get('a', {}).body == 'A'
+    cache.set('c', {}, entry('C'))
+    assert cache.get('b', {}) is None
+    assert cache.get('a', {}).body == 'A'
+    assert cache.stats == {'hits': 2, 'misses': 1, 'evictions': 1,
+                           'entries': 2, 'bytes': 2}
+
+
+def test_cache_max_bytes():
+    cache = ResponseCache(max_bytes=10)
+    cache.set('a', {}, entry('x' * 6))
+    cache.set('b', {}, entry('x' * 6))
+    assert len(cache) == 1
+    assert cache.get('a', {}) is None
+    cache.set('c', {}, entry('x' * 11))
+    assert cache.get('c', {}) is None
+    assert cache.size == 6
+
+
+def test_cache_ttl():
+    cache = ResponseCache()
+    cache.set('a', {}, entry('A', expires=0))
+    assert cache.get('a', {}) is None
+    assert cache.size == 0
+
+
+def test_cache_vary():
+    cache = ResponseCache()
+    cache.set('a', {'HTTP_ACCEPT_ENCODING': 'gzip'},
+              entry('gzip', [('Vary', 'Accept-Encoding')]))
+    assert cache.get('a', {}) is None
+    assert cache.get('a', {'HTTP_ACCEPT_ENCODING': 'gzip'}).body == 'gzip'
+
+    cache.set('b', {}, entry('B', [('Vary', '*')]))
+    assert cache.get('b', {}) is None
+
+
+def test_is_cacheable():
+    environ = {'REQUEST_METHOD': 'GET'}
+    assert is_cacheable(Response(data='data'), environ)
+    assert not is_cacheable(Response(data='data', code=404), environ)
+    assert not is_cacheable(Response(data=iter(['data'])), environ)
+    assert not is_cacheable(
+        Response(data=('data', {'Cache-Control': 'private'})), environ)
+    response = Response(data='data')
+    response.set_cookie('key', 'value')
+    assert not is_cacheable(response, environ)
+    assert not is_cacheable(Response(data='data'),
+                            {'REQUEST_METHOD': 'POST'})
+
+
+def test_app_cache(app):
+    calls = []
+
+    @app.route('/report')
+    @app.cache(ttl=60, query=['year'])
+    def report(request):
+        calls.append(request.query.get('year'))
+        return 'Report %s' % request.query.get('year')
+
+    @app.cache(ttl=60)
+    @app.route('/other')
+    def other(request):
+        calls.append('other')
+        return 'Other'
+
+    make_response = Mock()
+    for query in ('year=2016', 'year=2016&page=2', 'year=2017'):
+        environ = CreateEnviron(path='/report', query_string=query)
+        assert app(environ.environ, make_response) == \
+            'Report %s' % query[5:9]
+    assert calls == ['2016', '2017']
+    assert make_response.call_args[0][0] == '200 OK'
+
+    environ = CreateEnviron(path='/other')
+    assert app(environ.environ, make_response) == 'Other'
+    assert app(environ.environ, make_response) == 'Other'
+    environ = CreateEnviron(path='/other', method='HEAD')
+    assert app(environ.environ, make_response) == ''
+    assert calls == ['2016', '2017', 'other']
+    assert app.response_cache.stats['hits'] == 3
+
+
+def test_app_cache_key_and_etag(app):
+    app.config['AUTO_ETAG'] = True
+    calls = []
+
+    @app.route('/')
+    @app.cache(key=lambda request: 'home')
+    def home(request):
+        calls.append(True)
+        return 'Home'
+
+    make_response = Mock()
+    environ = CreateEnviron(query_string='a=1')
+    assert app(environ.environ, make_response) == 'Home'
+    etag = dict(make_response.call_args[0][1])['ETag']
+
+    environ = CreateEnviron(query_string='a=2')
+    environ.environ['HTTP_IF_NONE_MATCH'] = etag
+    assert app(environ.environ, make_response) == ''
+    status, headers = make_response.call_args[0]
+    assert status == '304 Not Modified'
+    assert headers == [('ETag', etag)]
+    assert len(calls) == 1
+
+
+def test_app_cache_post(app):
+    calls = []
+
+    @app.route('/', methods=['GET', 'POST'])
+    @app.cache()
+    def view(request):
+        calls.append(request.method)
+        return 'Hello'
+
+    for method in ('POST', 'POST', 'GET', 'GET'):
+        app(CreateEnviron(method=method).environ, Mock())
+    assert calls == ['POST', 'POST', 'GET']
+
+
+def test_app_cache_first_funcs(app):
+    @app.first()
+    def authorize(request):
+        if request.environ.get('HTTP_AUTHORIZATION') != 'Bearer secret':
+            return Response(code=403, data='Forbidden')
+
+    @app.route('/report')
+    @app.cache(ttl=60)
+    def report(request):
+        return 'top secret report'
+
+    make_response = Mock()
+    environ = CreateEnviron(path='/report')
+    environ.environ['HTTP_AUTHORIZATION'] = 'Bearer secret'
+    assert app(environ.environ, make_response) == 'top secret report'
+    assert len(app.response_cache) == 1
+
+    # The first function runs on a hit too
+    body = app(CreateEnviron(path='/report').environ, make_response)
+    assert body == 'Forbidden'
+    assert make_response.call_args[0][0] == '403 Forbidden'
+
+    # Other credentials are cached apart
+    environ = CreateEnviron(path='/report')
+    environ.environ['HTTP_COOKIE'] = 'session=1'
+    environ.environ['HTTP_AUTHORIZATION'] = 'Bearer secret'
+    assert app(environ.environ, make_response) == 'top secret report'
+    assert len(app.response_cache) == 2
+
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_single_flight():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def load():
+        calls.append(True)
+        release.wait(5)
+        return 'result'
+
+    threads = run_threads(5, lambda: results.append(flights.do('a', load)))
+    while len(flights) == 0:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [('result', False)] * (len(results) - 1) + \
+        [('result', True)]
+    assert len(flights) == 0
+
+
+def test_single_flight_error():
+    flights = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def load():
+        release.wait(5)
+        raise ValueError('failed')
+
+    def call():
+        try:
+            flights.do('a', load)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = run_threads(3, call)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 3
+
+
+def test_single_flight_timeout():
+    flights = SingleFlight()
+    release = threading.Event()
+    thread = run_threads(1, lambda: flights.do('a', lambda: release.wait(5)))
+    while len(flights) == 0:
+        pass
+
+    with pytest.raises(ServiceUnavailable):
+        flights.do('a', lambda: 'never', timeout=0.01)
+    release.set()
+    thread[0].join()
+
+
+def test_app_coalesce(app):
+    release = threading.Event()
+    calls = []
+
+    @app.route('/slow')
+    @app.coalesce(timeout=5)
+    def slow(request):
+        calls.append(True)
+        release.wait(5)
+        return 'Slow'
+
+    app.freeze()
+    results = []
+
+    def request():
+        make_response = Mock()
+        body = app(CreateEnviron(path='/slow').environ, make_response)
+        results.append((make_response.call_args[0][0], body))
+
+    threads = run_threads(5, request)
+    while len(app.flights) == 0:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [('200 OK', 'Slow')] * 5
+    assert len(calls) < 5
+
+
+def test_app_coalesce_timeout(app):
+    release = threading.Event()
+
+    @app.route('/slow')
+    @app.coalesce(timeout=0.01)
+    def slow(request):
+        release.wait(5)
+        return 'Slow'
+
+    app.freeze()
+    thread = run_threads(
+        1, lambda: app(CreateEnviron(path='/slow').environ, Mock()))
+    while len(app.flights) == 0:
+        pass
+
+    make_response = Mock()
+    assert app(CreateEnviron(path='/slow').environ, make_response) == \
+        '503 Service Unavailable'
+    release.set()
+    thread[0].join()
+
+
+def test_app_coalesce_error(app):
+    release = threading.Event()
+    calls = []
+
+    @app.route('/broken')
+    @app.coalesce(timeout=5)
+    def broken(request):
+        calls.append(True)
+        release.wait(5)
+        raise ValueError('Upstream is down')
+
+    app.freeze()
+    results = []
+
+    def request():
+        make_response = Mock()
+        app(CreateEnviron(path='/broken').environ, make_response)
+        results.append(make_response.call_args[0][0])
+
+    threads = run_threads(5, request)
+    while len(app.flights) == 0:
+        pass
+    # Let the other requests join the flight before the view fails
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['500 Internal Server Error'] * 5
+    assert len(calls) == 1
+
+
+def test_app_coalesce_first_funcs(app):
+    release = threading.Event()
+    checked = []
+
+    @app.first()
+    def block(request):
+        checked.append(request.environ.get('REMOTE_ADDR'))
+        if request.environ.get('REMOTE_ADDR') == '10.0.0.1':
+            return Response(code=403, data='Forbidden')
+
+    @app.route('/slow')
+    @app.coalesce(timeout=5)
+    def slow(request):
+        release.wait(5)
+        return 'Slow'
+
+    app.freeze()
+    thread = run_threads(
+        1, lambda: app(CreateEnviron(path='/slow').environ, Mock()))
+    while len(app.flights) == 0:
+        pass
+
+    # Rejected by the first function without waiting for the flight
+    environ = CreateEnviron(path='/slow').environ
+    environ['REMOTE_ADDR'] = '10.0.0.1'
+    make_response = Mock()
+    assert app(environ, make_response) == 'Forbidden'
+    assert make_response.call_args[0][0] == '403 Forbidden'
+    assert len(app.flights) == 1
+
+    release.set()
+    thread[0].join()
+    assert checked[-1] == '10.0.0.1'
+    assert len(checked) == 2
+
+
+def test_coalesce_key_credentials(app):
+    options = CoalesceOptions()
+    keys = set()
+    for headers in ({}, {'HTTP_COOKIE': 'session=a'},
+                    {'HTTP_COOKIE': 'session=b'},
+                    {'HTTP_AUTHORIZATION': 'Bearer a'}):
+        environ = CreateEnviron(path='/').environ
+        environ.update(headers)
+        keys.add(coalesce_key(Request(environ), options))
+    assert len(keys) == 4
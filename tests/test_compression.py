@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+"""
+
+import zlib
+import gzip
+import pytest
+from io import BytesIO
+from mock import Mock
+
+from pwf.app import Pwf
+from pwf.response import Response
+from pwf.exceptions import BadRequest, RequestEntityTooLarge
+from pwf.compression import (negotiate_encoding, is_compressible, compress,
+                             CompressedBody, compress_response,
+                             request_encoding, decompress_chunks)
+from mocks.environ import CreateEnviron
+
+
+@pytest.fixture
+def app():
+    app = Pwf()
+    app.config['COMPRESS'] = True
+    with app.app_context():
+        yield app
+
+
+def gunzip(data):
+    return gzip.GzipFile(fileobj=BytesIO(data)).read()
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding('gzip, deflate') == 'gzip'
+    assert negotiate_encoding('deflate') == 'deflate'
+    assert negotiate_encoding('gzip;q=0.5, deflate') == 'deflate'
+    assert negotiate_encoding('gzip;q=0, deflate;q=0') is None
+    assert negotiate_encoding('*') == 'gzip'
+    assert negotiate_encoding('br') is None
+    assert negotiate_encoding(None) is None
+
+
+def test_is_compressible():
+    assert is_compressible('text/html; charset=utf-8')
+    assert is_compressible('application/json')
+    assert is_compressible('application/problem+json')
+    assert not is_compressible('image/png')
+
+
+def test_compress():
+    data = 'hello ' * 100
+    assert gunzip(compress(data, 'gzip')) == data
+    assert zlib.decompress(compress(data, 'deflate')) == data
+
+
+def test_compressed_body():
+    chunks = ['chunk %d ' % i * 50 for i in range(20)]
+    body = CompressedBody(iter(chunks), 'gzip')
+    compressed = list(body)
+    assert len(compressed) > 1
+    assert gunzip(''.join(compressed)) == ''.join(chunks)
+
+
+def test_compressed_file_body():
+    data = 'file data ' * 10000
+    fp = BytesIO(data)
+    body = CompressedBody(fp, 'deflate', buffer_size=1024)
+    assert zlib.decompress(''.join(body)) == data
+    body.close()
+    assert fp.closed
+
+
+def test_request_encoding():
+    assert request_encoding('gzip') == 'gzip'
+    assert request_encoding('X-Gzip') == 'gzip'
+    assert request_encoding('deflate') == 'deflate'
+    assert request_encoding('identity') is None
+    assert request_encoding(None) is None
+
+
+def test_decompress_chunks():
+    data = ''.join('line %d\n' % i for i in range(10000))
+    compressed = compress(data, 'gzip')
+    chunks = [compressed[i:i + 100] for i in range(0, len(compressed), 100)]
+    out = list(decompress_chunks(chunks, 'gzip', buffer_size=1024))
+    assert max(len(chunk) for chunk in out) <= 1024
+    assert ''.join(out) == data
+
+
+def test_decompress_limits():
+    bomb = compress('\0' * 1024 * 1024, 'deflate')
+    with pytest.raises(RequestEntityTooLarge):
+        list(decompress_chunks([bomb], 'deflate', max_ratio=100))
+    with pytest.raises(RequestEntityTooLarge):
+        list(decompress_chunks([bomb], 'deflate', max_size=1000,
+                               max_ratio=None))
+    assert len(''.join(decompress_chunks([bomb], 'deflate',
+                                         max_ratio=None))) == 1024 * 1024
+
+    with pytest.raises(BadRequest):
+        list(decompress_chunks(['not compressed'], 'gzip'))
+
+
+def test_compress_response():
+    response = Response(data='x' * 1000)
+    environ = {'HTTP_ACCEPT_ENCODING': 'gzip'}
+    compress_response(response, environ)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.headers['Content-Length'] == str(len(response.data))
+    assert gunzip(response.data) == 'x' * 1000
+
+    response = Response(data=('x' * 1000, {'ETag': '"abc"'}))
+    compress_response(response, environ)
+    assert response.headers['ETag'] == 'W/"abc"'
+
+
+def test_compress_response_skipped():
+    response = Response(data='x' * 100)
+    compress_response(response, {'HTTP_ACCEPT_ENCODING': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Vary'] == 'Accept-Encoding'
+
+    response = Response(data='x' * 1000)
+    compress_response(response, {})
+    assert 'Content-Encoding' not in response.headers
+
+    response = Response(data=('x' * 1000, {'Content-Type': 'image/png'}))
+    compress_response(response, {'HTTP_ACCEPT_ENCODING': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Vary' not in response.headers
+
+    response = Response(data=('x' * 1000, {'Vary': 'Cookie'}))
+    compress_response(response, {'HTTP_ACCEPT_ENCODING': 'gzip',
+                                 'HTTP_RANGE': 'bytes=0-10'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Vary'] == 'Cookie, Accept-Encoding'
+
+
+def test_app_compression(app):
+    @app.route('/')
+    def view_func(r):
+        return 'Hello ' * 200
+
+    @app.route('/stream')
+    def stream(r):
+        return ('line %d\n' % i for i in range(1000))
+
+    environ = CreateEnviron()
+    environ.environ['HTTP_ACCEPT_ENCODING'] = 'gzip'
+    make_response = Mock()
+    data = app(environ.environ, make_response)
+    status, headers = make_response.call_args[0]
+    assert ('Content-Encoding', 'gzip') in headers
+    assert gunzip(data) == 'Hello ' * 200
+
+    environ.environ['PATH_INFO'] = '/stream'
+    data = ''.join(app(environ.environ, make_response))
+    assert gunzip(data) == ''.join('line %d\n' % i for i in range(1000))
+
+
+def test_app_compression_off(app):
+    app.config['COMPRESS'] = False
+
+    @app.route('/')
+    def view_func(r):
+        return 'Hello ' * 200
+
+    environ = CreateEnviron()
+    environ.environ['HTTP_ACCEPT_ENCODING'] = 'gzip'
+    assert app(environ.environ, Mock()) == 'Hello ' * 200
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+"""
+
+import pytest
+from datetime import datetime
+from mock import Mock
+
+from pwf.app import Pwf
+from pwf.response import Response
+from pwf.helpers import not_modified
+from pwf.utils import http_date, parse_http_date
+from pwf.conditional import (generate_etag, quote_etag, etag_matches,
+                             is_fresh, make_conditional)
+from mocks.environ import CreateEnviron
+
+
+@pytest.fixture
+def app():
+    app = Pwf()
+    with app.app_context():
+        yield app
+
+
+def test_generate_etag():
+    etag = generate_etag('data')
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == generate_etag('data')
+    assert etag != generate_etag('other data')
+    assert generate_etag('data', weak=True) == 'W/' + etag
+
+
+def test_quote_etag():
+    assert quote_etag(12) == '"12"'
+    assert quote_etag('"abc"') == '"abc"'
+    assert quote_etag('W/"abc"') == 'W/"abc"'
+    assert quote_etag('abc', weak=True) == 'W/"abc"'
+
+
+def test_etag_matches():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"a"', '"a"')
+    assert etag_matches('"a"', 'W/"a"')
+    assert etag_matches('*', '"a"')
+    assert not etag_matches('"a"', '"b"')
+
+
+def test_parse_http_date():
+    assert parse_http_date(http_date(1000000000)) == 1000000000
+    assert parse_http_date('not a date') is None
+    assert parse_http_date(None) is None
+
+
+def test_is_fresh():
+    date = http_date(1000000000)
+    assert is_fresh({'HTTP_IF_NONE_MATCH': '"12"'}, etag=12)
+    assert not is_fresh({'HTTP_IF_NONE_MATCH': '"12"'}, etag=13)
+    assert not is_fresh({'HTTP_IF_NONE_MATCH': '"12"'},
+                        last_modified=1000000000)
+    assert is_fresh({'HTTP_IF_MODIFIED_SINCE': date},
+                    last_modified=1000000000)
+    assert is_fresh({'HTTP_IF_MODIFIED_SINCE': date},
+                    last_modified=datetime(2001, 9, 9, 1, 46, 40))
+    assert not is_fresh({'HTTP_IF_MODIFIED_SINCE': date},
+                        last_modified=1000000001)
+    assert not is_fresh({}, etag=12, last_modified=date)
+
+
+def test_make_conditional():
+    response = Response(data='Hello')
+    make_conditional(response, {'REQUEST_METHOD': 'GET'}, auto_etag=True)
+    etag = response.headers['ETag']
+    assert etag == generate_etag('Hello')
+    assert response.code == 200
+
+    response = Response(data=('Hello', {'Content-Length': '5',
+                                        'Cache-Control': 'max-age=60'}))
+    make_conditional(response, {'REQUEST_METHOD': 'GET',
+                                'HTTP_IF_NONE_MATCH': etag}, auto_etag=True)
+    assert response.code == 304
+    assert response.data == ''
+    assert response.headers['ETag'] == etag
+    assert response.headers['Cache-Control'] == 'max-age=60'
+    assert 'Content-Length' not in response.headers
+
+
+def test_make_conditional_skipped():
+    environ = {'REQUEST_METHOD': 'POST', 'HTTP_IF_NONE_MATCH': '*'}
+    response = Response(data='Hello')
+    make_conditional(response, environ, auto_etag=True)
+    assert response.code == 200
+    assert 'ETag' not in response.headers
+
+    environ['REQUEST_METHOD'] = 'GET'
+    response = Response(data=('Hello', {'ETag': 'v1'}))
+    make_conditional(response, environ)
+    assert response.code == 304
+    assert response.headers['ETag'] == '"v1"'
+
+
+def test_app_auto_etag(app):
+    app.config['AUTO_ETAG'] = True
+
+    @app.route('/')
+    def view_func(r):
+        return 'Hello'
+
+    environ = CreateEnviron()
+    make_response = Mock()
+    assert app(environ.environ, make_response) == 'Hello'
+    status, headers = make_response.call_args[0]
+    etag = dict(headers)['ETag']
+
+    environ.environ['HTTP_IF_NONE_MATCH'] = etag
+    assert app(environ.environ, make_response) == ''
+    status, headers = make_response.call_args[0]
+    assert status == '304 Not Modified'
+    assert ('ETag', etag) in headers
+    assert 'Content-Type' not in dict(headers)
+
+
+def test_app_view_etag(app):
+    built = []
+
+    @app.route('/item')
+    def item(request):
+        if request.is_fresh(etag=7):
+            return not_modified(etag=7)
+        built.append(True)
+        return 'Item', {'ETag': 7}
+
+    environ = CreateEnviron(path='/item')
+    make_response = Mock()
+    assert app(environ.environ, make_response) == 'Item'
+    assert ('ETag', '"7"') in make_response.call_args[0][1]
+
+    environ.environ['HTTP_IF_NONE_MATCH'] = '"7"'
+    assert app(environ.environ, make_response) == ''
+    assert make_response.call_args[0][0] == '304 Not Modified'
+    assert len(built) == 1
@@ -13,10 +13,13 @@ from io import BytesIO
 from StringIO import StringIO
 import tempfile
 
+from pwf.app import Pwf
 from pwf.request import Request
+from pwf.exceptions import RequestEntityTooLarge
 from pwf.wrappers import FileWrapper
 from mocks.environ import CreateEnviron
 from mocks.builtin import MockOpen
+from mocks.make_response import make_response
 
 
 @pytest.fixture
@@ -30,6 +33,13 @@ def req(environ):
     return req
 
 
+@pytest.fixture
+def app():
+    app = Pwf()
+    with app.app_context():
+        yield app
+
+
 @pytest.fixture
 def file_environ():
     data = (b'--foo\r\n'
@@ -65,6 +75,60 @@ def test_large_stream(environ, req):
     assert isinstance(cached_stream, file)
 
 
+def test_large_stream_chunks(environ, req):
+    data = 'x' * 1024 * 1024
+    f = StringIO(data)
+    f.read = Mock(side_effect=f.read)
+    environ = {'wsgi.input': f, 'CONTENT_LENGTH': len(data)}
+    cached_stream = req._Request__cache_stream(environ)
+    assert cached_stream.read() == data
+    assert max(c[0][0] for c in f.read.call_args_list) == req.buffer_size
+
+
+def test_spool_threshold(environ, req, app):
+    app.config['SPOOL_THRESHOLD'] = 4
+    environ = {'wsgi.input': StringIO('my data'), 'CONTENT_LENGTH': 7}
+    cached_stream = req._Request__cache_stream(environ)
+    assert isinstance(cached_stream, file)
+    assert cached_stream.read() == 'my data'
+
+
+def test_max_content_length(environ, req, app):
+    app.config['MAX_CONTENT_LENGTH'] = 4
+    f = StringIO('my data')
+    environ = {'wsgi.input': f, 'CONTENT_LENGTH': 7}
+    with pytest.raises(RequestEntityTooLarge):
+        req._Request__cache_stream(environ)
+    assert f.tell() == 0
+
+
+def test_max_content_length_response(app):
+    app.config['MAX_CONTENT_LENGTH'] = 4
+
+    @app.route('/upload', methods=['POST'])
+    def upload(r):
+        return 'Uploaded'
+
+    environ = CreateEnviron(path='/upload', method='POST', data='my data')
+    assert app(environ.environ, make_response) == \
+        '413 Request Entity Too Large'
+    assert environ.environ['wsgi.input'].tell() == 0
+
+
+def test_negative_content_length(app):
+    app.config['MAX_CONTENT_LENGTH'] = 10
+
+    @app.route('/upload', methods=['POST'])
+    def upload(r):
+        return 'Uploaded %d bytes' % len(r.data)
+
+    environ = CreateEnviron(path='/upload', method='POST', data='x' * 1000)
+    environ.environ['CONTENT_LENGTH'] = '-1'
+    assert Request(environ.environ).content_length == 0
+    assert app(environ.environ, make_response) == 'Uploaded 0 bytes'
+    assert environ.environ['wsgi.input'].tell() == 0
+
+
 def test_form_file(environ, req, file_environ):
     file_req = Request(file_environ)
     parsed_data = file_req._Request__parse_data(file_environ)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+"""
+
+import pytest
+from io import BytesIO
+
+from pwf.formparser import MultipartParser
+from pwf.request import Request
+from pwf.wrappers import FileWrapper
+
+
+@pytest.fixture
+def data():
+    return (b'preamble\r\n'
+            b'--AaB03x\r\n'
+            b'Content-Disposition: form-data; name="title"\r\n\r\n'
+            b'Hello World\r\n'
+            b'--AaB03x\r\n'
+            b'Content-Disposition: form-data; name="empty"\r\n\r\n'
+            b'\r\n'
+            b'--AaB03x\r\n'
+            b'Content-Disposition: form-data; name="file"; '
+            b'filename="plans.txt"\r\n'
+            b'Content-Type: text/plain; charset=utf-8\r\n\r\n'
+            b'line one\r\n--AaB03 is not a boundary\r\nline two\r\n'
+            b'--AaB03x--\r\n')
+
+
+@pytest.mark.parametrize('buffer_size', [1, 3, 7, 16384])
+def test_parse(data, buffer_size):
+    parser = MultipartParser(b'AaB03x', buffer_size=buffer_size)
+    form, files = parser.parse(BytesIO(data), len(data))
+
+    assert form == {'title': 'Hello World', 'empty': ''}
+
+    f = files['file']
+    assert isinstance(f, FileWrapper)
+    assert f.filename == 'plans.txt'
+    assert f.name == 'file'
+    assert f.mimetype == 'text/plain'
+    assert f.headers['content-type'] == 'text/plain; charset=utf-8'
+    assert f.read() == 'line one\r\n--AaB03 is not a boundary\r\nline two'
+
+
+def test_content_length(data):
+    parser = MultipartParser(b'AaB03x')
+    stream = BytesIO(data + b'trailing data')
+    form, files = parser.parse(stream, len(data))
+    assert stream.tell() == len(data)
+    assert form['title'] == 'Hello World'
+
+
+def test_file_spooling():
+    content = b'x' * 2048
+    data = (b'--foo\r\n'
+            b'Content-Disposition: form-data; name="f"; filename="x"\r\n\r\n'
+            + content + b'\r\n--foo--')
+
+    parser = MultipartParser(b'foo', buffer_size=512, spool_threshold=1024)
+    form, files = parser.parse(BytesIO(data), len(data))
+    assert files['f'].file._rolled
+    assert files['f'].read() == content
+
+    parser = MultipartParser(b'foo', buffer_size=512, spool_threshold=4096)
+    form, files = parser.parse(BytesIO(data), len(data))
+    assert not files['f'].file._rolled
+
+
+def test_truncated_stream():
+    data = (b'--foo\r\n'
+            b'Content-Disposition: form-data; name="a"\r\n\r\n'
+            b'complete\r\n'
+            b'--foo\r\n'
+            b'Content-Disposition: form-data; name="b"\r\n\r\n'
+            b'trunc')
+
+    form, files = MultipartParser(b'foo').parse(BytesIO(data), len(data))
+    assert form == {'a': 'complete'}
+
+
+def test_case_sensitive_boundary():
+    data = (b'--AbC\r\n'
+            b'Content-Disposition: form-data; name="a"\r\n\r\n'
+            b'value\r\n--AbC--')
+    environ = {'REQUEST_METHOD': 'POST', 'QUERY_STRING': '',
+               'CONTENT_TYPE': 'multipart/form-data; boundary=AbC',
+               'wsgi.input': BytesIO(data), 'CONTENT_LENGTH': len(data)}
+
+    assert Request(environ).form == {'a': 'value'}
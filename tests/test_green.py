@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+"""
+
+import sys
+import time
+import thread
+import pytest
+from mock import Mock
+
+from pwf.app import Pwf
+from pwf.stack import current_request
+from pwf.green import (make_gevent_server, run_in_threadpool, is_green,
+                       import_gevent)
+from mocks.environ import CreateEnviron
+
+
+@pytest.fixture
+def app():
+    app = Pwf()
+    with app.app_context():
+        yield app
+
+
+def test_import_gevent_missing(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'gevent', None)
+    with pytest.raises(ImportError) as error:
+        import_gevent()
+    assert 'pip install gevent' in str(error.value)
+    with pytest.raises(ImportError):
+        make_gevent_server('127.0.0.1', 0, Mock())
+
+
+def test_run_in_threadpool_outside_greenlet():
+    assert not is_green()
+    assert run_in_threadpool(thread.get_ident) == thread.get_ident()
+    assert run_in_threadpool(lambda a, b=0: a + b, 1, b=2) == 3
+
+
+def test_app_offload(app):
+    @app.route('/report')
+    @app.offload
+    def report(request):
+        return 'Report'
+
+    assert report.offload
+    make_response = Mock()
+    body = app(CreateEnviron(path='/report').environ, make_response)
+    assert body == 'Report'
+    assert make_response.call_args[0][0] == '200 OK'
+
+
+def test_run_in_threadpool_in_greenlet():
+    gevent = pytest.importorskip('gevent')
+    idents = []
+
+    def blocking():
+        time.sleep(0.1)
+        return thread.get_ident()
+
+    def request():
+        assert is_green()
+        idents.append(run_in_threadpool(blocking))
+
+    start = time.time()
+    gevent.joinall([gevent.spawn(request) for _ in range(5)])
+    # The unpatched sleeps ran in native threads, not one after another
+    assert time.time() - start < 0.4
+    assert thread.get_ident() not in idents
+
+
+def test_gevent_server(app):
+    gevent = pytest.importorskip('gevent')
+    from gevent import socket
+
+    @app.route('/slow')
+    def slow(request):
+        gevent.sleep(0.2)
+        return 'Slow'
+
+    app.freeze()
+    server = make_gevent_server('127.0.0.1', 0, app, concurrency=100,
+                                log=None)
+    server.start()
+    results = []
+
+    def request():
+        conn = socket.create_connection(('127.0.0.1', server.server_port))
+        conn.sendall('GET /slow HTTP/1.0\r\n\r\n')
+        data = ''
+        while True:
+            chunk = conn.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+        conn.close()
+        results.append(data)
+
+    start = time.time()
+    gevent.joinall([gevent.spawn(request) for _ in range(50)])
+    server.stop()
+
+    assert len(results) == 50
+    assert all(r.startswith('HTTP/1.1 200') and r.endswith('Slow')
+               for r in results)
+    # The requests waited together in one thread
+    assert time.time() - start < 1.0
+
+
+def test_app_offload_context(app):
+    gevent = pytest.importorskip('gevent')
+    paths = []
+
+    @app.route('/report')
+    @app.offload
+    def report(request):
+        path = current_request.environ['PATH_INFO']
+        paths.append((thread.get_ident(), path))
+        return 'Report'
+
+    app.freeze()
+    environ = CreateEnviron(path='/report').environ
+    body = gevent.spawn(app, environ, Mock()).get()
+    assert body == 'Report'
+    assert paths[0][0] != thread.get_ident()
+    assert paths[0][1] == '/report'
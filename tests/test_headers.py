@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+"""
+
+import pytest
+
+from pwf.wrappers import Headers
+
+
+@pytest.fixture
+def headers():
+    return Headers({'Content-Type': 'text/html'})
+
+
+def test_case_insensitive(headers):
+    assert headers['content-type'] == 'text/html'
+    assert headers.get('CONTENT-TYPE') == 'text/html'
+    assert 'Content-type' in headers
+    assert headers.get('X-Missing', 'default') == 'default'
+
+    with pytest.raises(KeyError):
+        headers['X-Missing']
+
+
+def test_set_replaces(headers):
+    headers['content-type'] = 'application/json'
+    assert headers.items() == [('content-type', 'application/json')]
+    assert len(headers) == 1
+
+
+def test_multiple_values(headers):
+    headers.add('Set-Cookie', 'a=1')
+    headers.add('Set-Cookie', 'b=2')
+    assert headers['Set-Cookie'] == 'a=1'
+    assert headers.getlist('set-cookie') == ['a=1', 'b=2']
+    assert headers.to_wsgi_list() == [('Content-Type', 'text/html'),
+                                      ('Set-Cookie', 'a=1'),
+                                      ('Set-Cookie', 'b=2')]
+
+
+def test_remove(headers):
+    headers.add('Set-Cookie', 'a=1')
+    headers.add('Set-Cookie', 'b=2')
+    del headers['set-cookie']
+    assert 'Set-Cookie' not in headers
+    assert headers.pop('Content-Type') == 'text/html'
+    assert headers.pop('Content-Type', 'gone') == 'gone'
+    assert headers.to_wsgi_list() == []
+
+    with pytest.raises(KeyError):
+        del headers['Content-Type']
+
+
+def test_values_to_string():
+    headers = Headers({'Content-Length': 10})
+    assert headers['Content-Length'] == '10'
+
+
+def test_equality(headers):
+    assert headers == {'Content-Type': 'text/html'}
+    assert headers != {'content-type': 'text/html'}
+    assert headers == Headers({'Content-Type': 'text/html'})
+
+
+def test_setdefault_and_update(headers):
+    assert headers.setdefault('content-type', 'text/plain') == 'text/html'
+    headers.update(Headers({'X-One': '1'}))
+    headers.update({'x-one': '2'})
+    assert headers.keys() == ['Content-Type', 'x-one']
+    assert list(headers) == ['Content-Type', 'x-one']
@@ -11,7 +11,13 @@ import json
 import time
 from collections import Counter
 from mock import Mock
-from pwf.helpers import render_json, timed
+from io import BytesIO
+from wsgiref.util import FileWrapper as WSGIFileWrapper
+
+from pwf.helpers import render_json, stream_json, send_file, timed
+from pwf.response import Response
+from pwf.wrappers import StreamingBody
+from mocks.make_response import make_response
 
 
 @pytest.fixture
@@ -40,6 +46,77 @@ def test_json_no_headers(headers):
     assert return_data == '{"data": "This is some response data", "success": true}'
 
 
+def test_stream_json(headers):
+    records = ({'id': i} for i in range(1000))
+    body, return_headers = stream_json(records, headers, chunk_size=100)
+    assert return_headers['content-type'] == 'application/json'
+    assert 'Content-Type' not in return_headers
+
+    chunks = list(body)
+    assert len(chunks) > 1
+    assert all(len(chunk) < 200 for chunk in chunks)
+    assert json.loads(''.join(chunks)) == [{'id': i} for i in range(1000)]
+
+
+def test_stream_json_empty():
+    body, return_headers = stream_json([])
+    assert ''.join(body) == '[]'
+
+    body, return_headers = stream_json([], ndjson=True)
+    assert ''.join(body) == ''
+
+
+def test_stream_ndjson():
+    body, return_headers = stream_json([{'id': 1}, {'id': 2}], ndjson=True)
+    assert return_headers == {'content-type': 'application/x-ndjson'}
+    lines = ''.join(body).splitlines()
+    assert [json.loads(line) for line in lines] == [{'id': 1}, {'id': 2}]
+
+
+def test_stream_json_response():
+    response = Response(make_response, data=stream_json([1, 2, 3]))
+    assert response.is_streamed
+    assert ''.join(response.render()) == '[1,2,3]'
+    assert response.headers['Content-Type'] == 'application/json'
+
+
+def test_send_file(tmpdir):
+    path = tmpdir.join('report.csv')
+    path.write('id,name\n1,walter\n')
+
+    response = send_file(str(path))
+    assert isinstance(response, Response)
+    assert response.headers['Content-Type'] == 'text/csv'
+    assert response.headers['Content-Length'] == '17'
+    assert response.headers['Last-Modified'].endswith(' GMT')
+    assert 'Content-Disposition' not in response.headers
+
+    response.make_response = make_response
+    environ = {'REQUEST_METHOD': 'GET', 'wsgi.file_wrapper': WSGIFileWrapper}
+    render_data = response.render(environ)
+    assert isinstance(render_data, WSGIFileWrapper)
+    assert isinstance(render_data.filelike, file)
+    assert ''.join(render_data) == 'id,name\n1,walter\n'
+    render_data.close()
+
+
+def test_send_file_fallback():
+    fp = BytesIO(b'binary data')
+    response = send_file(fp, as_attachment=True,
+                         attachment_filename='data.bin')
+    assert response.headers['Content-Type'] == 'application/octet-stream'
+    assert response.headers['Content-Length'] == '11'
+    assert response.headers['Content-Disposition'] == \
+        'attachment; filename="data.bin"'
+
+    response.make_response = make_response
+    render_data = response.render({'REQUEST_METHOD': 'GET'})
+    assert isinstance(render_data, StreamingBody)
+    assert ''.join(render_data) == 'binary data'
+    render_data.close()
+    assert fp.closed
+
+
 def test_timed(monkeypatch):
     mock = Mock(return_value=1483203681.162797)
     monkeypatch.setattr('time.time', mock)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+"""
+
+import json
+import pytest
+from io import BytesIO
+
+from pwf.jsoncodec import JSONCodec, get_codec
+
+
+def test_default_codec():
+    codec = get_codec()
+    assert codec.module is json
+    assert get_codec() is codec
+
+
+def test_missing_backend_falls_back():
+    codec = get_codec('pwf_missing_json_backend')
+    assert codec.module is json
+
+
+def test_auto_codec():
+    codec = get_codec('auto')
+    assert codec.loads(codec.dumps({'a': [1, 2]})) == {'a': [1, 2]}
+
+
+def test_dumps_returns_str():
+    codec = JSONCodec(json)
+    data = codec.dumps({'name': u'äöå'})
+    assert isinstance(data, str)
+    assert codec.loads(data) == {'name': u'äöå'}
+
+
+def test_load_from_stream():
+    codec = JSONCodec(json)
+    assert codec.load(BytesIO(b'{"a": 1}')) == {'a': 1}
+    with pytest.raises(ValueError):
+        codec.load(BytesIO(b'{'))
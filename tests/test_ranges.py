@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+"""
+
+import pytest
+from io import BytesIO
+from mock import Mock
+
+from pwf.ranges import parse_range, if_range_matches, RangeBody, MAX_RANGES
+from pwf.response import Response
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('bytes=0-499', [(0, 500)]),
+    ('bytes=500-', [(500, 1000)]),
+    ('bytes=-200', [(800, 1000)]),
+    ('bytes=900-2000', [(900, 1000)]),
+    ('bytes=0-0, -1', [(0, 1), (999, 1000)]),
+    ('bytes=500-599, 0-99', [(0, 100), (500, 600)]),
+    ('bytes=0-49, 40-99, 100-199', [(0, 200)]),
+    ('bytes=0-, 0-', None),
+    ('bytes=' + ','.join(['0-0'] * 101), None),
+    ('bytes=1000-', []),
+    ('bytes=-0', []),
+    ('bytes=5-1', None),
+    ('bytes=a-b', None),
+    ('bytes=-', None),
+    ('lines=0-5', None),
+    ('0-5', None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+def test_if_range():
+    etag = '"abc"'
+    date = 'Wed, 21 Dec 2016 21:28:34 GMT'
+    assert if_range_matches('"abc"', etag, date)
+    assert not if_range_matches('"xyz"', etag, date)
+    assert not if_range_matches('W/"abc"', 'W/"abc"', date)
+    assert if_range_matches(date, etag, date)
+    assert not if_range_matches('Thu, 22 Dec 2016 21:28:34 GMT', etag, date)
+    assert not if_range_matches(date)
+
+
+def test_range_body_seeks():
+    fp = BytesIO(b'0123456789')
+    fp.read = Mock(side_effect=fp.read)
+    body = RangeBody(fp, [(2, 5)], 10, buffer_size=2)
+    assert list(body) == ['23', '4']
+    assert [c[0][0] for c in fp.read.call_args_list] == [2, 1]
+    assert body.content_length == 3
+    assert body.content_range == 'bytes 2-4/10'
+
+
+def render(response, headers):
+    make_response = Mock()
+    environ = {'REQUEST_METHOD': 'GET'}
+    environ.update(headers)
+    response.make_response = make_response
+    data = response.render(environ)
+    status, response_headers = make_response.call_args[0]
+    return status, dict(response_headers), ''.join(data)
+
+
+def test_single_range_file():
+    response = Response(data=(BytesIO(b'0123456789'), {'ETag': '"v1"'}))
+    status, headers, body = render(response, {'HTTP_RANGE': 'bytes=3-5'})
+    assert status == '206 Partial Content'
+    assert headers['Content-Range'] == 'bytes 3-5/10'
+    assert headers['Content-Length'] == '3'
+    assert body == '345'
+
+
+def test_file_offset():
+    fp = BytesIO(b'skip0123456789')
+    fp.seek(4)
+    status, headers, body = render(Response(data=fp),
+                                   {'HTTP_RANGE': 'bytes=-3'})
+    assert headers['Content-Range'] == 'bytes 7-9/10'
+    assert body == '789'
+
+
+def test_multiple_ranges_string():
+    response = Response(data=('0123456789', {'Content-Type': 'text/plain'}))
+    status, headers, body = render(response,
+                                   {'HTTP_RANGE': 'bytes=0-1,8-'})
+    assert status == '206 Partial Content'
+
+    content_type, boundary = headers['Content-Type'].split('; boundary=')
+    assert content_type == 'multipart/byteranges'
+    assert body == ('--%(b)s\r\nContent-Type: text/plain\r\n'
+                    'Content-Range: bytes 0-1/10\r\n\r\n01\r\n'
+                    '--%(b)s\r\nContent-Type: text/plain\r\n'
+                    'Content-Range: bytes 8-9/10\r\n\r\n89\r\n'
+                    '--%(b)s--\r\n' % {'b': boundary})
+    assert int(headers['Content-Length']) == len(body)
+
+
+def test_unsatisfiable_range():
+    fp = BytesIO(b'0123456789')
+    status, headers, body = render(Response(data=fp),
+                                   {'HTTP_RANGE': 'bytes=20-'})
+    assert status == '416 Requested Range Not Satisfiable'
+    assert headers['Content-Range'] == 'bytes */10'
+    assert fp.closed
+
+
+def test_if_range_mismatch():
+    response = Response(data=('0123456789', {'ETag': '"v2"'}))
+    status, headers, body = render(response, {'HTTP_RANGE': 'bytes=0-1',
+                                              'HTTP_IF_RANGE': '"v1"'})
+    assert status == '200 OK'
+    assert body == '0123456789'
+
+
+def test_invalid_range_ignored():
+    status, headers, body = render(Response(data='0123456789'),
+                                   {'HTTP_RANGE': 'bytes=9-1'})
+    assert status == '200 OK'
+    assert body == '0123456789'
+
+
+def test_overlapping_ranges_ignored():
+    data = 'x' * 1024 * 1024
+    header = 'bytes=' + ','.join(['0-'] * 1000)
+    status, headers, body = render(Response(data=data),
+                                   {'HTTP_RANGE': header})
+    assert status == '200 OK'
+    assert len(body) == len(data)
+
+    header = 'bytes=' + ','.join(['%d-%d' % (i * 2, i * 2)
+                                  for i in range(MAX_RANGES + 1)])
+    status, headers, body = render(Response(data=data),
+                                   {'HTTP_RANGE': header})
+    assert status == '200 OK'
@@ -14,7 +14,10 @@ from io import BytesIO
 from StringIO import StringIO
 import tempfile
 
-from pwf.request import Request
+from pwf.app import Pwf
+from pwf.request import Request, DEFAULT_MAX_JSON_LINE_SIZE
+from pwf.exceptions import BadRequest, RequestEntityTooLarge
+from pwf.compression import compress
 from pwf.wrappers import FileWrapper
 from mocks.environ import CreateEnviron
 from mocks.builtin import MockOpen
@@ -25,6 +28,13 @@ def environ():
       return CreateEnviron(path='/get')
 
 
+@pytest.fixture
+def app():
+    app = Pwf()
+    with app.app_context():
+        yield app
+
+
 @pytest.fixture
 def req(environ):
     req = Request(environ.environ)
@@ -35,6 +45,30 @@ def test_create_req(environ, req):
     assert req.environ == environ.environ
 
 
+def test_lazy_request(environ, req):
+    for name in ('stream', 'headers', 'cookies', 'query', 'mimetype'):
+        assert name not in req.__dict__
+    assert environ.environ['wsgi.input'].tell() == 0
+
+    assert req.mimetype == 'text/html'
+    assert req.options == {}
+    assert req.headers['PATH_INFO'] == '/get'
+
+
+def test_parsed_counter(app, environ):
+    app.config['DEBUG'] = True
+    req = Request(environ.environ)
+    req.cookies
+    req.cookies
+    req.query
+    req.mimetype
+    req.options
+    assert req.parsed == {'cookies': 1, 'query': 1, 'content_type': 1}
+
+    app.config['DEBUG'] = False
+    assert Request(environ.environ).parsed is None
+
+
 def test_parse_headers(environ, req):
     environ = {'CONTENT_LENGTH': 0, 'REQUEST_METHOD': 'GET',
                'PATH_INFO': '/get',
@@ -171,5 +205,125 @@ def test_json_parser_fail(req):
     assert data is None
 
 
+def test_json_from_stream():
+    environ = CreateEnviron(content_type='application/json',
+                            data='{"title": "Example"}')
+    req = Request(environ.environ)
+    assert req.json == {'title': 'Example'}
+    assert 'data' not in req.__dict__
+
+    environ = CreateEnviron(content_type='application/json', data='{')
+    assert Request(environ.environ).json is None
+
+
+def test_iter_chunks():
+    environ = CreateEnviron(method='POST', data='x' * 100)
+    req = Request(environ.environ)
+    chunks = list(req.iter_chunks(30))
+    assert [len(chunk) for chunk in chunks] == [30, 30, 30, 10]
+    assert 'stream' not in req.__dict__
+
+
+def test_iter_chunks_cached_stream():
+    environ = CreateEnviron(method='POST', data='abcdef')
+    req = Request(environ.environ)
+    assert req.data == 'abcdef'
+    assert list(req.iter_chunks(4)) == ['abcd', 'ef']
+
+
+def test_iter_json_lines():
+    data = '{"id": 1}\n\n{"id": 2}\r\n{"id": 3}'
+    req = Request(CreateEnviron(method='POST', data=data).environ)
+    req.buffer_size = 4
+    assert list(req.iter_json_lines()) == [{'id': 1}, {'id': 2}, {'id': 3}]
+
+
+def test_iter_json_lines_malformed():
+    data = '{"id": 1}\n{"id": 2}\n{"id":\n{"id": 4}\n'
+    req = Request(CreateEnviron(method='POST', data=data).environ)
+    records = req.iter_json_lines()
+    assert next(records) == {'id': 1}
+    assert next(records) == {'id': 2}
+    with pytest.raises(BadRequest) as e:
+        next(records)
+    assert e.value.code == 400
+    assert e.value.description == 'Malformed JSON on line 3'
+
+
+def test_iter_json_lines_too_long():
+    data = '{"id": 1}\n{"name": "%s"}\n' % ('x' * 100)
+    req = Request(CreateEnviron(method='POST', data=data).environ)
+    req.buffer_size = 16
+    with pytest.raises(BadRequest) as e:
+        list(req.iter_json_lines(max_line_size=50))
+    assert e.value.description == 'Line 2 is too long'
+
+    # A complete line inside one chunk is checked too
+    req = Request(CreateEnviron(method='POST', data=data).environ)
+    with pytest.raises(BadRequest) as e:
+        list(req.iter_json_lines(max_line_size=50))
+    assert e.value.description == 'Line 2 is too long'
+
+
+def test_iter_json_lines_default_limit(app):
+    data = '{"id": 1}\n{"name": "%s"}' % ('x' * 100)
+    app.config['MAX_JSON_LINE_SIZE'] = 50
+    req = Request(CreateEnviron(method='POST', data=data).environ)
+    req.buffer_size = 16
+    with pytest.raises(BadRequest) as e:
+        list(req.iter_json_lines())
+    assert e.value.description == 'Line 2 is too long'
+
+    app.config['MAX_JSON_LINE_SIZE'] = None
+    req = Request(CreateEnviron(method='POST', data=data).environ)
+    assert len(list(req.iter_json_lines())) == 2
+
+    del app.config['MAX_JSON_LINE_SIZE']
+    data = '[%s]' % ','.join(['1'] * DEFAULT_MAX_JSON_LINE_SIZE)
+    req = Request(CreateEnviron(method='POST', data=data).environ)
+    with pytest.raises(BadRequest) as e:
+        list(req.iter_json_lines())
+    assert e.value.description == 'Line 1 is too long'
+
+
+def gzip_environ(data, content_type='application/json'):
+    environ = CreateEnviron(method='POST', content_type=content_type,
+                            data=compress(data, 'gzip'))
+    environ.environ['HTTP_CONTENT_ENCODING'] = 'gzip'
+    return environ.environ
+
+
+def test_compressed_body():
+    req = Request(gzip_environ('{"title": "Example"}'))
+    assert req.content_encoding == 'gzip'
+    assert req.body_length == 20
+    assert req.json == {'title': 'Example'}
+
+    req = Request(gzip_environ('abc' * 1000, 'text/plain'))
+    assert req.data == 'abc' * 1000
+    assert req.content_length < req.body_length
+
+
+def test_compressed_json_lines():
+    data = ''.join('{"id": %d}\n' % i for i in range(1000))
+    req = Request(gzip_environ(data))
+    assert list(req.iter_json_lines()) == [{'id': i} for i in range(1000)]
+
+
+def test_compressed_body_limits(app):
+    req = Request(gzip_environ('\0' * 1024 * 1024))
+    with pytest.raises(RequestEntityTooLarge):
+        req.stream
+
+    app.config['MAX_DECOMPRESSION_RATIO'] = None
+    req = Request(gzip_environ('\0' * 1024 * 1024))
+    assert req.body_length == 1024 * 1024
+
+    app.config['MAX_DECOMPRESSED_SIZE'] = 1000
+    req = Request(gzip_environ('{"data": "%s"}' % ('x' * 2000)))
+    with pytest.raises(RequestEntityTooLarge):
+        list(req.iter_chunks())
+
+
 def test_repr(req):
     req.__repr__()
@@ -7,8 +7,12 @@
 import pytest
 import json
 from collections import Counter
+from mock import Mock
 
-from pwf.response import Response
+from io import BytesIO
+
+from pwf.response import Response, StaticResponse, STATUS_LINES
+from pwf.wrappers import StreamingBody, Headers
 from mocks.make_response import make_response
 
 
@@ -19,7 +23,7 @@ class TestResponseObject(object):
 
     def test_empty_response(self):
         assert isinstance(self.response, Response)
-        assert isinstance(self.response.headers, dict)
+        assert isinstance(self.response.headers, Headers)
         assert self.response.code == 200
         assert not self.response.make_response
         assert not self.response.data
@@ -56,6 +60,24 @@ class TestResponseObject(object):
         self.response.set_cookie('session', 'abc123')
         assert self.response.headers == {'Set-Cookie': 'session=abc123; Path=/'}
 
+    def test_set_multiple_cookies(self):
+        self.response.set_cookie('session', 'abc123')
+        self.response.set_cookie('theme', 'dark')
+        assert self.response.headers.getlist('set-cookie') == [
+                'session=abc123; Path=/', 'theme=dark; Path=/']
+
+    def test_render_headers(self):
+        self.response.headers['content-type'] = 'application/json'
+        self.response.set_cookie('session', 'abc123')
+        self.response.set_cookie('theme', 'dark')
+        self.response.make_response = Mock()
+        self.response.render()
+        status, headers = self.response.make_response.call_args[0]
+        assert headers == [('content-type', 'application/json'),
+                           ('Set-Cookie', 'session=abc123; Path=/'),
+                           ('Set-Cookie', 'theme=dark; Path=/')]
+        assert isinstance(self.response.headers, Headers)
+
     def test_error_render(self):
         self.response.code = 404
         self.response.make_response = make_response
@@ -68,7 +90,76 @@ class TestResponseObject(object):
         render_data = self.response.render()
         assert render_data == self.response.data
 
+    def test_generator_render(self):
+        closed = []
+
+        def generate():
+            try:
+                yield 'first,'
+                yield u'andra,'
+                yield u'åäö'
+            finally:
+                closed.append(True)
+
+        self.response.data = generate()
+        self.response.make_response = make_response
+        assert self.response.is_streamed
+        render_data = self.response.render()
+        assert isinstance(render_data, StreamingBody)
+        assert next(render_data) == 'first,'
+        assert list(render_data) == ['andra,', u'åäö'.encode('utf-8')]
+        render_data.close()
+        assert closed
+
+    def test_file_render(self):
+        self.response.data = BytesIO(b'x' * 40000)
+        self.response.make_response = make_response
+        render_data = self.response.render()
+        assert [len(c) for c in render_data] == [16384, 16384, 7232]
+        render_data.close()
+        assert self.response.data.closed
+
+    def test_head_render_stream(self):
+        self.response.data = BytesIO(b'data')
+        self.response.make_response = make_response
+        render_data = self.response.render({'REQUEST_METHOD': 'HEAD'})
+        assert render_data == ''
+        assert self.response.data.closed
+
     def test_repr(self):
         assert self.response.__repr__() == \
-                ("Response({'headers': {}, 'code': 200, 'data': '',"
+                ("Response({'headers': Headers([]), 'code': 200, 'data': '',"
                  " 'make_response': None})")
+
+
+def test_str_data_sent_as_is():
+    data = '{"data": "%s"}' % ('x' * 1024)
+    response = Response(make_response, data=data)
+    assert response.render() is data
+
+
+def test_status_lines():
+    assert STATUS_LINES[200] == '200 OK'
+    assert STATUS_LINES[404] == '404 Not Found'
+
+
+def test_static_response():
+    make_response = Mock()
+    response = StaticResponse('200 OK', (('Content-Type', 'text/plain'),),
+                              'Hello', make_response)
+    assert response.code == 200
+    assert response.data == 'Hello'
+    assert response.render() == 'Hello'
+    make_response.assert_called_with('200 OK',
+                                     [('Content-Type', 'text/plain')])
+    assert response.render({'REQUEST_METHOD': 'HEAD'}) == ''
+
+
+def test_static_error_response():
+    make_response = Mock()
+    response = StaticResponse.error(405, make_response, {'Allow': 'GET'})
+    assert response.code == 405
+    assert response.render() == '405 Method Not Allowed'
+    status, headers = make_response.call_args[0]
+    assert status == '405 Method Not Allowed'
+    assert ('Allow', 'GET') in headers
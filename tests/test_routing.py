@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+"""
+
+import pytest
+import uuid
+
+from pwf.routing import Router, Endpoint, split_path, compile_url
+
+
+@pytest.fixture
+def router():
+    return Router()
+
+
+def test_split_path():
+    assert split_path('/') == ['']
+    assert split_path('/user/walter') == ['user', 'walter']
+    assert split_path('/user/') == ['user', '']
+
+
+def test_static_match(router):
+    router.add('/', 'index')
+    router.add('/news', 'news')
+    assert router.match('/') == ('index', {})
+    assert router.match('/news') == ('news', {})
+    assert router.match('/news/') is None
+    assert router.match('/sports') is None
+
+
+def test_variable_match(router):
+    router.add('/user/<username>/profile/edit/<id>', 'edit')
+    route, kwargs = router.match('/user/walter/profile/edit/12')
+    assert route == 'edit'
+    assert kwargs == {'username': 'walter', 'id': '12'}
+
+
+def test_variable_empty_segment(router):
+    router.add('/user/<username>', 'user')
+    assert router.match('/user/') is None
+
+
+def test_static_before_variable(router):
+    router.add('/user/<username>', 'user')
+    router.add('/user/me', 'me')
+    assert router.match('/user/me') == ('me', {})
+    assert router.match('/user/walter') == ('user', {'username': 'walter'})
+
+
+def test_backtracking(router):
+    router.add('/user/me/settings', 'settings')
+    router.add('/user/<username>/posts', 'posts')
+    route, kwargs = router.match('/user/me/posts')
+    assert route == 'posts'
+    assert kwargs == {'username': 'me'}
+    assert router.match('/user/me/other') is None
+
+
+def test_mixed_segment(router):
+    router.add('/export/<name>.json', 'export')
+    assert router.match('/export/report.json') == ('export', {'name': 'report'})
+    assert router.match('/export/report.csv') is None
+
+
+def test_first_registration_wins(router):
+    router.add('/', 'first')
+    router.add('/', 'second')
+    assert router.match('/') == ('first', {})
+
+
+def test_int_converter(router):
+    router.add('/user/<int:id>', 'user')
+    assert router.match('/user/12') == ('user', {'id': 12})
+    assert router.match('/user/walter') is None
+
+
+def test_uuid_converter(router):
+    router.add('/key/<uuid:key>', 'key')
+    route, kwargs = router.match('/key/12345678-1234-1234-1234-123456789abc')
+    assert isinstance(kwargs['key'], uuid.UUID)
+    assert router.match('/key/12345678') is None
+
+
+def test_slug_converter(router):
+    router.add('/post/<slug:title>', 'post')
+    assert router.match('/post/my-first_post') == ('post', {'title': 'my-first_post'})
+    assert router.match('/post/my.post') is None
+
+
+def test_path_converter(router):
+    router.add('/files/<path:name>/edit', 'edit')
+    router.add('/files/<path:name>', 'files')
+    assert router.match('/files/a/b.txt') == ('files', {'name': 'a/b.txt'})
+    assert router.match('/files/a/b/edit') == ('edit', {'name': 'a/b'})
+    assert router.match('/files/') is None
+
+
+def test_converter_fallback(router):
+    router.add('/item/<int:id>', 'int')
+    router.add('/item/<name>', 'string')
+    assert router.match('/item/3') == ('int', {'id': 3})
+    assert router.match('/item/three') == ('string', {'name': 'three'})
+
+
+def test_unknown_converter(router):
+    with pytest.raises(LookupError):
+        router.add('/item/<float:id>', 'float')
+
+
+def test_compile_url():
+    assert compile_url('/') == '^/$'
+    assert compile_url('/user/<int:id>.json') == r'^/user/(?P<id>\d+)\.json$'
+    assert compile_url('/user/<name>') == '^/user/(?P<name>[^/]+)$'
+
+
+def test_endpoint_methods():
+    endpoint = Endpoint('/')
+    endpoint.add(['GET'], None, 'get')
+    endpoint.add(['POST', 'GET'], 'group', 'post')
+    assert endpoint.get('GET') == (None, 'get')
+    assert endpoint.get('POST') == ('group', 'post')
+    assert endpoint.get('HEAD') == (None, 'get')
+    assert endpoint.get('PUT') is None
+    assert endpoint.allow_headers == {'Allow': 'GET, HEAD, OPTIONS, POST'}
+
+
+def test_endpoint_explicit_head():
+    endpoint = Endpoint('/')
+    endpoint.add(['HEAD'], None, 'head')
+    endpoint.add(['GET'], None, 'get')
+    assert endpoint.get('HEAD') == (None, 'head')
+
+
+def test_add_returns_existing(router):
+    assert router.add('/', 'first') == 'first'
+    assert router.add('/', 'second') == 'first'
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+"""
+
+import os
+import time
+import signal
+import socket
+import httplib
+import threading
+import pytest
+from io import BytesIO
+
+from pwf.app import Pwf
+from pwf.serving import (LimitedInput, WSGIRequestHandler,
+                         ThreadPoolWSGIServer, PreforkServer, make_server,
+                         make_socket_server, listen_socket, current_rss)
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def app():
+    app = Pwf()
+
+    @app.route('/')
+    def index(request):
+        return 'Hello'
+
+    @app.route('/echo', methods=['POST'])
+    def echo(request):
+        return request.data
+
+    @app.route('/ignore', methods=['POST'])
+    def ignore(request):
+        return 'Ignored'
+
+    @app.route('/stream')
+    def stream(request):
+        return iter(['a', 'b', 'c'])
+
+    @app.route('/pid')
+    def pid(request):
+        return str(os.getpid())
+
+    @app.route('/slow')
+    def slow(request):
+        time.sleep(0.2)
+        return 'Slow'
+
+    return app
+
+
+@pytest.fixture
+def server(app):
+    app.freeze()
+    server = make_server('127.0.0.1', 0, app, threads=4,
+                         keep_alive_timeout=2, handler_class=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def connect(server):
+    return httplib.HTTPConnection('127.0.0.1', server.server_port, timeout=5)
+
+
+def test_limited_input():
+    body = LimitedInput(BytesIO(b'line 1\nline 2\nnext request'), 14)
+    assert body.readline() == 'line 1\n'
+    assert body.read() == 'line 2\n'
+    assert body.read() == ''
+
+    body = LimitedInput(BytesIO(b'abcdef'), 4)
+    assert list(body) == ['abcd']
+
+    body = LimitedInput(BytesIO(b'abcdef'), 4)
+    assert body.drain()
+    assert not LimitedInput(BytesIO(b'ab'), 4).drain()
+    assert not LimitedInput(BytesIO(b'ab'), 4).drain(limit=1)
+
+    body = LimitedInput(BytesIO(b'x' * 1000), -1)
+    assert body.read() == ''
+    assert body.drain()
+
+
+def test_make_server_simple(app):
+    server = make_server('127.0.0.1', 0, app)
+    assert not isinstance(server, ThreadPoolWSGIServer)
+    server.server_close()
+
+
+def test_keep_alive(server):
+    conn = connect(server)
+    for path in ('/', '/', '/'):
+        conn.request('GET', path)
+        response = conn.getresponse()
+        assert response.status == 200
+        assert response.read() == 'Hello'
+        assert response.getheader('content-length') == '5'
+    sock = conn.sock
+
+    conn.request('POST', '/echo', 'posted data')
+    assert conn.getresponse().read() == 'posted data'
+
+    # A body the view never read is discarded before the next request
+    conn.request('POST', '/ignore', 'x' * 1000)
+    assert conn.getresponse().read() == 'Ignored'
+    conn.request('GET', '/')
+    assert conn.getresponse().read() == 'Hello'
+    assert conn.sock is sock
+    conn.close()
+
+
+def test_connection_close(server):
+    conn = connect(server)
+    conn.request('GET', '/stream')
+    response = conn.getresponse()
+    assert response.getheader('connection') == 'close'
+    assert response.read() == 'abc'
+
+    conn = connect(server)
+    conn.request('GET', '/', headers={'Connection': 'close'})
+    response = conn.getresponse()
+    assert response.getheader('connection') == 'close'
+    assert response.read() == 'Hello'
+
+
+def test_invalid_content_length(server):
+    for length in ('-1', 'ten'):
+        sock = socket.create_connection(('127.0.0.1', server.server_port),
+                                        timeout=5)
+        sock.sendall('POST /echo HTTP/1.1\r\nHost: localhost\r\n'
+                     'Content-Length: %s\r\n\r\n%s' % (length, 'x' * 1000))
+        response = sock.makefile('rb').read()
+        sock.close()
+        assert response.startswith('HTTP/1.1 400 ')
+        assert 'Connection: close' in response
+        assert 'x' * 1000 not in response
+
+
+def test_concurrent_requests(server):
+    results = []
+
+    def request():
+        conn = connect(server)
+        conn.request('GET', '/slow')
+        results.append(conn.getresponse().read())
+        conn.close()
+
+    start = time.time()
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['Slow'] * 4
+    assert time.time() - start < 0.6
+
+
+def test_listen_socket_reuse_port():
+    first = listen_socket('127.0.0.1', 0, reuse_port=True)
+    port = first.getsockname()[1]
+    second = listen_socket('127.0.0.1', port, reuse_port=True)
+    assert second.getsockname()[1] == port
+    first.close()
+    second.close()
+
+
+def test_make_socket_server(app):
+    app.freeze()
+    sock = listen_socket('127.0.0.1', 0)
+    server = make_socket_server(sock, app, threads=2,
+                                handler_class=QuietHandler)
+    assert server.socket is sock
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    conn = connect(server)
+    conn.request('GET', '/')
+    assert conn.getresponse().read() == 'Hello'
+    conn.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_should_recycle(app):
+    server = PreforkServer(app, '127.0.0.1', 0, workers=1, max_requests=3)
+    assert not server.should_recycle()
+    server.handled = 3
+    assert server.should_recycle()
+    server.socket.close()
+
+    assert current_rss() > 0
+    server = PreforkServer(app, '127.0.0.1', 0, workers=1, max_rss=1)
+    assert server.should_recycle()
+    server.socket.close()
+
+
+def test_prefork_recycles_workers(app):
+    app.freeze()
+    server = PreforkServer(app, '127.0.0.1', 0, workers=2, threads=2,
+                           max_requests=2, handler_class=QuietHandler)
+    master = os.fork()
+    if not master:
+        try:
+            server.serve_forever()
+        finally:
+            os._exit(0)
+    server.socket.close()
+
+    try:
+        pids = set()
+        for _ in range(10):
+            conn = connect(server)
+            conn.request('GET', '/pid', headers={'Connection': 'close'})
+            response = conn.getresponse()
+            assert response.status == 200
+            pids.add(int(response.read()))
+            conn.close()
+        # Each worker is replaced after handling a couple of requests
+        assert len(pids) > 2
+        assert master not in pids
+    finally:
+        os.kill(master, signal.SIGTERM)
+        pid, status = os.waitpid(master, 0)
+
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+    for pid in pids:
+        with pytest.raises(OSError):
+            os.kill(pid, 0)
@@ -6,7 +6,13 @@
 """
 
 import pytest
-from pwf.stack import _app_stack
+import threading
+from pwf.app import Pwf
+from pwf.stack import (_app_stack, _request_stack, AppStack, current_app,
+                       current_request, g, bind_context)
+from pwf.exceptions import ContextError
+from mocks.environ import CreateEnviron
+from mocks.make_response import make_response
 
 
 def test_appstack_push():
@@ -40,8 +46,98 @@ def test_appstack_top_fail():
     assert not top
 
 
+def test_appstack_threads():
+    stack = AppStack()
+    stack.push('main')
+    seen = []
 
+    def run():
+        seen.append(stack.top)
+        stack.push('thread')
+        seen.append(stack.pop())
+        seen.append(stack.is_empty)
 
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    assert seen == [None, 'thread', True]
+    assert stack.pop() == 'main'
+    assert stack.is_empty
+    with pytest.raises(IndexError):
+        stack.pop()
 
 
+def test_request_context():
+    app = Pwf()
+    environ = CreateEnviron(path='/get').environ
+    assert not current_request
+    with pytest.raises(ContextError):
+        current_request.method
+    with pytest.raises(ContextError):
+        g.user = 'user'
 
+    with app.request_context(environ) as ctx:
+        assert current_app == app
+        assert current_request.environ is environ
+        assert current_request._get_current_object() is ctx.request
+        g.user = 'user'
+        assert g.user == 'user'
+        assert 'user' in g
+        assert g.get('missing', 1) == 1
+
+    assert _app_stack.top is None
+    with app.request_context(environ):
+        assert 'user' not in g
+
+
+def test_app_call_context():
+    app = Pwf()
+    seen = []
+
+    @app.first()
+    def load_user(request):
+        g.user = request.query.get('user')
+
+    @app.route('/')
+    def index(request):
+        seen.append((current_app._get_current_object(),
+                     current_request._get_current_object() is request))
+        return g.user
+
+    environ = CreateEnviron(path='/', query_string='user=bob').environ
+    assert app(environ, make_response) == 'bob'
+    assert seen == [(app, True)]
+    assert _app_stack.is_empty and _request_stack.is_empty
+
+
+def test_dispatch_request_context():
+    app = Pwf()
+
+    @app.first()
+    def load_user(request):
+        g.user = request.query.get('user')
+
+    @app.route('/')
+    def index(request):
+        assert current_request._get_current_object() is request
+        return g.user
+
+    environ = CreateEnviron(path='/', query_string='user=bob').environ
+    response = app.dispatch_request(environ, make_response)
+    assert _app_stack.is_empty and _request_stack.is_empty
+    assert response.render(environ) == 'bob'
+
+
+def test_bind_context():
+    app = Pwf()
+    results = []
+
+    def work():
+        results.append((current_app._get_current_object(),
+                        current_request.environ['PATH_INFO']))
+
+    with app.request_context(CreateEnviron(path='/get').environ):
+        thread = threading.Thread(target=bind_context(work))
+    thread.start()
+    thread.join()
+    assert results == [(app, '/get')]
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Victor Kohler
+@since: date 18/10/2026
+@version: 0.1
+"""
+
+import thread
+import threading
+import pytest
+from mock import Mock
+from wsgiref.util import FileWrapper as WSGIFileWrapper
+
+from pwf.app import Pwf
+from pwf.helpers import send_file
+from pwf.stack import current_request, g
+from pwf.tasks import TaskPool, TaskBody, TaskList
+from mocks.environ import CreateEnviron
+
+
+@pytest.fixture
+def app():
+    app = Pwf()
+    app.config['TASK_THREADS'] = 2
+    yield app
+    app.close()
+
+
+def test_task_pool():
+    pool = TaskPool(threads=2)
+    results = []
+    for i in range(10):
+        assert pool.submit(results.append, i)
+    pool.close()
+    assert sorted(results) == range(10)
+    assert pool.stats == {'submitted': 10, 'completed': 10, 'failed': 0,
+                          'dropped': 0, 'queued': 0}
+
+
+def test_task_pool_failure(capsys):
+    def fail():
+        raise ValueError('Broken')
+
+    pool = TaskPool(threads=1)
+    pool.submit(fail)
+    pool.close()
+    assert pool.stats['failed'] == 1
+    out = capsys.readouterr()[0]
+    assert 'Background task fail failed' in out
+    assert 'ValueError: Broken' in out
+
+
+def test_task_pool_overflow():
+    with pytest.raises(ValueError):
+        TaskPool(overflow='ignore')
+
+    release = threading.Event()
+    idents = []
+
+    pool = TaskPool(threads=1, queue_size=1, overflow='run')
+    pool.submit(release.wait, 5)
+    while pool.queue.qsize():
+        pass
+    assert pool.submit(idents.append, 'queued')
+    # The queue is full, so the task runs in this thread
+    assert not pool.submit(lambda: idents.append(thread.get_ident()))
+    assert idents == [thread.get_ident()]
+    release.set()
+    pool.close()
+    assert idents[-1] == 'queued'
+
+    release.clear()
+    pool = TaskPool(threads=1, queue_size=1, overflow='drop')
+    pool.submit(release.wait, 5)
+    while pool.queue.qsize():
+        pass
+    pool.submit(idents.append, 'queued')
+    assert not pool.submit(idents.append, 'dropped')
+    release.set()
+    pool.close()
+    assert 'dropped' not in idents
+    assert pool.stats['dropped'] == 1
+
+
+def test_app_background_task(app):
+    ran = threading.Event()
+    seen = []
+
+    def audit(action, user=None):
+        seen.append((action, user, current_request.environ['PATH_INFO'],
+                     g.user))
+        ran.set()
+
+    @app.route('/orders', methods=['POST'])
+    def create_order(request):
+        g.user = 'bob'
+        request.add_background_task(audit, 'create', user='bob')
+        return 'Created'
+
+    @app.route('/')
+    def index(request):
+        return 'Hello'
+
+    make_response = Mock()
+    body = app(CreateEnviron(path='/orders', method='POST').environ,
+               make_response)
+    assert isinstance(body, TaskList)
+    assert list(body) == ['Created']
+    # Nothing runs before the server closes the body
+    assert not ran.wait(0.05)
+
+    body.close()
+    assert ran.wait(5)
+    assert seen == [('create', 'bob', '/orders', 'bob')]
+    assert app.task_pool.stats['completed'] == 1
+
+    # Requests without tasks are left alone
+    assert app(CreateEnviron(path='/').environ, Mock()) == 'Hello'
+
+
+def test_app_background_task_streamed(app):
+    ran = threading.Event()
+
+    @app.route('/stream')
+    def stream(request):
+        request.add_background_task(ran.set)
+        return iter(['a', 'b'])
+
+    body = app(CreateEnviron(path='/stream').environ, Mock())
+    assert isinstance(body, TaskBody)
+    assert ''.join(body) == 'ab'
+    body.close()
+    assert ran.wait(5)
+
+
+def test_app_background_task_file_wrapper(app, tmpdir):
+    ran = threading.Event()
+    path = tmpdir.join('report.csv')
+    path.write('id,name\n1,walter\n')
+
+    @app.route('/report')
+    def report(request):
+        request.add_background_task(ran.set)
+        return send_file(str(path))
+
+    environ = CreateEnviron(path='/report').environ
+    environ['wsgi.file_wrapper'] = WSGIFileWrapper
+    body = app(environ, Mock())
+    # The server still gets its own file wrapper
+    assert isinstance(body, WSGIFileWrapper)
+    assert ''.join(body) == 'id,name\n1,walter\n'
+    assert not ran.wait(0.05)
+
+    body.close()
+    assert body.filelike.closed
+    assert ran.wait(5)